@@ -0,0 +1,140 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+'''
+Compares compressed CZML output: size, time and peak memory for each
+compression and level, against building the whole string with get_czml()
+and compressing it afterwards.
+
+Each case runs in its own subprocess so peak RSS is measured per case.
+Brotli cases are skipped when the brotli package is not installed.
+
+    python benchmarks/bench_compress.py --count 1000 --hours 24
+    python benchmarks/bench_compress.py --catalog sample_catalog.tle --levels 1 6 9
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+START_TIME = datetime(2021, 1, 16)
+
+# 'materialized' is get_czml() followed by gzip.compress, as done before
+# the streaming writers existed
+MODES = ['materialized', 'gzip', 'deflate', 'brotli']
+
+
+def run_case(case):
+    '''
+    Runs a single case in this process and returns its results
+    '''
+    from catalogs import load_catalog
+    from measure import peak_rss_bytes
+    from satellite_czml import satellite_czml
+
+    czml_obj = satellite_czml(tle_list=load_catalog(case['catalog'], case['count']),
+                              start_time=START_TIME,
+                              end_time=START_TIME + timedelta(hours=case['hours']))
+    czml_obj.propagate()
+
+    t = time.perf_counter()
+    if case['mode'] == 'materialized':
+        import gzip
+        czml_string = czml_obj.get_czml()
+        raw_bytes = len(czml_string.encode('utf-8'))
+        compressed = gzip.compress(czml_string.encode('utf-8'), compresslevel=case['level'])
+        out_bytes = len(compressed)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            out_bytes = czml_obj.write_czml(os.path.join(tmp, 'out.czml'), case['mode'], case['level'])
+        raw_bytes = None
+    seconds = time.perf_counter() - t
+
+    return dict(case,
+                seconds=seconds,
+                bytes_out=out_bytes,
+                raw_bytes=raw_bytes,
+                peak_rss=peak_rss_bytes())
+
+
+def brotli_available():
+    try:
+        import brotli
+        return True
+    except ImportError:
+        return False
+
+
+def run_all(cases, out=sys.stdout):
+    '''
+    Runs every case in a subprocess, writing JSON lines to out
+    '''
+    results = []
+    for case in cases:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-case', json.dumps(case)],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"case {case} failed:\n{proc.stderr}", file=sys.stderr)
+            continue
+        result = json.loads(proc.stdout)
+        results.append(result)
+        out.write(json.dumps(result) + '\n')
+        out.flush()
+    return results
+
+
+def print_table(results):
+    raw = next((r['raw_bytes'] for r in results if r['raw_bytes']), None)
+    print(f"{'mode':14s} {'level':>5s} {'seconds':>8s} {'MB out':>8s} {'ratio':>6s} {'peak MB':>8s}",
+          file=sys.stderr)
+    for r in results:
+        ratio = f"{raw / r['bytes_out']:6.1f}" if raw else '     -'
+        print(f"{r['mode']:14s} {r['level']:5d} {r['seconds']:8.2f} {r['bytes_out'] / 1e6:8.2f} {ratio} " +
+              f"{r['peak_rss'] / 1e6:8.1f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog', default='synthetic',
+                        help='"synthetic" or a recorded TLE file (path or name in benchmarks/data)')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 6, 9])
+    parser.add_argument('--output', help='write JSON lines here instead of stdout')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return 0
+
+    modes = [m for m in args.modes if m != 'brotli' or brotli_available()]
+    if len(modes) < len(args.modes):
+        print("brotli is not installed, skipping its cases", file=sys.stderr)
+    cases = [{'catalog': args.catalog, 'count': args.count, 'hours': args.hours,
+              'mode': mode, 'level': level}
+             for mode in modes for level in args.levels]
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            results = run_all(cases, out)
+    else:
+        results = run_all(cases)
+    print_table(results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
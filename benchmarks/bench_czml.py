@@ -0,0 +1,240 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+'''
+Benchmarks satellite_czml.get_czml across catalog size, window length,
+sample step, marker type, label/path options and shared style references.
+
+Each case runs in its own subprocess so peak RSS is measured per case, and
+the wall time is broken down into the parse, propagate, build packets and
+serialize stages.  Results are written as JSON lines, one per case, and two
+result files can be compared to spot regressions between versions.
+
+    python benchmarks/bench_czml.py --preset quick --output before.jsonl
+    python benchmarks/bench_czml.py --preset quick --output after.jsonl
+    python benchmarks/bench_czml.py --compare before.jsonl after.jsonl
+'''
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+START_TIME = datetime(2021, 1, 16)
+
+BASELINE = {'catalog': 'synthetic', 'count': 1000, 'hours': 24, 'step': None,
+            'marker': 'billboard', 'label': True, 'path': True, 'references': False}
+
+# Values swept one dimension at a time around BASELINE (or as a full grid)
+PRESETS = {
+    'quick': {'count': [1, 100, 1000],
+              'hours': [1, 24],
+              'step': [None, 60],
+              'marker': ['billboard', 'point'],
+              'label': [True, False],
+              'path': [True, False],
+              'references': [False, True]},
+    'full': {'count': [1, 100, 1000, 10000, 50000],
+             'hours': [1, 6, 24, 168],
+             'step': [None, 60, 300, 900],
+             'marker': ['billboard', 'point'],
+             'label': [True, False],
+             'path': [True, False],
+             'references': [False, True]},
+}
+
+
+def run_case(case):
+    '''
+    Runs a single benchmark case in this process and returns its results
+    '''
+    from catalogs import load_catalog
+    from measure import peak_rss_bytes
+    from satellite_czml import satellite_czml, REGIME_SETTINGS
+
+    tles = load_catalog(case['catalog'], case['count'])
+    regime_settings = None
+    if case['step'] is not None:
+        regime_settings = {regime: {'step': case['step']} for regime in REGIME_SETTINGS}
+
+    stages = {}
+    t = time.perf_counter()
+    czml_obj = satellite_czml(tle_list=tles,
+                              start_time=START_TIME,
+                              end_time=START_TIME + timedelta(hours=case['hours']),
+                              use_default_image=case['marker'] == 'billboard',
+                              show_label=case['label'],
+                              show_path=case['path'],
+                              regime_settings=regime_settings,
+                              use_references=case.get('references', False))
+    stages['parse'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    czml_obj.propagate()
+    stages['propagate'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    doc = czml_obj.build_document()
+    stages['build_packets'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    czml_string = str(doc)
+    stages['serialize'] = time.perf_counter() - t
+
+    return dict(case,
+                satellites=len(czml_obj.satellites),
+                wall_time=sum(stages.values()),
+                stages=stages,
+                peak_rss=peak_rss_bytes(),
+                bytes_out=len(czml_string.encode('utf-8')))
+
+
+def expand_cases(preset, grid=False, catalog='synthetic', overrides=None):
+    '''
+    Builds the list of cases: one dimension at a time around BASELINE,
+    or the full cartesian product when grid is True
+    '''
+    sweep = dict(PRESETS[preset], **(overrides or {}))
+    baseline = dict(BASELINE, catalog=catalog)
+
+    if grid:
+        keys = list(sweep)
+        return [dict(baseline, **dict(zip(keys, values)))
+                for values in itertools.product(*[sweep[k] for k in keys])]
+
+    cases = []
+    for key, values in sweep.items():
+        for value in values:
+            case = dict(baseline, **{key: value})
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+
+def case_key(case):
+    '''
+    Identifies a case independently of its results
+    '''
+    return tuple(case.get(k, BASELINE[k]) for k in sorted(BASELINE))
+
+
+def environment():
+    '''
+    Describes the environment so results from different runs can be told apart
+    '''
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                  capture_output=True, text=True).stdout.strip()
+    except OSError:
+        revision = ''
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': revision,
+            'timestamp': datetime.utcnow().isoformat()}
+
+
+def run_all(cases, repeat=1, out=sys.stdout):
+    '''
+    Runs every case in a fresh subprocess and writes one JSON line per case
+    '''
+    env = environment()
+    for case in cases:
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__),
+                                   '--run-case', json.dumps(case)],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                result = dict(case, error=proc.stderr.strip().splitlines()[-1:])
+            else:
+                result = json.loads(proc.stdout)
+            result['environment'] = env
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+
+
+def compare(before_path, after_path, threshold=1.1):
+    '''
+    Prints the wall time, peak RSS and output size ratios of two result files
+    and returns the number of cases slower than threshold
+    '''
+    def load(path):
+        results = {}
+        with open(path) as f:
+            for line in f:
+                r = json.loads(line)
+                if 'error' not in r:
+                    # Keep the fastest repeat of each case
+                    key = case_key(r)
+                    if key not in results or r['wall_time'] < results[key]['wall_time']:
+                        results[key] = r
+        return results
+
+    before, after = load(before_path), load(after_path)
+    regressions = 0
+    print(f"{'case':80s} {'time':>8s} {'rss':>8s} {'bytes':>8s}")
+    for key in before:
+        if key not in after:
+            continue
+        b, a = before[key], after[key]
+        ratios = [a[k] / b[k] if b[k] else float('nan') for k in ('wall_time', 'peak_rss', 'bytes_out')]
+        flag = ''
+        if ratios[0] > threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        label = ' '.join(f"{k}={v}" for k, v in zip(sorted(BASELINE), key))
+        print(f"{label:80s} {ratios[0]:8.2f} {ratios[1]:8.2f} {ratios[2]:8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    parser.add_argument('--grid', action='store_true',
+                        help='run the full cartesian product instead of one dimension at a time')
+    parser.add_argument('--catalog', default='synthetic',
+                        help='"synthetic" or a recorded TLE file (path or name in benchmarks/data)')
+    parser.add_argument('--count', type=int, nargs='+', help='override the satellite counts')
+    parser.add_argument('--hours', type=float, nargs='+', help='override the window lengths')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', help='write JSON lines here instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    parser.add_argument('--threshold', type=float, default=1.1,
+                        help='wall time ratio reported as a regression by --compare')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return 0
+
+    if args.compare:
+        return 1 if compare(*args.compare, threshold=args.threshold) else 0
+
+    overrides = {}
+    if args.count:
+        overrides['count'] = args.count
+    if args.hours:
+        overrides['hours'] = args.hours
+    cases = expand_cases(args.preset, args.grid, args.catalog, overrides)
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            run_all(cases, args.repeat, out)
+    else:
+        run_all(cases, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+'''
+Measures the cold start cost of "import satellite_czml".
+
+Every repeat imports the package in a fresh interpreter.  The script fails
+when a module that should only be imported on first use (see DEFERRED) is
+pulled in by the import, or when the median import time is over --max-ms
+(MAX_MS by default).
+
+    python benchmarks/bench_import.py --repeat 20 --max-ms 150
+'''
+
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+sys.path.insert(0, REPO_DIR)
+from satellite_czml.instrumentation import DEFERRED_MODULES as DEFERRED  # noqa: E402
+
+# Median import time (ms) above which the script fails by default
+MAX_MS = 100.0
+
+# Prints a repr rather than JSON, since json is one of the modules checked
+PROBE = '''
+import sys, time
+t = time.perf_counter()
+import satellite_czml
+seconds = time.perf_counter() - t
+print(repr({"seconds": seconds,
+            "loaded": [m for m in %r if m in sys.modules]}))
+''' % (DEFERRED,)
+
+
+def import_once():
+    '''
+    Imports the package in a new interpreter and returns its import time
+    and the deferred modules it loaded
+    '''
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [REPO_DIR] + [p for p in [os.environ.get('PYTHONPATH')] if p]))
+    proc = subprocess.run([sys.executable, '-c', PROBE], env=env,
+                          capture_output=True, text=True, check=True)
+    return ast.literal_eval(proc.stdout)
+
+
+def slowest_imports(limit=10):
+    '''
+    Returns the modules with the largest cumulative import time, using
+    python -X importtime
+    '''
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import satellite_czml'],
+                          env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=MAX_MS,
+                        help=f'fail when the median import time is above this (default {MAX_MS:g}, 0 turns it off)')
+    parser.add_argument('--profile', action='store_true',
+                        help='also list the slowest imports')
+    args = parser.parse_args()
+
+    runs = [import_once() for _ in range(args.repeat)]
+    times = [r['seconds'] * 1000 for r in runs]
+    loaded = sorted(set(m for r in runs for m in r['loaded']))
+    median = statistics.median(times)
+
+    print(f"import satellite_czml: median {median:.1f} ms, " +
+          f"min {min(times):.1f} ms, max {max(times):.1f} ms ({args.repeat} runs)")
+    if args.profile:
+        for micros, module in slowest_imports():
+            print(f"  {micros / 1000:8.1f} ms  {module}")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: modules meant to be imported on first use were loaded: {', '.join(loaded)}")
+        failed = True
+    if args.max_ms and median > args.max_ms:
+        print(f"FAIL: median import time {median:.1f} ms is above {args.max_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,24 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+'''
+Catalogs used by the benchmarks: the synthetic and recorded catalogs of
+satellite_czml.catalogs, with recorded TLE files looked up in
+benchmarks/data.
+'''
+
+import os
+
+from satellite_czml.catalogs import REGIME_MIX, make_tle, synthetic_catalog  # noqa: F401
+from satellite_czml.catalogs import load_catalog as _load_catalog
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def load_catalog(name, count=None, seed=0):
+    '''
+    Returns a catalog by name: "synthetic" or the path (or file name in
+    benchmarks/data) of a recorded TLE file, truncated to count entries
+    '''
+    return _load_catalog(name, count, seed, data_dir=DATA_DIR)
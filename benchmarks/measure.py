@@ -0,0 +1,18 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+'''
+Measurements shared by the benchmarks
+'''
+
+import resource
+import sys
+
+
+def peak_rss_bytes():
+    '''
+    Peak resident set size of this process in bytes
+    '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
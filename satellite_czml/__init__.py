@@ -1 +1,12 @@
 from .satellite_czml import *
+from .instrumentation import czml_observer, stats_observer
+from .loader import iter_czml, load_czml
+from .document import czml_document
+
+
+def __getattr__(name):
+    # propagation needs numpy, which is only imported on first use
+    if name == 'propagation_cache':
+        from .propagation import propagation_cache
+        return propagation_cache
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
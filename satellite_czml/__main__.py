@@ -0,0 +1,9 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
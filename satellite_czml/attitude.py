@@ -0,0 +1,92 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .propagation import teme_to_ecef
+
+import numpy as np
+
+# Both modes point the body +Z axis at the Earth (nadir).
+#   lvlh:     +Z nadir, +Y against the orbit normal, +X completes the
+#             frame (along the velocity for circular orbits)
+#   velocity: +X along the inertial velocity, +Z as close to nadir as
+#             possible, +Y completes the frame
+ATTITUDE_MODES = ('lvlh', 'velocity')
+
+
+def check_attitude_mode(mode):
+    '''
+    Checks the attitude mode is supported (None means no attitude)
+    '''
+    if mode is not None and mode not in ATTITUDE_MODES:
+        raise Exception(f"Attitude mode {mode} is not supported. Expected one of {list(ATTITUDE_MODES)}.")
+    return mode
+
+
+def _unit(v):
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def body_axes(positions, velocities, mode='lvlh'):
+    '''
+    Returns the body X, Y and Z axes as unit vectors in the frame of the
+    given positions and velocities, each shaped like them (..., 3)
+    '''
+    check_attitude_mode(mode)
+    nadir = -_unit(positions)
+    if mode == 'lvlh':
+        z = nadir
+        y = -_unit(np.cross(positions, velocities))
+        x = np.cross(y, z)
+    else:
+        x = _unit(velocities)
+        z = _unit(nadir - x * np.sum(nadir * x, axis=-1, keepdims=True))
+        y = np.cross(z, x)
+    return x, y, z
+
+
+def axes_to_quaternions(x, y, z):
+    '''
+    Converts rotation matrices given by their columns (the body axes) into
+    unit quaternions [X, Y, Z, W] using Shepperd's method, shaped (..., 4)
+    '''
+    m00, m10, m20 = x[..., 0], x[..., 1], x[..., 2]
+    m01, m11, m21 = y[..., 0], y[..., 1], y[..., 2]
+    m02, m12, m22 = z[..., 0], z[..., 1], z[..., 2]
+
+    # One candidate per largest diagonal term, all as [X, Y, Z, W] times 4s
+    with np.errstate(divide='ignore', invalid='ignore'):
+        candidates = np.stack([
+            np.stack([m21 - m12, m02 - m20, m10 - m01, 1 + m00 + m11 + m22], axis=-1),
+            np.stack([1 + m00 - m11 - m22, m01 + m10, m02 + m20, m21 - m12], axis=-1),
+            np.stack([m01 + m10, 1 + m11 - m00 - m22, m12 + m21, m02 - m20], axis=-1),
+            np.stack([m02 + m20, m12 + m21, 1 + m22 - m00 - m11, m10 - m01], axis=-1),
+        ], axis=-2)
+        best = np.argmax(np.stack([m00 + m11 + m22, m00, m11, m22], axis=-1), axis=-1)
+        q = np.take_along_axis(candidates, best[..., None, None], axis=-2)[..., 0, :]
+        return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def continuous_quaternions(q):
+    '''
+    Flips the sign of quaternions shaped (..., times, 4) where needed so
+    consecutive samples are on the same hemisphere and interpolate the
+    short way round
+    '''
+    if q.shape[-2] < 2:
+        return q
+    dots = np.sum(q[..., 1:, :] * q[..., :-1, :], axis=-1)
+    signs = np.cumprod(np.where(dots < 0, -1.0, 1.0), axis=-1)
+    q = q.copy()
+    q[..., 1:, :] *= signs[..., None]
+    return q
+
+
+def attitude_quaternions(positions, velocities, jd, fr, mode='lvlh'):
+    '''
+    Computes the attitude of every sample of TEME positions and velocities
+    shaped (satellites, times, 3) as unit quaternions rotating the body
+    frame into the Earth fixed frame, shaped (satellites, times, 4)
+    '''
+    axes = [teme_to_ecef(axis, jd, fr) for axis in body_axes(positions, velocities, mode)]
+    return continuous_quaternions(axes_to_quaternions(*axes))
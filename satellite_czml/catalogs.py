@@ -0,0 +1,75 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+'''
+Test and benchmark catalogs.  Synthetic catalogs are generated from a fixed
+seed with a realistic mix of orbit regimes so results are comparable between
+runs.  Recorded catalogs are plain TLE files (e.g. saved from Celestrak or
+Space-Track) read from disk, so everything runs offline.
+'''
+
+from .satellite_czml import tle_checksum
+
+import os
+import random
+
+# (fraction, mean motion range, eccentricity range, inclination range)
+REGIME_MIX = {
+    'LEO': (0.85, (13.0, 16.0), (0.0, 0.02), (0.0, 100.0)),
+    'MEO': (0.05, (1.5, 11.25), (0.0, 0.02), (50.0, 65.0)),
+    'GEO': (0.07, (1.0025, 1.0030), (0.0, 0.001), (0.0, 5.0)),
+    'HEO': (0.03, (1.9, 2.1), (0.6, 0.75), (60.0, 65.0)),
+}
+
+
+def make_tle(norad_id, inclination, raan, eccentricity, arg_perigee, mean_anomaly,
+             mean_motion, epoch='21016.50000000', name=None):
+    '''
+    Builds a [name, line1, line2] TLE entry from mean elements
+    '''
+    line1 = (f"1 {norad_id:05d}U 21001A   {epoch}  .00000000  00000-0  00000-0 0  999")
+    line1 += str(tle_checksum(line1))
+    line2 = (f"2 {norad_id:05d} {inclination:8.4f} {raan:8.4f} {int(round(eccentricity * 1e7)):07d} " +
+             f"{arg_perigee:8.4f} {mean_anomaly:8.4f} {mean_motion:11.8f}    1")
+    line2 = line2.ljust(68)[:68]
+    line2 += str(tle_checksum(line2))
+    return [name or f"SYNTH {norad_id}", line1, line2]
+
+
+def synthetic_catalog(count, seed=0):
+    '''
+    Generates count TLE entries with the regime mix in REGIME_MIX
+    '''
+    if not 0 < count <= 99999:
+        raise Exception(f"Synthetic catalogs support 1 to 99999 satellites. Got: {count}")
+    rng = random.Random(seed)
+    regimes = list(REGIME_MIX)
+    weights = [REGIME_MIX[r][0] for r in regimes]
+
+    tles = []
+    for norad_id in range(1, count + 1):
+        _, mm, ecc, inc = REGIME_MIX[rng.choices(regimes, weights)[0]]
+        tles.append(make_tle(norad_id,
+                             inclination=rng.uniform(*inc),
+                             raan=rng.uniform(0, 360),
+                             eccentricity=rng.uniform(*ecc),
+                             arg_perigee=rng.uniform(0, 360),
+                             mean_anomaly=rng.uniform(0, 360),
+                             mean_motion=rng.uniform(*mm)))
+    return tles
+
+
+def load_catalog(name, count=None, seed=0, data_dir=None):
+    '''
+    Returns a catalog by name: "synthetic" or the path (or file name in
+    data_dir) of a recorded TLE file, truncated to count entries
+    '''
+    from .cli import read_tle
+
+    if name == 'synthetic':
+        return synthetic_catalog(count or 1000, seed)
+
+    path = name if os.path.exists(name) or data_dir is None else os.path.join(data_dir, name)
+    tles = read_tle(path)
+    return tles[:count] if count else tles
@@ -0,0 +1,427 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+'''
+Converts TLE or OMM files into CZML.
+
+    satellite-czml stations.txt -o stations.czml
+    satellite-czml active.txt --start 2021-01-16T00:00:00Z --hours 6 -o active.czml.gz
+    satellite-czml starlink.xml oneweb.csv --shard-by group -o constellations.czml --workers 4
+    satellite-czml active.json --shard-by count --shard-size 2000 -o active.czml.gz --stats
+    satellite-czml tles/ -o live.czml --watch --delta
+    satellite-czml active.txt --columnar active.parquet --geodetic
+
+Files ending in .xml, .csv or .json are read as OMM (e.g. from Celestrak),
+anything else as 2 or 3 line TLEs.  With --shard-by, one CZML document is
+written per shard (e.g. active-0.czml.gz, active-1.czml.gz, ...) so clients
+can load them in parallel; --workers builds shards (or parts of a single
+document) in separate processes.  Directories are read file by file.
+
+--columnar writes the propagated positions as a table (.npz, .parquet or
+.csv) next to the CZML, or instead of it when there is no --output.
+
+With --watch, the inputs are polled and only satellites whose element
+sets changed (by NORAD ID and epoch) are rebuilt.  The output is replaced
+atomically each time, and --delta also writes the changes as numbered
+delta documents (e.g. live-delta-1.czml) for clients to process.
+'''
+
+from .isotime import format_iso, parse_iso
+from .writers import COMPRESSIONS, check_compression, compression_for, iter_compressed, write_chunks
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+SHARD_MODES = ('group', 'norad', 'count')
+
+
+def read_tle(path):
+    '''
+    Reads a 3 line (name, line1, line2) or 2 line TLE file.  Satellites
+    without a name are named after their catalog number.
+    '''
+    with open(path) as f:
+        lines = [line.rstrip() for line in f if line.strip()]
+
+    tles = []
+    i = 0
+    while i < len(lines):
+        if lines[i].startswith('1 ') and i + 1 < len(lines) and lines[i + 1].startswith('2 '):
+            tles.append([lines[i][2:7].strip(), lines[i], lines[i + 1]])
+            i += 2
+        else:
+            tles.append(lines[i:i + 3])
+            i += 3
+    return tles
+
+
+def read_omm(path):
+    '''
+    Reads an OMM file (XML, CSV or a JSON list) and converts each element
+    set into [name, line1, line2]
+    '''
+    from sgp4 import exporter, omm
+    from sgp4.api import Satrec
+
+    with open(path) as f:
+        if path.endswith('.xml'):
+            records = list(omm.parse_xml(f))
+        elif path.endswith('.csv'):
+            records = list(omm.parse_csv(f))
+        else:
+            records = json.load(f)
+
+    tles = []
+    for fields in records:
+        fields = {k: str(v) for k, v in fields.items()}
+        satrec = Satrec()
+        omm.initialize(satrec, fields)
+        line1, line2 = exporter.export_tle(satrec)
+        tles.append([fields.get('OBJECT_NAME') or fields['NORAD_CAT_ID'], line1, line2])
+    return tles
+
+
+def input_files(inputs):
+    '''
+    Expands directories in the inputs into the files in them
+    '''
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if not name.startswith('.') and os.path.isfile(os.path.join(path, name)))
+        else:
+            paths.append(path)
+    return paths
+
+
+def read_elements(path):
+    '''
+    Reads a TLE or OMM file, choosing the format from its extension
+    '''
+    if path.endswith(('.xml', '.csv', '.json')):
+        return read_omm(path)
+    return read_tle(path)
+
+
+def norad_id(tle):
+    return int(tle[1][2:7])
+
+
+def make_shards(groups, shard_by=None, shard_size=None):
+    '''
+    Splits {group name: tles} into [(shard name, tles)].  Shards by input
+    file (group), by NORAD catalog number ranges of shard_size, or into
+    pieces of shard_size satellites (count).  None gives a single shard.
+    '''
+    tles = [tle for group in groups.values() for tle in group]
+    if shard_by is None:
+        return [(None, tles)]
+    if shard_by == 'group':
+        return [(name, group) for name, group in groups.items() if group]
+
+    if shard_size is None or shard_size < 1:
+        raise Exception(f"Sharding by {shard_by} needs a positive shard_size. Got: {shard_size}")
+    if shard_by == 'count':
+        return [(str(i), tles[start:start + shard_size])
+                for i, start in enumerate(range(0, len(tles), shard_size))]
+
+    ranges = {}
+    for tle in sorted(tles, key=norad_id):
+        ranges.setdefault(norad_id(tle) // shard_size, []).append(tle)
+    return [(f"{r * shard_size:05d}-{(r + 1) * shard_size - 1:05d}", shard)
+            for r, shard in ranges.items()]
+
+
+def shard_path(output, name):
+    '''
+    Inserts the shard name before the extensions: out.czml.gz -> out-name.czml.gz
+    '''
+    if name is None:
+        return output
+    directory, base = os.path.split(output)
+    stem, dot, extensions = base.partition('.')
+    return os.path.join(directory, f"{stem}-{name}{dot}{extensions}")
+
+
+def czml_arguments(options):
+    '''
+    Turns the options into satellite_czml keyword arguments
+    '''
+    return {'start_time': parse_iso(options['start']),
+            'end_time': parse_iso(options['end']),
+            'use_default_image': not options['point'],
+            'show_label': not options['no_label'],
+            'show_path': not options['no_path'],
+            'ignore_bad_tles': options['ignore_bad_tles'],
+            'region': options['region'],
+            'min_elevation': options['min_elevation'],
+            'use_velocity': options['use_velocity'],
+            'use_references': options['references'],
+            'speed_multiplier': options['speed'],
+            'seed': options['seed']}
+
+
+def build_czml(tles, options, observer=None, colors=None):
+    '''
+    Creates the satellite_czml object for a list of TLEs and the options
+    '''
+    from .satellite_czml import satellite_czml
+
+    return satellite_czml(tle_list=tles, observer=observer, color_list=colors, **czml_arguments(options))
+
+
+def run_job(job):
+    '''
+    Builds one shard, or one part of a single document, in a worker
+    process.  Shards are written straight to their file.  Parts are
+    written as comma separated packets to a temporary file (only the first
+    part keeps the document packet) with the colors the whole document
+    gives its satellites.  A columnar table is written too if the job has
+    one.  Returns the job name, its output and the stats as
+    a dict.
+    '''
+    from .czml import _json
+    from .instrumentation import stats_observer
+
+    observer = stats_observer()
+    czml_obj = build_czml(job['tles'], job['options'], observer, job.get('colors'))
+    if job.get('columnar'):
+        czml_obj.write_columnar(job['columnar'], geodetic=job['options']['geodetic'],
+                                velocities=job['options']['velocities'])
+    if job['path'] is None:
+        return job['name'], None, observer.as_dict()
+    if job['part'] is None:
+        czml_obj.write_czml(job['path'], job['compression'], job['level'])
+    else:
+        # Style packet ids must not clash between parts of one document
+        czml_obj.style_prefix = f"style{job['part']}"
+        dumps = _json().dumps
+        with open(job['path'], 'w', encoding='utf-8') as f:
+            separator = ''
+            for i, packet in enumerate(czml_obj.iter_packets(release=True)):
+                if i == 0 and job['part'] > 0:
+                    continue
+                f.write(separator + dumps(packet.data()))
+                separator = ', '
+    return job['name'], job['path'], observer.as_dict()
+
+
+def iter_parts(paths, chunk_size=1 << 20):
+    '''
+    Yields the text of a document assembled from part files
+    '''
+    yield '['
+    first = True
+    for path in paths:
+        if os.path.getsize(path) == 0:
+            continue
+        if not first:
+            yield ', '
+        first = False
+        with open(path, encoding='utf-8') as f:
+            while True:
+                text = f.read(chunk_size)
+                if not text:
+                    break
+                yield text
+    yield ']'
+
+
+def combine_stats(results):
+    '''
+    Adds up the stage times and counters of several jobs
+    '''
+    stages, counters, failed, trimmed = {}, {}, {}, {}
+    for _, _, stats in results:
+        for stage, seconds in stats['stages'].items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+        for name, value in stats['counters'].items():
+            counters[name] = counters.get(name, 0) + value
+        failed.update(stats['failed'])
+        trimmed.update(stats.get('trimmed', {}))
+    return {'stages': stages, 'counters': counters, 'failed': failed, 'trimmed': trimmed}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='satellite-czml', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='TLE or OMM (.xml, .csv, .json) files or directories')
+    parser.add_argument('-o', '--output', help='CZML file to write; .gz, .zz and .br are compressed')
+    parser.add_argument('--columnar', help='also write the positions to a .npz, .parquet or .csv table')
+    parser.add_argument('--geodetic', action='store_true', help='add lat, lon and alt columns to --columnar')
+    parser.add_argument('--velocities', action='store_true', help='add vx, vy and vz columns to --columnar')
+    parser.add_argument('--start', help='ISO 8601 start of the time window (default: now)')
+    parser.add_argument('--end', help='ISO 8601 end of the time window')
+    parser.add_argument('--hours', type=float, help='window length when --end is not given (default: 24)')
+    parser.add_argument('--speed', type=float, help='clock speed multiplier')
+    parser.add_argument('--seed', type=int, help='seed for the random satellite colors')
+    parser.add_argument('--point', action='store_true', help='draw points instead of billboards')
+    parser.add_argument('--no-label', action='store_true', help='hide the labels')
+    parser.add_argument('--no-path', action='store_true', help='hide the orbit paths')
+    parser.add_argument('--use-velocity', action='store_true',
+                        help='write velocities too where they save position samples (Hermite interpolation)')
+    parser.add_argument('--references', action='store_true',
+                        help='share repeated style values through CZML references')
+    parser.add_argument('--region', type=float, nargs=4, metavar=('WEST', 'SOUTH', 'EAST', 'NORTH'),
+                        help='only keep satellites visible from this region')
+    parser.add_argument('--min-elevation', type=float, default=0,
+                        help='minimum elevation (degrees) for --region')
+    parser.add_argument('--ignore-bad-tles', action='store_true',
+                        help='skip satellites that fail instead of stopping')
+    parser.add_argument('--compression', choices=sorted(COMPRESSIONS),
+                        help='override the compression picked from the output extension')
+    parser.add_argument('--level', type=int, help='compression level')
+    parser.add_argument('--shard-by', choices=SHARD_MODES,
+                        help='write one document per input file (group), NORAD range or count')
+    parser.add_argument('--shard-size', type=int,
+                        help='satellites per shard (count) or catalog numbers per shard (norad)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes')
+    parser.add_argument('--stats', action='store_true', help='print timings and counters to stderr')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep polling the inputs and rebuild only the satellites that changed')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between polls with --watch')
+    parser.add_argument('--delta', action='store_true',
+                        help='with --watch, also write each change as a numbered delta document')
+    return parser
+
+
+def check_args(parser, args):
+    '''
+    Checks the options that argparse can't check on its own, exiting
+    with a usage error if they don't fit together
+    '''
+    from .writers import check_compression
+
+    if args.output is None and args.columnar is None:
+        parser.error("nothing to write: give an --output, a --columnar file or both")
+    if args.watch:
+        if args.output is None or args.columnar is not None:
+            parser.error("--watch needs an --output and can't write --columnar")
+        if args.shard_by is not None or args.workers > 1:
+            parser.error("--watch writes a single document and can't be combined with --shard-by or --workers")
+    if args.shard_by in ('norad', 'count') and (args.shard_size is None or args.shard_size < 1):
+        parser.error(f"--shard-by {args.shard_by} needs a positive --shard-size. Got: {args.shard_size}")
+    if args.columnar is not None and args.shard_by is None and args.workers > 1:
+        parser.error("--columnar with --workers needs --shard-by, so each shard writes its own table")
+    compression = args.compression or compression_for(args.output or '')
+    if compression is not None:
+        try:
+            check_compression(compression, args.level)
+        except Exception as e:
+            parser.error(str(e))
+    return compression
+
+
+def parse_args(argv=None):
+    '''
+    Parses and checks the command line, returning the arguments and the
+    compression to write with
+    '''
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    return args, check_args(parser, args)
+
+
+def watch(args, options, compression):
+    '''
+    Runs the watch mode until interrupted
+    '''
+    from .instrumentation import stats_observer
+    from .watch import czml_watcher
+
+    observer = stats_observer() if args.stats else None
+    watcher = czml_watcher(args.inputs, args.output, delta=args.delta, compression=compression,
+                           level=args.level, observer=observer, **czml_arguments(options))
+    try:
+        watcher.run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    if observer is not None:
+        print(json.dumps(observer.as_dict(), indent=2), file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    args, compression = parse_args(argv)
+    started = time.perf_counter()
+
+    groups = {}
+    for path in input_files(args.inputs):
+        name = os.path.basename(path).partition('.')[0]
+        while name in groups:
+            name += '_'
+        groups[name] = read_elements(path)
+
+    # Fix the window here so every worker uses the same one
+    start_time = parse_iso(args.start) if args.start else datetime.now(timezone.utc).replace(microsecond=0)
+    end_time = parse_iso(args.end) if args.end else start_time + timedelta(hours=args.hours or 24.0)
+    options = {'start': format_iso(start_time), 'end': format_iso(end_time),
+               'point': args.point, 'no_label': args.no_label, 'no_path': args.no_path,
+               'ignore_bad_tles': args.ignore_bad_tles, 'region': args.region,
+               'min_elevation': args.min_elevation, 'use_velocity': args.use_velocity,
+               'references': args.references, 'speed': args.speed, 'seed': args.seed,
+               'geodetic': args.geodetic, 'velocities': args.velocities}
+    if args.watch:
+        return watch(args, options, compression)
+    shards = make_shards(groups, args.shard_by, args.shard_size)
+    workers = max(1, args.workers)
+
+    temp_dir = None
+    if args.shard_by is None and workers > 1:
+        # Build one document in parts, one per worker
+        temp_dir = tempfile.mkdtemp(prefix='satellite_czml_')
+        tles = shards[0][1]
+        size = -(-len(tles) // workers)
+        # Colors follow the satellites' place in the whole document
+        from .satellite_czml import random_colors
+        colors = random_colors(len(tles), args.seed)
+        jobs = [{'name': str(i), 'tles': tles[start:start + size], 'colors': colors[start:start + size],
+                 'options': options, 'part': i, 'path': os.path.join(temp_dir, f"part-{i}.json")}
+                for i, start in enumerate(range(0, max(len(tles), 1), size or 1))]
+    else:
+        jobs = [{'name': name, 'tles': shard_tles, 'options': options, 'part': None,
+                 'path': args.output and shard_path(args.output, name),
+                 'columnar': args.columnar and shard_path(args.columnar, name),
+                 'compression': compression, 'level': args.level}
+                for name, shard_tles in shards]
+
+    try:
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(run_job, jobs))
+        else:
+            results = [run_job(job) for job in jobs]
+
+        if temp_dir is not None:
+            texts = iter_parts([path for _, path, _ in results])
+            chunks = texts if compression is None else iter_compressed(texts, compression, args.level)
+            write_chunks(chunks, args.output)
+            written = [args.output]
+        else:
+            written = [path for _, path, _ in results if path is not None]
+        if args.columnar is not None:
+            written += [job['columnar'] for job in jobs]
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if args.stats:
+        stats = combine_stats(results)
+        stats['wall_seconds'] = time.perf_counter() - started
+        stats['workers'] = workers
+        stats['outputs'] = {path: os.path.getsize(path) for path in written}
+        print(json.dumps(stats, indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .propagation import ecef_to_geodetic, julian_dates, teme_to_ecef
+
+import numpy as np
+import os
+import shutil
+import tempfile
+import zipfile
+
+# Supported columnar formats by file extension.  Parquet needs the
+# optional pyarrow package.
+COLUMNAR_FORMATS = {'.npz': 'npz', '.parquet': 'parquet', '.csv': 'csv'}
+
+
+def columnar_format(path):
+    '''
+    Picks the columnar format from a file name (e.g. "out.parquet")
+    '''
+    for extension, format in COLUMNAR_FORMATS.items():
+        if str(path).endswith(extension):
+            return format
+    raise Exception(f"Can't tell the columnar format of {path}. Expected one of {list(COLUMNAR_FORMATS)}.")
+
+
+def column_types(geodetic=False, velocities=False):
+    '''
+    Returns the columns written, with their numpy types
+    '''
+    columns = {'id': np.int64, 'time': 'datetime64[us]', 'x': np.float64, 'y': np.float64, 'z': np.float64}
+    if velocities:
+        columns.update({'vx': np.float64, 'vy': np.float64, 'vz': np.float64})
+    if geodetic:
+        columns.update({'lat': np.float64, 'lon': np.float64, 'alt': np.float64})
+    return {name: np.dtype(dtype) for name, dtype in columns.items()}
+
+
+def iter_batches(satellites, geodetic=False, velocities=False, batch_size=1000):
+    '''
+    Yields the propagated samples of the satellites as dicts of column
+    arrays (see column_types), batch_size satellites at a time.  Positions
+    and velocities are TEME (m and m/s), latitude and longitude are WGS84
+    degrees and altitude is meters.  Samples sgp4 could not propagate are
+    left out.
+    '''
+    groups = {}
+    for sat in satellites:
+        groups.setdefault(sat.sample_key, []).append(sat)
+
+    for (start_time, _, _), sats in groups.items():
+        offsets = sats[0].sample_offsets
+        start = np.datetime64(start_time.replace(tzinfo=None) - start_time.utcoffset(), 'us')
+        times = start + np.round(offsets * 1e6).astype('timedelta64[us]')
+        jd, fr = julian_dates(start_time, offsets)
+        for first in range(0, len(sats), batch_size):
+            batch = sats[first:first + batch_size]
+            valid = np.stack([sat.sample_valid for sat in batch])
+            positions = np.stack([sat.sample_positions for sat in batch])
+            columns = {'id': np.repeat(np.array([sat.id for sat in batch], dtype=np.int64), valid.sum(axis=1)),
+                       'time': np.broadcast_to(times, valid.shape)[valid]}
+            for axis, name in enumerate('xyz'):
+                columns[name] = positions[..., axis][valid]
+            if velocities:
+                sat_velocities = np.stack([sat.sample_velocities for sat in batch])
+                for axis, name in enumerate(['vx', 'vy', 'vz']):
+                    columns[name] = sat_velocities[..., axis][valid]
+            if geodetic:
+                lat, lon, alt = ecef_to_geodetic(teme_to_ecef(positions, jd, fr))
+                columns.update({'lat': lat[valid], 'lon': lon[valid], 'alt': alt[valid]})
+            yield columns
+
+
+def count_rows(satellites):
+    '''
+    Number of rows iter_batches yields for the satellites
+    '''
+    return int(sum(np.count_nonzero(sat.sample_valid) for sat in satellites))
+
+
+def write_npz(path, batches, types, rows, compressed=False):
+    '''
+    Writes the batches to a .npz file (as np.savez would).  Each column is
+    streamed into its own .npy file first, so only one batch is held in
+    memory, then the files are zipped together.
+    '''
+    temp_dir = tempfile.mkdtemp(prefix='satellite_czml_')
+    files = {}
+    try:
+        for name, dtype in types.items():
+            files[name] = open(os.path.join(temp_dir, name + '.npy'), 'wb')
+            np.lib.format.write_array_header_1_0(files[name], {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                               'fortran_order': False, 'shape': (rows,)})
+        for columns in batches:
+            for name, f in files.items():
+                f.write(np.ascontiguousarray(columns[name], dtype=types[name]).tobytes())
+        for f in files.values():
+            f.close()
+
+        compression = zipfile.ZIP_DEFLATED if compressed else zipfile.ZIP_STORED
+        with zipfile.ZipFile(path, 'w', compression, allowZip64=True) as archive:
+            for name in types:
+                archive.write(os.path.join(temp_dir, name + '.npy'), name + '.npy')
+    finally:
+        for f in files.values():
+            f.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return rows
+
+
+def write_parquet(path, batches, types):
+    '''
+    Writes the batches to a Parquet file, one row group per batch
+    '''
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Parquet output needs the pyarrow package: pip install pyarrow")
+
+    schema = pa.schema([(name, pa.timestamp('us', tz='UTC') if dtype.kind == 'M' else pa.from_numpy_dtype(dtype))
+                        for name, dtype in types.items()])
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for columns in batches:
+            writer.write_table(pa.table({name: pa.array(columns[name], type=schema.field(name).type)
+                                         for name in types}, schema=schema))
+            rows += len(columns['id'])
+    return rows
+
+
+def write_csv(path, batches, types):
+    '''
+    Writes the batches to a CSV file with a header line and ISO 8601 times
+    '''
+    formats = {'id': '%d', 'time': '%sZ'}
+    line = ','.join(formats.get(name, '%.3f' if name in ('x', 'y', 'z', 'alt') else '%.6f') for name in types)
+    rows = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(types) + '\n')
+        for columns in batches:
+            # Whole seconds unless some time has a fraction
+            unit = 'us' if (columns['time'].astype(np.int64) % 1000000).any() else 's'
+            columns = dict(columns, time=np.datetime_as_string(columns['time'], unit=unit))
+            values = [columns[name].tolist() for name in types]
+            f.write(''.join([line % row + '\n' for row in zip(*values)]))
+            rows += len(columns['id'])
+    return rows
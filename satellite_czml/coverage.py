@@ -0,0 +1,175 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .czml import CZMLPacket, Polygon
+from .propagation import WGS84_E2
+from .region import EARTH_RADIUS, check_region, footprint_angle
+from .sensors import sensor_central_angle
+
+import numpy as np
+
+
+class coverage_accumulator():
+    '''
+    Accumulates how long each cell of a latitude/longitude grid is seen by
+    at least one satellite.  A cell is seen when its center is inside a
+    satellite's sensor footprint (half_angle degrees from nadir) or, with
+    no half_angle, above min_elevation degrees over the horizon.
+
+    Each footprint is painted onto the grid as one longitude range per
+    latitude row, and times are processed in chunks so no intermediate
+    array has more than about max_elements values.
+    '''
+
+    def __init__(self, resolution=1.0, region=None, half_angle=None, min_elevation=0.0,
+                 max_elements=1 << 24):
+        if resolution <= 0:
+            raise Exception(f"Coverage grid resolution must be positive. Got: {resolution}")
+        if half_angle is not None and not 0 < half_angle < 90:
+            raise Exception(f"Sensor half_angle must be between 0 and 90 degrees. Got: {half_angle}")
+        west, south, east, north = check_region(region or [-180, -90, 180, 90])
+        if east <= west:
+            east += 360
+
+        self.resolution = resolution
+        self.half_angle = half_angle
+        self.min_elevation = min_elevation
+        self.max_elements = max_elements
+
+        # Cell edges and centers (degrees)
+        self.lat_edges = np.arange(south, north + resolution / 2, resolution).clip(south, north)
+        self.lon_edges = np.arange(west, east + resolution / 2, resolution).clip(west, east)
+        if len(self.lat_edges) < 2 or len(self.lon_edges) < 2:
+            raise Exception(f"The region is smaller than one grid cell: {region}")
+        self.lat = (self.lat_edges[1:] + self.lat_edges[:-1]) / 2
+        self.lon = np.mod((self.lon_edges[1:] + self.lon_edges[:-1]) / 2 + 180, 360) - 180
+
+        # Footprints are spherical caps around the geocentric sub-satellite
+        # point, so rows are compared by geocentric latitude
+        self.row_lat = np.arctan((1 - WGS84_E2) * np.tan(np.radians(self.lat)))
+        centers = (self.lon_edges[1:] + self.lon_edges[:-1]) / 2
+        self.first_lon = centers[0]
+        self.lon_offsets = np.append(np.arange(len(centers) - 1) * resolution, centers[-1] - centers[0])
+        self.reset()
+
+    @property
+    def shape(self):
+        return (len(self.lat), len(self.lon))
+
+    def reset(self):
+        '''
+        Clears the accumulated coverage
+        '''
+        self.seconds = np.zeros(self.shape)
+        self.total_seconds = 0.0
+        return True
+
+    def add(self, positions, durations):
+        '''
+        Adds Earth fixed satellite positions (m) shaped (satellites, times, 3),
+        each time counting for durations seconds.  Positions that are NaN
+        (e.g. outside a satellite's samples) see nothing.
+        '''
+        positions = np.asarray(positions, dtype=float)
+        durations = np.asarray(durations, dtype=float)
+        distance = np.linalg.norm(positions, axis=-1)
+        if self.half_angle is not None:
+            reach = sensor_central_angle(distance, self.half_angle)
+        else:
+            reach = footprint_angle(distance - EARTH_RADIUS, self.min_elevation)
+        with np.errstate(invalid='ignore'):
+            sub_lat = np.arcsin(positions[..., 2] / distance)
+        sub_lon = np.degrees(np.arctan2(positions[..., 1], positions[..., 0]))
+
+        n_sats, n_times = distance.shape
+        n_rows, n_cols = self.shape
+        row_size = n_rows * (n_cols + 1)
+        time_block = max(1, min(n_times, self.max_elements // max(n_sats * n_rows, row_size)))
+        sin_row, cos_row = np.sin(self.row_lat), np.cos(self.row_lat)
+
+        for t in range(0, n_times, time_block):
+            chunk = slice(t, t + time_block)
+            n_chunk = len(durations[chunk])
+
+            # Each footprint covers a longitude range of every row it reaches:
+            # cos(dlon) >= k, which is none of the row for k > 1 and all of
+            # it for k < -1 (e.g. rows around a pole inside the footprint)
+            lat0 = sub_lat[:, chunk, None]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                k = ((np.cos(reach[:, chunk, None]) - np.sin(lat0) * sin_row) /
+                     (np.cos(lat0) * cos_row))
+            sat, time, row = np.nonzero(k <= 1)
+            half = np.degrees(np.arccos(np.maximum(k[sat, time, row], -1)))
+
+            # Paint each range (split where it wraps past 360 degrees) into a
+            # difference array per time and row, then a running sum marks
+            # the covered cells
+            a = np.mod(sub_lon[sat, t + time] - half - self.first_lon, 360)
+            b = a + 2 * half
+            row_index = (time * n_rows + row) * (n_cols + 1)
+            diff = np.zeros(n_chunk * row_size)
+            for start, end in ((a, np.minimum(b, 360)), (np.zeros_like(a), b - 360)):
+                first, last = self.__columns(start, end)
+                valid = first < last
+                diff += np.bincount(row_index[valid] + first[valid], minlength=diff.size)
+                diff -= np.bincount(row_index[valid] + last[valid], minlength=diff.size)
+
+            covered = np.cumsum(diff.reshape(n_chunk, n_rows, n_cols + 1), axis=-1)[..., :n_cols] > 0
+            self.seconds += np.tensordot(durations[chunk], covered, axes=1)
+        self.total_seconds += float(durations.sum())
+        return True
+
+    def __columns(self, start, end):
+        '''
+        Returns the first and one past the last column whose center is
+        between start and end degrees east of the first center.  Same as
+        searchsorted on lon_offsets, but cheaper as only the last column
+        can be narrower than the resolution.
+        '''
+        n_cols, last_offset = len(self.lon_offsets), self.lon_offsets[-1]
+        first = np.ceil(start / self.resolution)
+        first = np.where(first < n_cols - 1, first, np.where(start <= last_offset, n_cols - 1, n_cols))
+        last = np.clip(np.floor(end / self.resolution) + 1, 0, n_cols - 1) + (end >= last_offset)
+        return first.astype(np.int64), last.astype(np.int64)
+
+    def get_minutes(self):
+        '''
+        Returns the minutes each cell was covered as a (lat, lon) array
+        '''
+        return self.seconds / 60
+
+    def get_minutes_per_day(self):
+        '''
+        Returns the average minutes per day each cell was covered
+        '''
+        if not self.total_seconds:
+            return self.get_minutes()
+        return self.get_minutes() * 86400 / self.total_seconds
+
+    def build_packets(self, id_prefix='coverage', per_day=True, alpha=160):
+        '''
+        Creates one polygon packet per covered cell, colored from blue
+        (least) to red (most covered)
+        '''
+        minutes = self.get_minutes_per_day() if per_day else self.get_minutes()
+        most = minutes.max()
+        unit = 'minutes per day' if per_day else 'minutes'
+
+        packets = []
+        for i, j in zip(*np.nonzero(minutes)):
+            value = minutes[i, j]
+            level = value / most
+            south, north = self.lat_edges[i], self.lat_edges[i + 1]
+            west, east = self.lon_edges[j], self.lon_edges[j + 1]
+
+            polygon = Polygon()
+            polygon.positions = {"cartographicDegrees": [float(x) for x in (west, south, 0, east, south, 0,
+                                                                            east, north, 0, west, north, 0)]}
+            polygon.material = {"solidColor": {"color": {"rgba": [int(255 * level), 0,
+                                                                  int(255 * (1 - level)), alpha]}}}
+            packet = CZMLPacket(id=f"{id_prefix}-{i}-{j}")
+            packet.description = f"{value:.1f} {unit}"
+            packet.polygon = polygon
+            packets.append(packet)
+        return packets
@@ -26,17 +26,12 @@ try:
     from itertools import izip_longest
 except ImportError:
     from itertools import zip_longest as izip_longest
-try:
-    import simplejson as json
-except ImportError:
-    import json
 
 from datetime import date, datetime
+from functools import lru_cache
+from operator import attrgetter
 
-import dateutil.parser
-from pygeoif import geometry
-from pygeoif.geometry import as_shape as asShape
-from pytz import utc
+from .isotime import format_iso, parse_iso, parse_time
 
 try:
     long
@@ -56,6 +51,25 @@ except NameError:
 
 
 
+@lru_cache(maxsize=None)
+def _json():
+    """simplejson when it is installed, otherwise json.  Imported on
+    first use as it is only needed to read or write documents.
+    """
+    try:
+        import simplejson as json
+    except ImportError:
+        import json
+    return json
+
+
+def asShape(obj):
+    """pygeoif is imported on first use as only geometry inputs need it.
+    """
+    from pygeoif.geometry import as_shape
+    return as_shape(obj)
+
+
 def grouper(iterable, n, fillvalue=None):
     args = [iter(iterable)] * n
     return izip_longest(*args, fillvalue=fillvalue)
@@ -81,6 +95,9 @@ def class_property(cls, name, doc=None):
             m = cls()
             m.load(val)
             setattr(self, hidden_attribute, m)
+        elif isinstance(val, list) and val and all(
+                isinstance(v, dict) and 'interval' in v for v in val):
+            setattr(self, hidden_attribute, _Intervals(cls, val))
         elif val is None:
             setattr(self, hidden_attribute, None)
         else:
@@ -102,7 +119,7 @@ def datetime_property(name, allow_offset=False, doc=None):
     def getter(self):
         val = getattr(self, reserved_name)
         if isinstance(val, (date, datetime)):
-            return val.isoformat()
+            return format_iso(val)
         elif allow_offset and isinstance(val, (int, long, float)):
             return val
 
@@ -115,12 +132,9 @@ def datetime_property(name, allow_offset=False, doc=None):
             setattr(self, reserved_name, dt)
         elif isinstance(dt, basestring):
             if allow_offset:
-                try:
-                    dt = float(dt)
-                except ValueError:
-                    dt = dateutil.parser.parse(dt)
+                dt = parse_time(dt)
             else:
-                dt = dateutil.parser.parse(dt)
+                dt = parse_iso(dt)
             setattr(self, reserved_name, dt)
         else:
             raise ValueError
@@ -132,11 +146,71 @@ material_property = lambda x: class_property(Material, x)
 position_property = lambda x: class_property(Position, x)
 
 
-class _CZMLBaseObject(object):
+class _CZMLMeta(type):
+    """Builds the class level property tables of the CZML object model.
+
+    Plain class attributes (e.g. ``show = None``) are turned into
+    ``__slots__`` with their value kept as the per instance default, and
+    every name in ``_properties`` that is not a property gets a slot too.
+    The resolved property names are stored once per class together with
+    an ``attrgetter`` that reads them all in a single call, so ``data()``
+    and ``load()`` don't have to reflect over the instance.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        defaults = {}
+        for base in reversed(bases):
+            defaults.update(getattr(base, '_slot_defaults', {}))
+
+        def inherited(attr):
+            return any(hasattr(base, attr) for base in bases)
+
+        slots = []
+        if '__slots__' not in namespace:
+            for attr, value in list(namespace.items()):
+                if (attr.startswith('__') or attr == '_properties' or callable(value) or
+                        isinstance(value, (property, staticmethod, classmethod))):
+                    continue
+                defaults[attr] = namespace.pop(attr)
+                if not inherited(attr):
+                    slots.append(attr)
+
+            properties = namespace.get('_properties', ())
+            if '_properties' not in namespace:
+                for base in bases:
+                    properties = getattr(base, '_properties', properties)
+            for attr in properties:
+                if attr not in namespace and attr not in slots and not inherited(attr):
+                    defaults[attr] = None
+                    slots.append(attr)
+            namespace['__slots__'] = tuple(slots)
+
+        cls = super(_CZMLMeta, mcs).__new__(mcs, name, bases, namespace)
+        cls._slot_defaults = defaults
+        cls._default_items = tuple(defaults.items())
+        cls._property_set = frozenset(cls._properties)
+        if len(cls._properties) > 1:
+            cls._get_properties = staticmethod(attrgetter(*cls._properties))
+        elif cls._properties:
+            getter = attrgetter(*cls._properties)
+            cls._get_properties = staticmethod(lambda obj: (getter(obj),))
+        else:
+            cls._get_properties = staticmethod(lambda obj: ())
+        return cls
+
+    def __call__(cls, *args, **kwargs):
+        obj = cls.__new__(cls)
+        for attr, value in cls._default_items:
+            object.__setattr__(obj, attr, value)
+        obj.__init__(*args, **kwargs)
+        return obj
+
+
+class _CZMLBaseObject(object, metaclass=_CZMLMeta):
     _properties = ()
 
     def __str__(self):
-        return json.dumps(list(self.data()))
+        return _json().dumps(list(self.data()))
 
     def __init__(self, **kwargs):
         """Default init functionality is to load kwargs
@@ -149,23 +223,21 @@ class _CZMLBaseObject(object):
 
     def dumps(self):
         d = self.data()
-        return json.dumps(d)
+        return _json().dumps(d)
 
     def data(self):
         d = {}
-        for attr in self.properties:
-            a = getattr(self, attr)
+        for attr, a in zip(self._properties, self._get_properties(self)):
             if a is not None:
                 # These classes have a data method that should be called.
-                if isinstance(a, (_CZMLBaseObject, _Colors,
-                                  _Coordinates, _Positions)):
+                if isinstance(a, _DATA_TYPES):
                     d[attr] = a.data()
                 else:
                     d[attr] = a
         return d
 
     def loads(self, data):
-        packets = json.loads(data)
+        packets = _json().loads(data)
         self.load(packets)
 
     def load(self, data):
@@ -175,8 +247,9 @@ class _CZMLBaseObject(object):
         elif hasattr(data, 'items'):
             # python 3
             iterator = data.items
+        properties = self._property_set
         for k, v in iterator():
-            if k in self.properties:
+            if k in properties:
                 setattr(self, k, v)
             else:
                 raise ValueError
@@ -203,7 +276,7 @@ class CZML(_CZMLBaseObject):
 
     def dumps(self):
         d = list(self.data())
-        return json.dumps(d)
+        return _json().dumps(d)
 
     def load(self, data):
         self.packets = []
@@ -247,8 +320,7 @@ class _Coordinate(object):
     """ [Longitude, Latitude, Height] or [X, Y, Z] or
     [Time, Longitude, Latitude, Height] or [Time, X, Y, Z]
     """
-    x = y = z = 0
-    t = None
+    __slots__ = ('x', 'y', 'z', 't')
 
     def __init__(self, x, y=None, z=0, t=None):
         self.x = float(x)
@@ -256,22 +328,19 @@ class _Coordinate(object):
         self.z = float(z)
         if t is None:
             self.t = None
-        elif isinstance(t, (date, datetime)):
-            self.t = t
         elif isinstance(t, (int, long, float)):
             self.t = float(t)
+        elif isinstance(t, (date, datetime)):
+            self.t = t
         elif isinstance(t, basestring):
-            try:
-                self.t = float(t)
-            except ValueError:
-                self.t = dateutil.parser.parse(t)
+            self.t = parse_time(t)
         else:
             raise ValueError
 
 
 class _Coordinates(object):
 
-    coords = None
+    __slots__ = ('coords',)
 
     def __init__(self, coords):
         if isinstance(coords, (list, tuple)):
@@ -284,51 +353,53 @@ class _Coordinates(object):
                 elif len(coords) == 4:
                     self.coords = [_Coordinate(coords[1], coords[2], coords[3], coords[0])]
                 elif len(coords) >= 4:
-                    self.coords = []
-                    for coord in grouper(coords, 4):
-                        self.coords.append(_Coordinate(coord[1], coord[2],
-                                                coord[3], coord[0]))
+                    self.coords = [_Coordinate(coord[1], coord[2], coord[3], coord[0])
+                                   for coord in grouper(coords, 4)]
             except TypeError:
+                from pygeoif import geometry
                 self.coords = []
                 for coord in grouper(coords, 2):
                     geom = asShape(coord[1])
                     assert(isinstance(geom, geometry.Point))
                     self.coords.append(_Coordinate(*geom.coords[0], t=coord[0]))
         else:
+            from pygeoif import geometry
             geom = asShape(coords)
+            self.coords = None
             if isinstance(geom, geometry.Point):
                 self.coords = [_Coordinate(*geom.coords[0])]
 
     def data(self):
         d = []
         if self.coords:
+            extend = d.extend
             for coord in self.coords:
-                if isinstance(coord.t, (date, datetime)):
-                     d.append(coord.t.isoformat())
-                elif coord.t is None:
-                    pass
+                t = coord.t
+                if t is None:
+                    extend((coord.x, coord.y, coord.z))
+                elif t.__class__ is float:
+                    extend((t, coord.x, coord.y, coord.z))
+                elif isinstance(t, (date, datetime)):
+                    extend((format_iso(t), coord.x, coord.y, coord.z))
                 else:
-                    d.append(coord.t)
-                d.append(coord.x)
-                d.append(coord.y)
-                d.append(coord.z)
+                    extend((t, coord.x, coord.y, coord.z))
         return d
 
 
 class Number(_DateTimeAware):
     """Represents numbers"""
     number = None
+    _properties = _DateTimeAware._properties + ('number',)
 
     def __init__(self, number=number, **kwargs):
-        self._properties += ('number',)
         super(Number, self).__init__(number=number, **kwargs)
 
     def data(self):
         data = super(Number, self).data()
-        if (('number' in data) and (len(data.keys()) == 1) and
+        if (('number' in data) and (len(data) == 1) and
             isinstance(data['number'], (int, float, str, long))):
             return data['number']
-        return super(Number, self).data()
+        return data
 
 
 
@@ -349,15 +420,16 @@ class Position(_DateTimeAware):
     referenceFrame = None
 
     _cartesian = None
+    _cartesianVelocity = None
     _cartographicRadians = None
     _cartographicDegrees = None
     interpolationAlgorithm = None
     interpolationDegree = None
+    _properties = _DateTimeAware._properties + ('cartesian', 'cartesianVelocity', 'cartographicRadians',
+                                                'cartographicDegrees', 'interpolationAlgorithm',
+                                                'interpolationDegree', 'referenceFrame')
 
     def __init__(self, **kwargs):
-        self._properties += ('cartesian', 'cartographicRadians',
-                             'cartographicDegrees', 'interpolationAlgorithm',
-                             'interpolationDegree', 'referenceFrame')
         super(Position, self).__init__(**kwargs)
 
     @property
@@ -378,6 +450,25 @@ class Position(_DateTimeAware):
         else:
             self._cartesian = None
 
+    @property
+    def cartesianVelocity(self):
+        """ The position and velocity represented as Cartesian
+        [X, Y, Z, dX, dY, dZ] in meters and meters per second relative to
+        the referenceFrame. If the array has six elements, the value is
+        constant. If it has seven or more elements, they are time-tagged
+        samples arranged as [Time, X, Y, Z, dX, dY, dZ, Time, ...],
+        where Time is an ISO 8601 date and time string or seconds since epoch.
+        Use it with the HERMITE interpolationAlgorithm.
+        """
+        return self._cartesianVelocity
+
+    @cartesianVelocity.setter
+    def cartesianVelocity(self, samples):
+        if samples is not None:
+            self._cartesianVelocity = _CartesianVelocities(samples)
+        else:
+            self._cartesianVelocity = None
+
     @property
     def cartographicDegrees(self):
         """The position represented as a WGS 84 Cartographic
@@ -434,9 +525,9 @@ class Radii(_DateTimeAware):
     # the default reference frame is "FIXED".
     referenceFrame = None
     _cartesian = None
+    _properties = _DateTimeAware._properties + ('cartesian', 'referenceFrame')
 
     def __init__(self, **kwargs):
-        self._properties += ('cartesian', 'referenceFrame')
         super(_DateTimeAware, self).__init__(**kwargs)
 
     @property
@@ -462,8 +553,7 @@ class Radii(_DateTimeAware):
         self.cartesian = data.get('cartesian', None)
 
 class _Color(object):
-    r = g = b = a = 0
-    t = None
+    __slots__ = ('r', 'g', 'b', 'a', 't')
 
     def __init__(self, r, g, b, a=1, t=None, num=float):
         self.r = num(r)
@@ -477,10 +567,7 @@ class _Color(object):
         elif isinstance(t, (int, long, float)):
             self.t = float(t)
         elif isinstance(t, basestring):
-            try:
-                self.t = float(t)
-            except ValueError:
-                self.t = dateutil.parser.parse(t)
+            self.t = parse_time(t)
         else:
             raise ValueError
 
@@ -494,7 +581,7 @@ class _Colors(object):
     [Time, Red, Green, Blue, Alpha, Time, Red, Green, Blue, Alpha, ...],
     where Time is an ISO 8601 date and time string or seconds since epoch.
     """
-    colors = None
+    __slots__ = ('colors',)
 
     def __init__(self, colors, num=float):
         if isinstance(colors, (list, tuple)):
@@ -521,7 +608,7 @@ class _Colors(object):
         if self.colors:
             for color in self.colors:
                 if isinstance(color.t, (date, datetime)):
-                     d.append(color.t.isoformat())
+                     d.append(format_iso(color.t))
                 elif color.t is None:
                     pass
                 else:
@@ -537,9 +624,9 @@ class Color(_DateTimeAware):
 
     _rgba = None
     _rgbaf = None
+    _properties = _DateTimeAware._properties + ('rgba', 'rgbaf')
 
     def __init__(self, **kwargs):
-        self._properties += ('rgba', 'rgbaf')
         super(_DateTimeAware, self).__init__(**kwargs)
 
     @property
@@ -599,13 +686,14 @@ class Scale(_DateTimeAware):
         elements, they are time-tagged samples arranged as
         [Time, Value, Time, Value, ...], where Time is an ISO 8601 date
         and time string or seconds since epoch."""
-        if isinstance(self._number, alist):
+        if isinstance(self._number, list):
             val = []
-            for d in grouper(self._number, 2):
-                if isinstance(d[0], (int, long, float)):
-                     val.append(d[0])
+            for t, v in self._number:
+                if isinstance(t, (int, long, float)):
+                     val.append(t)
                 else:
-                     val.append(d[0].isoformat())
+                     val.append(format_iso(t))
+                val.append(v)
             return val
         else:
             return self._number
@@ -623,10 +711,7 @@ class Scale(_DateTimeAware):
                     elif isinstance(t, (int, long, float)):
                         t = float(t)
                     elif isinstance(t, basestring):
-                        try:
-                            t = float(t)
-                        except ValueError:
-                            t = dateutil.parser.parse(t)
+                        t = parse_time(t)
                     else:
                         raise ValueError
                     self._number.append((t, v))
@@ -678,12 +763,75 @@ class Clock(_CZMLBaseObject):
     _properties = ('currentTime', 'multiplier', 'interval', 'range', 'step',)
 
 
+class _CartesianVelocities(object):
+    """ Positions with velocities [X, Y, Z, dX, dY, dZ] or time-tagged
+    samples [Time, X, Y, Z, dX, dY, dZ, Time, ...] """
+
+    __slots__ = ('samples',)
+
+    def __init__(self, samples):
+        if not isinstance(samples, (list, tuple)):
+            raise ValueError
+        if len(samples) == 6:
+            self.samples = [float(v) for v in samples]
+        elif len(samples) >= 7 and len(samples) % 7 == 0:
+            self.samples = list(samples)
+            if all(type(v) is float for v in self.samples):
+                return
+            for i, v in enumerate(self.samples):
+                if i % 7:
+                    self.samples[i] = float(v)
+                elif isinstance(v, (int, long, float)):
+                    self.samples[i] = float(v)
+                elif isinstance(v, basestring):
+                    self.samples[i] = parse_time(v)
+                elif not isinstance(v, (date, datetime)):
+                    raise ValueError
+        else:
+            raise ValueError
+
+    def data(self):
+        d = list(self.samples)
+        if len(d) > 6:
+            for i in range(0, len(d), 7):
+                if isinstance(d[i], (date, datetime)):
+                    d[i] = format_iso(d[i])
+        return d
+
+
+class _Intervals(object):
+    """ A property whose value changes over time, given as a list of
+    intervals each with its own value:
+    [{"interval": "start/end", ...value...}, ...]
+    """
+
+    __slots__ = ('intervals',)
+
+    def __init__(self, cls, intervals):
+        self.intervals = []
+        for value in intervals:
+            value = dict(value)
+            interval = value.pop('interval')
+            m = cls()
+            m.load(value)
+            self.intervals.append((interval, m))
+
+    def data(self):
+        d = []
+        for interval, value in self.intervals:
+            v = {'interval': interval}
+            v.update(value.data())
+            d.append(v)
+        return d
+
+
 class _Positions(object):
     """ The list of positions [X, Y, Z, X, Y, Z, ...] """
 
-    coords = None
+    __slots__ = ('coords',)
 
     def __init__(self, coords):
+        self.coords = None
         if isinstance(coords, (list, tuple)):
             assert(len(coords) % 3 == 0)
             assert(len(coords) >= 6)
@@ -694,6 +842,7 @@ class _Positions(object):
                     raise ValueError
             self.coords = coords
         else:
+            from pygeoif import geometry
             geom = asShape(coords)
             if isinstance(geom, geometry.Polygon):
                 geom = geom.exterior
@@ -827,10 +976,10 @@ class Orientation(_DateTimeAware):
     axes = None
     interpolationAlgorithm = None
     interpolationDegree = None
+    _properties = _DateTimeAware._properties + ('axes', 'unitQuaternion',
+                                                'interpolationAlgorithm', 'interpolationDegree')
 
     def __init__(self, **kwargs):
-        self._properties += ('axes', 'unitQuaternion',
-                             'interpolationAlgorithm', 'interpolationDegree')
         super(Orientation, self).__init__(**kwargs)
 
 
@@ -939,6 +1088,9 @@ class Label(_CZMLBaseObject):
     font = None
     outlineColor = None
     outlineWidth = None	
+    # Accepted for compatibility but not written out
+    verticalOrigin = None
+    style = None
 	# edit end
     	
 	
@@ -976,6 +1128,9 @@ class Label(_CZMLBaseObject):
     def load(self, data):
         self.show = data.get('show', None)
         self.text = data.get('text', None)
+        for name in ('horizontalOrigin', 'scale', 'pixelOffset', 'fillColor', 'font',
+                     'outlineColor', 'outlineWidth', 'verticalOrigin', 'style'):
+            setattr(self, name, data.get(name, None))
 
 
 class Grid(_CZMLBaseObject):
@@ -1066,10 +1221,10 @@ class Path(_DateTimeAware, _CZMLBaseObject):
     _width = None
     width = class_property(Number, 'width');
 
-    _leadTime = None
+    leadTime = None
     #leadTime = class_property(Number, 'leadTime');   # edit
 
-    _trailTime = None
+    trailTime = None
     #trailTime = class_property(Number, 'trailTime');
 
     _resolution = None
@@ -1238,19 +1393,20 @@ class Cone(_DateTimeAware, _CZMLBaseObject):
     outerMaterial = material_property('outerMaterial')
     silhouetteMaterial = material_property('silhouetteMaterial')
 
+    _properties = _DateTimeAware._properties + ('show', 'innerHalfAngle', 'outerHalfAngle', 'radius',
+                                                'minimumClockAngle', 'maximumClockAngle',
+                                                'showIntersection', 'intersectionColor',
+                                                'capMaterial', 'innerMaterial', 'outerMaterial',
+                                                'silhouetteMaterial')
+
     def __init__(self, epoch=None, nextTime=None, previousTime=None, **kwargs):
 
         _DateTimeAware.__init__(self, epoch=epoch,
                                 nextTime=nextTime,
                                 previousTime=previousTime)
 
-        self._properties += ('show', 'innerHalfAngle', 'outerHalfAngle', 'radius',
-                             'minimumClockAngle', 'maximumClockAngle',
-                             'showIntersection', 'intersectionColor',
-                             'capMaterial', 'innerMaterial', 'outerMaterial',
-                             'silhouetteMaterial')
         for param in kwargs:
-            if param in self._properties:
+            if param in self._property_set:
                 setattr(self, param, kwargs[param])
             else:
                 raise ValueError('Unknown parameter: %s', param)
@@ -1259,8 +1415,7 @@ class Cone(_DateTimeAware, _CZMLBaseObject):
         d = _DateTimeAware.data(self)
         d['show'] = self.show
 
-        for attr in self._properties:
-            a = getattr(self, attr)
+        for attr, a in zip(self._properties, self._get_properties(self)):
             if a is not None:
                 if isinstance(a, _CZMLBaseObject):
                     d[attr] = a.data()
@@ -1327,6 +1482,12 @@ class CZMLPacket(_CZMLBaseObject):
     # of strings representing intervals.
     availability = None
 
+    # When true the object with this id is removed from the scene
+    delete = None
+
+    # The display name of the object
+    name = None
+
     # The CZML version being written. Only valid on the document object.
     _version = None
 
@@ -1398,7 +1559,7 @@ class CZMLPacket(_CZMLBaseObject):
 	
 	
 
-    _properties = ('id', 'description', 'version', 'availability', 'billboard', 'clock', 'position', 'label', 'point', 'positions', 'polyline', 'polygon', 'path', 'orientation', 'ellipse', 'ellipsoid', 'cone', 'pyramid')
+    _properties = ('id', 'delete', 'name', 'description', 'version', 'availability', 'billboard', 'clock', 'position', 'label', 'point', 'positions', 'polyline', 'polygon', 'path', 'orientation', 'ellipse', 'ellipsoid', 'cone', 'pyramid')
 
     # TODO: Figure out how to set __doc__ from here.
     # position = class_property(Position, 'position')
@@ -1416,6 +1577,8 @@ class CZMLPacket(_CZMLBaseObject):
             d = Description()
             d.load(description)
             self._description = d
+        elif isinstance(description, basestring):
+            self._description = Description(string=description)
         elif description is None:
             self._description = None		
         else:
@@ -1538,7 +1701,7 @@ class CZMLPacket(_CZMLBaseObject):
             self._orientation = orientation
         elif isinstance(orientation, dict):
             p = Orientation()
-            p.load(point)
+            p.load(orientation)
             self._orientation = p
         elif orientation is None:
             self._orientation = None
@@ -1653,16 +1816,40 @@ class CZMLPacket(_CZMLBaseObject):
         else:
             raise TypeError
 
+    # Loaded properties the object model doesn't know, rejects or would
+    # write back differently, kept as the plain JSON they were given in.
+    # Their properties are left unset, so a property set afterwards is
+    # written instead of its plain JSON.
+    _raw = None
+
     def data(self):
         d = {}
-        for property_name in self._properties:
-            property_value = getattr(self, property_name)
+        for property_name, property_value in zip(self._properties, self._get_properties(self)):
             if property_value is not None:
                 d[property_name] = property_value
+        if self._raw:
+            for property_name, property_value in self._raw.items():
+                d.setdefault(property_name, property_value)
         return d
 
     def load(self, data):
-        for property_name in self._properties:
-            property_value = data.get(property_name, None)
-            if property_value is not None:
-                setattr(self, property_name, property_value)
+        raw = self._raw if self._raw is not None else {}
+        for property_name, property_value in data.items():
+            if property_value is None:
+                continue
+            if property_name in self._property_set:
+                try:
+                    setattr(self, property_name, property_value)
+                except Exception:
+                    pass
+                else:
+                    if getattr(self, property_name) == property_value:
+                        raw.pop(property_name, None)
+                        continue
+                setattr(self, property_name, None)
+            raw[property_name] = property_value
+        self._raw = raw or None
+
+
+# Objects whose data() method is called when serializing a property
+_DATA_TYPES = (_CZMLBaseObject, _Colors, _Coordinates, _CartesianVelocities, _Intervals, _Positions)
@@ -0,0 +1,275 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .czml import CZML, CZMLPacket, _json
+from .isotime import parse_iso, parse_time
+
+from datetime import datetime, timezone
+from itertools import count
+
+_DELETED = object()
+
+# Number of values in one sample of each CZML value type.  An array with
+# a time before each value (e.g. [t, x, y, z, t, x, y, z]) is sampled.
+SAMPLE_SIZES = {'cartesian': 3, 'cartographicDegrees': 3, 'cartographicRadians': 3, 'cartesianVelocity': 6,
+                'cartesian2': 2, 'unitCartesian': 3, 'spherical': 3, 'unitSpherical': 2, 'unitQuaternion': 4,
+                'rgba': 4, 'rgbaf': 4, 'number': 1, 'nearFarScalar': 4, 'boundingRectangle': 4}
+
+
+def _is_intervals(value):
+    return (isinstance(value, list) and len(value) > 0 and
+            all(isinstance(v, dict) and 'interval' in v for v in value))
+
+
+def _is_sampled(key, value):
+    size = SAMPLE_SIZES.get(key)
+    return (size is not None and isinstance(value, list) and len(value) > size and
+            len(value) % (size + 1) == 0)
+
+
+def _utc(time):
+    return time.replace(tzinfo=timezone.utc) if time.tzinfo is None else time
+
+
+def _interval_key(interval):
+    '''
+    Identifies an interval by its bounds, so equal intervals written
+    differently (Z or +00:00, more fraction digits, ...) match
+    '''
+    try:
+        start, _, end = interval.partition('/')
+        return _utc(parse_iso(start)), _utc(parse_iso(end))
+    except (ValueError, OverflowError):
+        return interval
+
+
+def _samples(values, size, epoch, reference):
+    '''
+    Returns {seconds since reference: sample values} of a sampled array,
+    whose times are seconds since epoch or ISO 8601 strings
+    '''
+    offset = 0 if epoch is None or reference is None else (epoch - reference).total_seconds()
+    samples = {}
+    for i in range(0, len(values), size + 1):
+        time = parse_time(values[i]) if isinstance(values[i], str) else values[i]
+        if isinstance(time, datetime):
+            time = (_utc(time) - reference).total_seconds()
+        elif offset:
+            time += offset
+        samples[time] = values[i + 1:i + size + 1]
+    return samples
+
+
+def merge_samples(old, new, key):
+    '''
+    Merges the samples of a sampled property value from a later packet
+    into the current ones, as CZML clients do: they are interleaved by
+    time and a later sample replaces one at the same time.  Times are
+    written as seconds since the current epoch (or the first sample time
+    if neither value has an epoch).
+    '''
+    size = SAMPLE_SIZES[key]
+    old_epoch, new_epoch = old.get('epoch'), new.get('epoch', old.get('epoch'))
+    iso_times = [v[0] for v in (old[key], new[key]) if isinstance(v[0], str)]
+    epoch = old_epoch or new_epoch or (iso_times[0] if iso_times else None)
+    reference = None if epoch is None else _utc(parse_iso(epoch))
+
+    samples = _samples(old[key], size, old_epoch and _utc(parse_iso(old_epoch)), reference)
+    samples.update(_samples(new[key], size, new_epoch and _utc(parse_iso(new_epoch)), reference))
+    merged = _merge_items(dict(old), ((k, v) for k, v in new.items() if k not in (key, 'epoch')))
+    if epoch is not None:
+        merged['epoch'] = epoch
+    merged[key] = [x for time in sorted(samples) for x in [time] + list(samples[time])]
+    return merged
+
+
+def merge_property(old, new):
+    '''
+    Merges a property value from a later packet into the current one the
+    way CZML clients apply multiple packets for the same id: sub-properties
+    are updated one by one, samples are interleaved by time, intervals are
+    matched by their start and end times and anything else is replaced.  A
+    value of {"delete": true} removes it.
+    '''
+    if isinstance(new, dict):
+        if new.get('delete') is True:
+            return _DELETED
+        if not isinstance(old, dict):
+            return _strip_deleted(new)
+        for key in SAMPLE_SIZES:
+            if _is_sampled(key, new.get(key)) and _is_sampled(key, old.get(key)):
+                return merge_samples(old, new, key)
+        merged = dict(old)
+        # New values or samples replace the old ones, whichever form they
+        # were given in, and the old epoch unless they bring their own
+        if any(isinstance(v, list) for v in new.values()):
+            for key, value in old.items():
+                if key not in new and (key == 'epoch' or isinstance(value, list)):
+                    del merged[key]
+        return _merge_items(merged, new.items())
+
+    if _is_intervals(new) and _is_intervals(old):
+        merged = {_interval_key(v['interval']): v for v in old}
+        return list(_merge_items(merged, ((_interval_key(v['interval']), v) for v in new)).values())
+
+    return new
+
+
+def _merge_items(merged, items):
+    '''
+    Merges (key, value) pairs into the dict merged
+    '''
+    for key, value in items:
+        value = merge_property(merged[key], value) if key in merged else _strip_deleted(value)
+        if value is _DELETED:
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _strip_deleted(value):
+    '''
+    Drops sub-properties marked for deletion from a value with nothing to
+    merge into
+    '''
+    if isinstance(value, dict):
+        if value.get('delete') is True:
+            return _DELETED
+        stripped = {}
+        for key, v in value.items():
+            v = _strip_deleted(v)
+            if v is not _DELETED:
+                stripped[key] = v
+        return stripped
+    return value
+
+
+class czml_document():
+    '''
+    A CZML document indexed by packet id.  Looking up, adding, replacing
+    and removing a packet is O(1), packets keep their insertion order (the
+    document packet always comes first), and later packets for an id are
+    merged into the existing one following CZML's multi-packet rules.
+
+    Packets are kept and merged as plain JSON dicts, so properties the
+    CZMLPacket object model doesn't know are kept as they are.  Looking up
+    a packet returns its dict; czml() builds the packet objects.
+    '''
+
+    def __init__(self, packets=None):
+        self._packets = {}
+        self._anonymous = count()
+        if packets is not None:
+            self.merge(packets)
+
+    def __len__(self):
+        return len(self._packets)
+
+    def __contains__(self, id):
+        return id in self._packets
+
+    def __getitem__(self, id):
+        return self._packets[id]
+
+    def __iter__(self):
+        return iter(self._packets.values())
+
+    def __str__(self):
+        return self.dumps()
+
+    @property
+    def packets(self):
+        return list(self._packets.values())
+
+    def ids(self):
+        '''
+        Returns the packet ids in document order
+        '''
+        return list(self._packets)
+
+    def get(self, id, default=None):
+        return self._packets.get(id, default)
+
+    def __store(self, id, data):
+        if id is None:
+            # Packets without an id can't be referred to again
+            id = ('anonymous', next(self._anonymous))
+        self._packets[id] = data
+        if id == 'document' and next(iter(self._packets)) != 'document':
+            self._packets = dict([('document', data)] +
+                                 [(k, v) for k, v in self._packets.items() if k != 'document'])
+        return True
+
+    def replace(self, packet):
+        '''
+        Sets the packet for its id, discarding what was there before
+        '''
+        data = _strip_deleted(_packet_data(packet))
+        return self.__store(data.get('id'), data)
+
+    def upsert(self, packet):
+        '''
+        Adds a packet (CZMLPacket, dict or anything with a data() method),
+        merging it into the existing packet with the same id.  A packet with
+        "delete": true removes the object.
+        '''
+        data = _packet_data(packet)
+        id = data.get('id')
+
+        if data.get('delete') is True:
+            self.remove(id)
+            return True
+        if id is None or id not in self._packets:
+            return self.__store(id, _strip_deleted(data))
+
+        # The kept dict is the document's own copy, merging never changes
+        # the values in it, only replaces them
+        _merge_items(self._packets[id], data.items())
+        return True
+
+    def remove(self, id):
+        '''
+        Removes the packet with this id.  Returns False if there was none.
+        '''
+        return self._packets.pop(id, None) is not None
+
+    def merge(self, packets):
+        '''
+        Upserts every packet of another document, a CZML object or an
+        iterable of packets, in order
+        '''
+        if isinstance(packets, CZML):
+            packets = packets.packets or []
+        for packet in packets:
+            self.upsert(packet)
+        return True
+
+    def data(self):
+        return iter(self._packets.values())
+
+    def dumps(self):
+        return _json().dumps(list(self.data()))
+
+    def load(self, data):
+        self._packets = {}
+        return self.merge(data)
+
+    def loads(self, data):
+        return self.load(_json().loads(data))
+
+    def czml(self):
+        '''
+        Returns the packets as a plain CZML object
+        '''
+        packets = []
+        for data in self._packets.values():
+            packet = CZMLPacket()
+            packet.load(data)
+            packets.append(packet)
+        return CZML(packets)
+
+
+def _packet_data(packet):
+    return packet if isinstance(packet, dict) else packet.data()
@@ -0,0 +1,193 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import os
+import struct
+import tempfile
+
+# File layout (little endian, every block aligned to ALIGNMENT bytes):
+#   header      HEADER (magic, version, flags, start/end in microseconds
+#               since the Unix epoch, number of grids and satellites)
+#   grid table  GRID_DTYPE per time grid (step, times, satellites, offset)
+#   sat table   SAT_DTYPE per satellite, sorted by NORAD ID
+#   per grid, starting at its offset:
+#       offsets     float64 (times,), seconds since the start
+#       valid       uint8 (satellites, times), 1 where sgp4 had no error
+#       positions   float64 (satellites, times, 3), TEME (m)
+#       velocities  float64 (satellites, times, 3), TEME (m/s), if stored
+# Satellites with the same sample step share a grid.
+MAGIC = b'SCZEPHEM'
+VERSION = 1
+HEADER = struct.Struct('<8sIIqqII')
+GRID_DTYPE = np.dtype([('step', '<f8'), ('times', '<u8'), ('satellites', '<u8'), ('offset', '<u8')])
+SAT_DTYPE = np.dtype([('id', '<i8'), ('grid', '<u4'), ('row', '<u4')])
+ALIGNMENT = 64
+HAS_VELOCITIES = 1
+
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _microseconds(time):
+    return (time.astimezone(timezone.utc) - UNIX_EPOCH) // timedelta(microseconds=1)
+
+
+def _grid_layout(offset, times, satellites, velocities):
+    '''
+    Returns the offsets of the arrays of one grid, and where it ends
+    '''
+    layout = {'offsets': offset}
+    layout['valid'] = _align(layout['offsets'] + times * 8)
+    layout['positions'] = _align(layout['valid'] + satellites * times)
+    end = _align(layout['positions'] + satellites * times * 24)
+    if velocities:
+        layout['velocities'] = end
+        end = _align(end + satellites * times * 24)
+    return layout, end
+
+
+def write_ephemeris(path, satellites, velocities=True):
+    '''
+    Writes the propagated samples of the satellites to an ephemeris store.
+    Every satellite must have been propagated over the same time window.
+    The store is written next to path and then moved over it, so stores
+    still mapped from the old file keep working.  Returns the number of
+    bytes written.
+    '''
+    satellites = sorted(satellites, key=lambda sat: sat.id)
+    if not satellites:
+        raise Exception("An ephemeris store needs at least one propagated satellite")
+    keys = {sat.sample_key[:2] for sat in satellites}
+    if None in {sat.sample_key for sat in satellites} or len(keys) > 1:
+        raise Exception(f"Every satellite must be propagated over the same time window. Got: {len(keys)} windows")
+    start_time, end_time = keys.pop()
+
+    grids = {}
+    for sat in satellites:
+        grids.setdefault(sat.sample_key[2], []).append(sat)
+
+    grid_table = np.zeros(len(grids), dtype=GRID_DTYPE)
+    sat_table = np.zeros(len(satellites), dtype=SAT_DTYPE)
+    rows = {}
+    offset = _align(HEADER.size + GRID_DTYPE.itemsize * len(grids) + SAT_DTYPE.itemsize * len(satellites))
+    layouts = []
+    for g, (step, sats) in enumerate(grids.items()):
+        times = len(sats[0].sample_offsets)
+        layout, end = _grid_layout(offset, times, len(sats), velocities)
+        grid_table[g] = (step, times, len(sats), offset)
+        layouts.append(layout)
+        for row, sat in enumerate(sats):
+            rows[sat.id] = (g, row)
+        offset = end
+    for i, sat in enumerate(satellites):
+        sat_table[i] = (sat.id,) + rows[sat.id]
+
+    target = path
+    fd, path = tempfile.mkstemp(prefix=f".{os.path.basename(target)}.",
+                                dir=os.path.dirname(os.path.abspath(target)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, HAS_VELOCITIES if velocities else 0,
+                                _microseconds(start_time), _microseconds(end_time), len(grids), len(satellites)))
+            f.write(grid_table.tobytes())
+            f.write(sat_table.tobytes())
+            f.truncate(offset)
+        _write_samples(path, grids, layouts, grid_table, velocities)
+        os.chmod(path, 0o644)
+        os.replace(path, target)
+    except BaseException:
+        os.remove(path)
+        raise
+    return offset
+
+
+def _write_samples(path, grids, layouts, grid_table, velocities):
+    '''
+    Copies the samples one satellite at a time, straight into the file
+    '''
+    for sats, layout, grid in zip(grids.values(), layouts, grid_table):
+        shape = (len(sats), int(grid['times']))
+        arrays = {'offsets': np.memmap(path, '<f8', 'r+', layout['offsets'], shape[1:]),
+                  'valid': np.memmap(path, 'u1', 'r+', layout['valid'], shape),
+                  'positions': np.memmap(path, '<f8', 'r+', layout['positions'], shape + (3,))}
+        if velocities:
+            arrays['velocities'] = np.memmap(path, '<f8', 'r+', layout['velocities'], shape + (3,))
+        arrays['offsets'][:] = sats[0].sample_offsets
+        for row, sat in enumerate(sats):
+            arrays['valid'][row] = sat.sample_valid
+            arrays['positions'][row] = sat.sample_positions
+            if velocities:
+                arrays['velocities'][row] = sat.sample_velocities
+        for array in arrays.values():
+            array.flush()
+
+
+class ephemeris_store():
+    '''
+    Read only view of an ephemeris store written by write_ephemeris.  The
+    file is memory mapped, so opening it reads only the header and tables,
+    and the samples of a satellite are paged in when they are used.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise Exception(f"{path} is not an ephemeris store")
+        _, version, flags, start_us, end_us, n_grids, n_sats = HEADER.unpack(header)
+        if version != VERSION:
+            raise Exception(f"Ephemeris store version {version} is not supported. Expected {VERSION}.")
+
+        self.has_velocities = bool(flags & HAS_VELOCITIES)
+        self.start_time = UNIX_EPOCH + timedelta(microseconds=start_us)
+        self.end_time = UNIX_EPOCH + timedelta(microseconds=end_us)
+        self.grids = np.memmap(path, GRID_DTYPE, 'r', HEADER.size, (n_grids,))
+        self.table = np.memmap(path, SAT_DTYPE, 'r', HEADER.size + GRID_DTYPE.itemsize * n_grids, (n_sats,))
+        self.ids = np.asarray(self.table['id'])
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        i = np.searchsorted(self.ids, id)
+        return i < len(self.ids) and self.ids[i] == id
+
+    def __grid_arrays(self, g):
+        '''
+        Maps the arrays of a grid the first time they are needed
+        '''
+        if g not in self._arrays:
+            grid = self.grids[g]
+            shape = (int(grid['satellites']), int(grid['times']))
+            layout, _ = _grid_layout(int(grid['offset']), shape[1], shape[0], self.has_velocities)
+            arrays = {'offsets': np.memmap(self.path, '<f8', 'r', layout['offsets'], shape[1:]),
+                      'valid': np.memmap(self.path, 'u1', 'r', layout['valid'], shape).view(bool),
+                      'positions': np.memmap(self.path, '<f8', 'r', layout['positions'], shape + (3,)),
+                      'velocities': None}
+            if self.has_velocities:
+                arrays['velocities'] = np.memmap(self.path, '<f8', 'r', layout['velocities'], shape + (3,))
+            self._arrays[g] = (float(grid['step']), arrays)
+        return self._arrays[g]
+
+    def get_samples(self, id):
+        '''
+        Returns the sample step, the sample times (seconds since the start)
+        and the positions, velocities (None if not stored) and valid mask
+        of a satellite.  The arrays are views of the mapped file.
+        '''
+        if id not in self:
+            raise Exception(f"Satellite {id} is not in the ephemeris store {self.path}")
+        entry = self.table[np.searchsorted(self.ids, id)]
+        step, arrays = self.__grid_arrays(int(entry['grid']))
+        row = int(entry['row'])
+        velocities = arrays['velocities']
+        return (step, arrays['offsets'], arrays['positions'][row],
+                None if velocities is None else velocities[row], arrays['valid'][row])
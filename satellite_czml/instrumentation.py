@@ -0,0 +1,156 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from contextlib import contextmanager
+import time
+
+# Modules only some code paths need, so "import satellite_czml" must not
+# load them (checked by the tests and benchmarks/bench_import.py).  numpy
+# alone takes longer to import than the whole package.
+DEFERRED_MODULES = ['numpy', 'json', 'gzip', 'dateutil', 'pygeoif', 'simplejson', 'sgp4.io', 'sgp4.model',
+                    'satellite_czml.attitude', 'satellite_czml.catalogs', 'satellite_czml.columnar',
+                    'satellite_czml.coverage', 'satellite_czml.ephemeris', 'satellite_czml.propagation',
+                    'satellite_czml.region', 'satellite_czml.sensors', 'satellite_czml.spatial']
+
+
+class czml_observer():
+    '''
+    Receives timing and counter events from satellite_czml.  Subclass it
+    and override the hooks you need; they all do nothing by default.
+    '''
+
+    def stage_finished(self, stage, seconds):
+        '''
+        Called after each stage (parse, propagate, region, attitude,
+        sensors, coverage, build_position, build_path, build_packets,
+        serialize)
+        with its duration in seconds.
+        Stages can nest, e.g. build_path runs inside build_packets.
+        '''
+        pass
+
+    def count(self, name, value=1):
+        '''
+        Called to increase a counter (satellites, samples, bytes, ...)
+        '''
+        pass
+
+    def satellite_failed(self, id, error):
+        '''
+        Called when a satellite is skipped because of ignore_bad_tles, or
+        because sgp4 could not propagate it at any sample time
+        '''
+        pass
+
+    def satellite_trimmed(self, id, availability):
+        '''
+        Called when a satellite's availability and position samples are
+        cut down to the spans sgp4 could propagate (e.g. it decayed)
+        '''
+        pass
+
+
+class stats_observer(czml_observer):
+    '''
+    Accumulates stage durations, counters and failed satellites so they
+    can be exported as a dict, a log line or a Prometheus text snapshot
+    '''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        '''
+        Clears everything recorded so far
+        '''
+        self.stages = {}
+        self.stage_calls = {}
+        self.counters = {}
+        self.failed = {}
+        self.trimmed = {}
+        return True
+
+    def stage_finished(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def satellite_failed(self, id, error):
+        self.failed[id] = str(error)
+        self.count('failed')
+
+    def satellite_trimmed(self, id, availability):
+        self.trimmed[id] = availability
+        self.count('trimmed')
+
+    def as_dict(self):
+        '''
+        Returns the recorded stats as plain (JSON serializable) data
+        '''
+        return {'stages': dict(self.stages),
+                'stage_calls': dict(self.stage_calls),
+                'counters': dict(self.counters),
+                'failed': {str(k): v for k, v in self.failed.items()},
+                'trimmed': {str(k): v for k, v in self.trimmed.items()}}
+
+    def log_line(self):
+        '''
+        Returns the recorded stats as a single logfmt style line
+        '''
+        fields = [f"{stage}_seconds={seconds:.6f}" for stage, seconds in self.stages.items()]
+        fields += [f"{name}={value}" for name, value in self.counters.items()]
+        if self.failed:
+            fields.append("failed_ids=" + ",".join(str(id) for id in self.failed))
+        if self.trimmed:
+            fields.append("trimmed_ids=" + ",".join(str(id) for id in self.trimmed))
+        return " ".join(fields)
+
+    def prometheus(self, prefix='satellite_czml'):
+        '''
+        Returns the recorded stats in the Prometheus text exposition format
+        '''
+        lines = [f"# HELP {prefix}_stage_seconds Total time spent in each stage",
+                 f"# TYPE {prefix}_stage_seconds counter"]
+        lines += [f'{prefix}_stage_seconds{{stage="{stage}"}} {seconds:.6f}'
+                  for stage, seconds in self.stages.items()]
+        for name, value in self.counters.items():
+            lines += [f"# TYPE {prefix}_{name}_total counter",
+                      f"{prefix}_{name}_total {value}"]
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def _timed_stage(observer, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observer.stage_finished(stage, time.perf_counter() - start)
+
+
+class _null_stage():
+    '''
+    Reusable do-nothing context manager used when no observer is set
+    '''
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = _null_stage()
+
+
+def stage(observer, name):
+    '''
+    Returns a context manager timing the named stage for observer, or a
+    shared no-op one when observer is None
+    '''
+    if observer is None:
+        return NULL_STAGE
+    return _timed_stage(observer, name)
@@ -0,0 +1,88 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+import re
+import sys
+
+# The ISO 8601 forms CZML documents use in practice.  Anything else falls
+# back to dateutil.
+_ISO_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})'
+                     r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?)?'
+                     r'(Z|[+-]\d{2}(?::?\d{2})?)?$')
+
+
+def _tz(designator):
+    if designator == 'Z':
+        return timezone.utc
+    sign = -1 if designator[0] == '-' else 1
+    digits = designator[1:].replace(':', '')
+    offset = timedelta(hours=int(digits[:2]), minutes=int(digits[2:4] or 0))
+    if not offset:
+        return timezone.utc
+    return timezone(sign * offset)
+
+
+@lru_cache(maxsize=4096)
+def parse_iso(value):
+    '''
+    Parses an ISO 8601 date and time string into a datetime.  Repeated
+    strings are served from a cache.
+    '''
+    match = _ISO_RE.match(value)
+    if match is not None:
+        year, month, day, hour, minute, second, fraction, designator = match.groups()
+        try:
+            return datetime(int(year), int(month), int(day),
+                            int(hour or 0), int(minute or 0), int(second or 0),
+                            int((fraction or '0')[:6].ljust(6, '0')),
+                            _tz(designator) if designator else None)
+        except ValueError:
+            pass  # e.g. 24:00, let dateutil decide
+    import dateutil.parser  # only needed for unusual strings
+    return dateutil.parser.parse(value)
+
+
+@lru_cache(maxsize=4096)
+def parse_time(value):
+    '''
+    Parses a CZML time string, which is either seconds since an epoch or
+    an ISO 8601 date and time, into a float or a datetime
+    '''
+    if _ISO_RE.match(value) is None:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return parse_iso(value)
+
+
+@lru_cache(maxsize=8192)
+def _format(dt, tzinfo, fold):
+    return sys.intern(dt.isoformat())
+
+
+def format_iso(dt):
+    '''
+    Returns dt.isoformat().  Repeated instants are served from a cache and
+    share a single interned string.
+    '''
+    if type(dt) is date:
+        return dt.isoformat()
+    # Equal datetimes in different zones print differently, so the zone is
+    # part of the key
+    return _format(dt, dt.tzinfo, dt.fold)
+
+
+def format_interval(start, end):
+    '''
+    Returns the "start/end" ISO 8601 interval string
+    '''
+    return _format_interval(start, start.tzinfo, start.fold, end, end.tzinfo, end.fold)
+
+
+@lru_cache(maxsize=1024)
+def _format_interval(start, start_tz, start_fold, end, end_tz, end_fold):
+    return sys.intern(format_iso(start) + "/" + format_iso(end))
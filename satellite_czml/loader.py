@@ -0,0 +1,211 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .czml import CZML, CZMLPacket
+
+import codecs
+import re
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBERS = (int, float)
+
+
+class packet_view():
+    '''
+    A packet read by iter_czml.  Its properties are kept as plain JSON data,
+    with long numeric arrays (e.g. position samples) held as float64 numpy
+    buffers, until it is materialized with packet().
+    '''
+    __slots__ = ('properties',)
+
+    def __init__(self, properties):
+        self.properties = properties
+
+    @property
+    def id(self):
+        return self.properties.get('id')
+
+    def __getitem__(self, name):
+        return self.properties[name]
+
+    def __contains__(self, name):
+        return name in self.properties
+
+    def keys(self):
+        return self.properties.keys()
+
+    def get(self, path, default=None):
+        '''
+        Returns a property by dotted path (e.g. "position.epoch")
+        '''
+        value = self.properties
+        for key in path.split('.'):
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return value
+
+    def samples(self, path='position.cartesian', width=4):
+        '''
+        Returns a sample buffer as an array of rows of width values,
+        e.g. [time, x, y, z] rows for time-tagged cartesian positions
+        '''
+        import numpy as np
+        values = self.get(path)
+        if values is None:
+            return None
+        return np.asarray(values, dtype=float).reshape(-1, width)
+
+    def data(self):
+        '''
+        Returns the packet as plain JSON serializable data
+        '''
+        return _plain(self.properties)
+
+    def packet(self):
+        '''
+        Builds the full CZMLPacket object for this packet.  Properties
+        the object model doesn't know are kept as plain JSON.
+        '''
+        p = CZMLPacket()
+        p.load(self.data())
+        return p
+
+
+def _buffers(value, min_samples):
+    '''
+    Replaces numeric lists of at least min_samples values with numpy buffers
+    '''
+    import numpy as np
+    if isinstance(value, dict):
+        return {k: _buffers(v, min_samples) for k, v in value.items()}
+    if isinstance(value, list):
+        if len(value) >= min_samples and all(type(v) in _NUMBERS for v in value):
+            return np.array(value, dtype=float)
+        return [_buffers(v, min_samples) for v in value]
+    return value
+
+
+def _plain(value):
+    '''
+    Converts numpy buffers back to lists
+    '''
+    import numpy as np
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def _open(source):
+    '''
+    Returns (file, close) for a path, a .gz path or an open file object
+    '''
+    if hasattr(source, 'read'):
+        return source, False
+    if str(source).endswith('.gz'):
+        import gzip
+        return gzip.open(source, 'rt', encoding='utf-8'), True
+    return open(source, 'r', encoding='utf-8'), True
+
+
+def _iter_array(f, chunk_size):
+    '''
+    Yields the items of the JSON array in f one at a time, reading chunk_size
+    characters at a time.  Only the item being decoded is kept in memory.
+    '''
+    import json
+    decoder = json.JSONDecoder()
+    text_decoder = None
+    buffer, pos = '', 0
+    state = 'start'
+
+    def read(size):
+        nonlocal text_decoder
+        chunk = f.read(size)
+        if isinstance(chunk, bytes):
+            if text_decoder is None:
+                text_decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = text_decoder.decode(chunk, final=not chunk)
+        return chunk
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            chunk = read(chunk_size)
+            if not chunk:
+                raise Exception("The CZML document ended before its closing ]")
+            buffer, pos = chunk, 0
+            continue
+
+        c = buffer[pos]
+        if state == 'start':
+            if c != '[':
+                raise Exception(f"A CZML document must be a JSON array. Found: {c!r}")
+            pos += 1
+            state = 'first'
+        elif state == 'next' and c == ',':
+            pos += 1
+            state = 'value'
+        elif state in ('first', 'next') and c == ']':
+            return
+        elif state == 'next':
+            raise Exception(f"Expected , or ] between CZML packets. Found: {c!r}")
+        else:
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError as e:
+                    # Usually the packet runs past the buffer, so read more.
+                    # Growing geometrically keeps large packets linear.
+                    chunk = read(max(chunk_size, len(buffer) - pos))
+                    if not chunk:
+                        raise Exception(f"Invalid CZML packet: {e}")
+                    buffer, pos = buffer[pos:] + chunk, 0
+            if not isinstance(value, dict):
+                raise Exception(f"CZML packets must be JSON objects. Found: {type(value).__name__}")
+            yield value
+            pos = end
+            state = 'next'
+
+
+def iter_czml(source, ids=None, properties=None, min_samples=16, chunk_size=1 << 20):
+    '''
+    Streams the packets of a CZML document (a path, a .gz path or an open
+    file) as packet_view objects without loading the whole file.
+
+    Only packets whose id is in ids are returned, and only the named
+    properties are kept (id is always kept).  Reading stops as soon as
+    every requested id has been found.  Numeric arrays of at least
+    min_samples values are kept as numpy buffers instead of Python lists.
+    '''
+    wanted = None if ids is None else set(ids)
+    f, close = _open(source)
+    try:
+        for raw in _iter_array(f, chunk_size):
+            if wanted is not None:
+                if raw.get('id') not in wanted:
+                    continue
+                wanted.discard(raw['id'])
+            if properties is not None:
+                raw = {k: v for k, v in raw.items() if k == 'id' or k in properties}
+            yield packet_view(_buffers(raw, min_samples))
+            if wanted is not None and not wanted:
+                return
+    finally:
+        if close:
+            f.close()
+
+
+def load_czml(source, ids=None, properties=None, chunk_size=1 << 20):
+    '''
+    Reads a CZML document into a CZML object, building full packet objects
+    only for the requested ids and properties
+    '''
+    return CZML([view.packet() for view in
+                 iter_czml(source, ids, properties, chunk_size=chunk_size)])
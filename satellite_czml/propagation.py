@@ -0,0 +1,229 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from sgp4.api import SatrecArray, jday
+
+from collections import OrderedDict
+from datetime import timezone
+import numpy as np
+import threading
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_E2 = 6.69437999014e-3
+
+
+def time_offsets(start_time, end_time, step):
+    '''
+    Returns the sample times, in seconds since start_time, used for the
+    satellite positions
+    '''
+    number_of_positions = int((end_time - start_time).total_seconds()/step)
+    number_of_positions += 5 # so there is more than 1
+    return np.arange(number_of_positions, dtype=float) * step
+
+
+def seconds_since(start_time, times):
+    '''
+    Converts times (datetimes, numpy datetime64 or numbers of seconds
+    since start_time) into an array of seconds since start_time.  Naive
+    datetimes are taken as UTC.
+    '''
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    times = np.atleast_1d(np.asarray(times))
+    if times.dtype.kind == 'O':
+        return np.array([((t if t.tzinfo is not None else t.replace(tzinfo=timezone.utc)) -
+                          start_time).total_seconds() for t in times])
+    if times.dtype.kind == 'M':
+        start = np.datetime64(start_time.astimezone(timezone.utc).replace(tzinfo=None), 'us')
+        return (times - start) / np.timedelta64(1, 's')
+    return times.astype(float)
+
+
+def julian_dates(start_time, offsets):
+    '''
+    Converts sample times (seconds since start_time) into the two part
+    Julian dates expected by sgp4
+    '''
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(timezone.utc)
+    jd, fr = jday(start_time.year, start_time.month, start_time.day,
+                  start_time.hour, start_time.minute,
+                  start_time.second + start_time.microsecond * 1e-6)
+    offsets = np.asarray(offsets, dtype=float)
+    return np.full(offsets.shape, jd), fr + offsets / 86400.0
+
+
+def propagate(satrecs, start_time, offsets):
+    '''
+    Propagates every Satrec at every sample time in a single sgp4 call.
+    Returns the TEME positions (m) and velocities (m/s) as arrays shaped
+    (satellites, times, 3), and a (satellites, times) mask of the samples
+    sgp4 propagated without an error (e.g. not after the object decayed)
+    '''
+    jd, fr = julian_dates(start_time, offsets)
+    errors, positions, velocities = SatrecArray(list(satrecs)).sgp4(jd, fr)
+    valid = (errors == 0) & np.isfinite(positions).all(axis=-1) & np.isfinite(velocities).all(axis=-1)
+    return positions * 1000, velocities * 1000, valid  # converts km's to m's
+
+
+class propagation_cache():
+    '''
+    Propagated samples shared between satellite_czml objects, e.g. the
+    requests a web service handles for the same catalog and day.  Samples
+    are keyed by the TLE lines, time window and sample step.  The cached
+    arrays are made read only, so every user sees the same samples, and
+    the cache can be used from several threads at once.  The least
+    recently used satellites are dropped beyond max_satellites.
+    '''
+
+    def __init__(self, max_satellites=100000):
+        self.max_satellites = max_satellites
+        self.hits = 0
+        self.misses = 0
+        self._samples = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def get(self, key):
+        '''
+        Returns the (offsets, positions, velocities, valid) cached for key,
+        or None
+        '''
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._samples.move_to_end(key)
+            return samples
+
+    def put(self, key, offsets, positions, velocities, valid):
+        '''
+        Caches the samples for key, returning the read only arrays cached
+        '''
+        samples = []
+        for array in (offsets, positions, velocities, valid):
+            array = array.view()
+            array.flags.writeable = False
+            samples.append(array)
+        samples = tuple(samples)
+        with self._lock:
+            self._samples[key] = samples
+            self._samples.move_to_end(key)
+            while len(self._samples) > self.max_satellites:
+                self._samples.popitem(last=False)
+        return samples
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+        return True
+
+
+def gmst(jd, fr):
+    '''
+    Greenwich mean sidereal time (radians) using the same IAU-82 model
+    as sgp4
+    '''
+    tut1 = ((jd - 2451545.0) + fr) / 36525.0
+    seconds = (-6.2e-6 * tut1**3 + 0.093104 * tut1**2 +
+               (876600.0 * 3600 + 8640184.812866) * tut1 + 67310.54841)
+    return np.mod(np.radians(seconds / 240.0), 2 * np.pi)
+
+
+def teme_to_ecef(positions, jd, fr):
+    '''
+    Rotates TEME positions shaped (..., times, 3) into the Earth fixed frame
+    '''
+    theta = gmst(jd, fr)
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    x, y, z = positions[..., 0], positions[..., 1], positions[..., 2]
+    return np.stack((cos_t * x + sin_t * y,
+                     -sin_t * x + cos_t * y,
+                     z), axis=-1)
+
+
+def ecef_to_geodetic(positions):
+    '''
+    Converts Earth fixed positions (m) shaped (..., 3) into WGS84 latitude
+    and longitude (degrees) and height (m)
+    '''
+    x, y, z = positions[..., 0], positions[..., 1], positions[..., 2]
+    p = np.hypot(x, y)
+    lat = np.arctan2(z, p * (1 - WGS84_E2))
+    for _ in range(4):
+        n = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(lat)**2)
+        height = p * np.cos(lat) + z * np.sin(lat) - WGS84_A * WGS84_A / n
+        lat = np.arctan2(z, p * (1 - WGS84_E2 * n / (n + height)))
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(lat)**2)
+    height = p * np.cos(lat) + z * np.sin(lat) - WGS84_A * WGS84_A / n
+    return np.degrees(lat), np.degrees(np.arctan2(y, x)), height
+
+
+def geodetic_to_ecef(lat, lon, height=0.0):
+    '''
+    Converts WGS84 latitude and longitude (degrees) and height (m) into
+    Earth fixed positions (m) shaped (..., 3)
+    '''
+    lat, lon = np.radians(lat), np.radians(lon)
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(lat)**2)
+    return np.stack(((n + height) * np.cos(lat) * np.cos(lon),
+                     (n + height) * np.cos(lat) * np.sin(lon),
+                     (n * (1 - WGS84_E2) + height) * np.sin(lat)), axis=-1)
+
+
+def lagrange_interpolate(offsets, positions, times, degree):
+    '''
+    Interpolates positions sampled at offsets, shaped (..., offsets, 3), at
+    other times with Lagrange polynomials of the given degree.  Like
+    Cesium, the degree + 1 samples used start degree // 2 + 1 samples
+    before each time, moved inwards at the ends.  Times outside the samples
+    give NaN.  Returns (..., times, 3).
+    '''
+    times = np.asarray(times, dtype=float)
+    points = min(degree + 1, len(offsets))
+    first = np.clip(np.searchsorted(offsets, times) - degree // 2 - 1, 0, len(offsets) - points)
+    window = first[:, None] + np.arange(points)
+    x = offsets[window]
+
+    # weight of sample j: product over the others m of (t - x_m) / (x_j - x_m)
+    others = ~np.eye(points, dtype=bool)
+    numerators = np.where(others, (times[:, None] - x)[:, None, :], 1.0).prod(axis=-1)
+    denominators = np.where(others, x[:, :, None] - x[:, None, :], 1.0).prod(axis=-1)
+    result = np.einsum('qp,...qpc->...qc', numerators / denominators, positions[..., window, :])
+    result[..., (times < offsets[0]) | (times > offsets[-1]), :] = np.nan
+    return result
+
+
+def hermite_interpolate(offsets, positions, velocities, times, degree=3):
+    '''
+    Interpolates positions and velocities sampled at offsets, shaped
+    (..., offsets, 3), at other times with Hermite polynomials of the given
+    degree (odd).  Like Cesium, these match the position and velocity at
+    (degree + 1) // 2 samples, at least 2, here the ones around each time.
+    Times outside the samples give NaN.  Returns (..., times, 3).
+    '''
+    times = np.asarray(times, dtype=float)
+    points = min(max((degree + 1) // 2, 2), len(offsets))
+    first = np.clip(np.searchsorted(offsets, times) - points // 2, 0, len(offsets) - points)
+    window = first[:, None] + np.arange(points)
+    x = offsets[window]
+
+    # With the Lagrange basis l_j of the samples, sample j weighs its
+    # position by (1 - 2 l_j'(x_j) (t - x_j)) l_j(t)^2 and its velocity by
+    # (t - x_j) l_j(t)^2
+    others = ~np.eye(points, dtype=bool)
+    dt = times[:, None] - x
+    gaps = np.where(others, x[:, :, None] - x[:, None, :], 1.0)
+    squared = (np.where(others, dt[:, None, :], 1.0).prod(axis=-1) / gaps.prod(axis=-1))**2
+    slopes = np.where(others, 1.0 / gaps, 0.0).sum(axis=-1)
+    result = (np.einsum('qp,...qpc->...qc', (1 - 2 * slopes * dt) * squared, positions[..., window, :]) +
+              np.einsum('qp,...qpc->...qc', dt * squared, velocities[..., window, :]))
+    result[..., (times < offsets[0]) | (times > offsets[-1]), :] = np.nan
+    return result
@@ -0,0 +1,124 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import numpy as np
+
+# Mean Earth radius (m) used for footprint calculations
+EARTH_RADIUS = 6371000.0
+
+
+def check_region(region):
+    '''
+    Checks the region is a [west, south, east, north] bounding box in degrees.
+    West may be greater than east when the box crosses the antimeridian.
+    '''
+    if region is None or len(region) != 4:
+        raise Exception(f"Region must have 4 elements [west, south, east, north]. Got: {region}")
+    west, south, east, north = [float(x) for x in region]
+    if not (-90 <= south <= north <= 90):
+        raise Exception(f"Region latitudes must satisfy -90 <= south <= north <= 90. Got: {region}")
+    if not (-180 <= west <= 180 and -180 <= east <= 180):
+        raise Exception(f"Region longitudes must be between -180 and 180. Got: {region}")
+    return [west, south, east, north]
+
+
+def footprint_angle(height, min_elevation=0.0):
+    '''
+    Earth central angle (radians) between the sub-satellite point and the
+    edge of the area where the satellite is at least min_elevation degrees
+    above the horizon
+    '''
+    elevation = np.radians(min_elevation)
+    ratio = EARTH_RADIUS / (EARTH_RADIUS + np.maximum(height, 0.0))
+    return np.arccos(np.clip(ratio * np.cos(elevation), -1, 1)) - elevation
+
+
+def _angle_to_meridian(lat, dlon, south, north):
+    '''
+    Angular distance (radians) from points to the meridian segment dlon
+    radians away between the south and north latitudes
+    '''
+    def angle(to_lat):
+        cos_angle = np.sin(lat) * np.sin(to_lat) + np.cos(lat) * np.cos(to_lat) * np.cos(dlon)
+        return np.arccos(np.clip(cos_angle, -1, 1))
+
+    # The closest point of the whole meridian circle, which may be past a
+    # pole; if it isn't on the segment the closest end is
+    foot = np.arctan2(np.tan(lat), np.cos(dlon))
+    on_segment = (foot >= south) & (foot <= north)
+    return np.where(on_segment, angle(np.clip(foot, south, north)), np.minimum(angle(south), angle(north)))
+
+
+def angle_to_region(lat, lon, region):
+    '''
+    Angular distance (radians) from points, given as latitude and longitude
+    arrays in degrees, to the closest point of the region
+    '''
+    west, south, east, north = np.radians(region)
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+
+    width = np.mod(east - west, 2 * np.pi)
+    from_west = np.mod(lon - west, 2 * np.pi)
+    inside_lon = from_west <= width
+
+    inside = np.abs(lat - np.clip(lat, south, north))
+    outside = np.minimum(_angle_to_meridian(lat, from_west - 2 * np.pi, south, north),
+                         _angle_to_meridian(lat, from_west - width, south, north))
+    return np.where(inside_lon, inside, outside)
+
+
+def relevant_mask(lat, lon, height, region, min_elevation=0.0):
+    '''
+    Flags the samples (shaped satellites x times) where the satellite can be
+    seen from somewhere in the region.  The footprint is widened by half the
+    ground track travelled between samples so passes between two samples
+    are not missed.
+    '''
+    reach = footprint_angle(height, min_elevation)
+    if lat.shape[-1] > 1:
+        lat_r, lon_r = np.radians(lat), np.radians(lon)
+        cos_step = (np.sin(lat_r[..., 1:]) * np.sin(lat_r[..., :-1]) +
+                    np.cos(lat_r[..., 1:]) * np.cos(lat_r[..., :-1]) *
+                    np.cos(lon_r[..., 1:] - lon_r[..., :-1]))
+        # fmax skips samples sgp4 could not propagate (NaN)
+        step = np.fmax.reduce(np.arccos(np.clip(cos_step, -1, 1)), axis=-1, keepdims=True)
+        reach = reach + step / 2
+    return angle_to_region(lat, lon, region) <= reach
+
+
+def intersect_intervals(a, b):
+    '''
+    Returns the overlaps of two sorted lists of (start, end) intervals
+    '''
+    overlaps = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if start < end:
+            overlaps.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return overlaps
+
+
+def mask_intervals(mask, offsets, pad=0.0):
+    '''
+    Returns (start, end) offsets for each run of True samples in mask,
+    widened by pad seconds on both sides
+    '''
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+
+    intervals = []
+    for s, e in zip(starts, ends):
+        start, end = offsets[s] - pad, offsets[e] + pad
+        if intervals and start <= intervals[-1][1]:
+            intervals[-1] = (intervals[-1][0], end)
+        else:
+            intervals.append((start, end))
+    return intervals
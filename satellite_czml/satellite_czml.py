@@ -2,15 +2,300 @@
 # Author: Nicholas Miller (miller.nicholas.a@gmail.com)
 # https://github.com/cassova/satellite-czml
 
+# numpy and the modules built on it are imported on first use, so that
+# importing the package stays fast
 from .czml import (CZML, Billboard, CZMLPacket, Description, Label,
-                   Path, Position, Point)
-from sgp4.earth_gravity import wgs72
-from sgp4.io import twoline2rv
-
-from datetime import datetime, timedelta
-import pytz
+                   Orientation, Path, Polygon, Position, Point, _json)
+from .instrumentation import stage
+from .isotime import format_interval, format_iso
+from .styles import style_registry
+from .writers import compression_for, iter_compressed, iter_text, write_chunks
+from sgp4.api import Satrec, WGS72
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, wraps
+from operator import itemgetter
 import random
 import math
+import threading
+
+# Default position sampling and path resolution for each orbit regime.
+# Positions are sampled samplesPerOrbit times per orbit (more for eccentric
+# orbits, which move fastest at perigee), at most maxStep seconds apart,
+# which keeps the interpolation error within about 100 m at any mean
+# motion.  A fixed step (seconds) can be set instead.  When velocities are
+# written too (use_velocity) Cesium interpolates with Hermite polynomials
+# and the step is multiplied by velocityStepFactor.  Over a day, degree 7
+# Hermite at twice the step stays within the Lagrange error of
+# near-circular LEO orbits (ISS: 6 m at 600 s vs 18 m at 300 s).  sgp4's
+# velocities drift from the rate of change of its positions as the
+# eccentricity grows and in deep space (periods over 225 minutes), where
+# Hermite is less accurate than Lagrange at any step.  There, and above
+# velocityMaxEccentricity, velocities would only make the document bigger,
+# so they are not written (velocityStepFactor None).
+REGIME_SETTINGS = {
+    'LEO': {'step': None, 'samplesPerOrbit': 18, 'maxStep': 300, 'interpolationDegree': 7,
+            'resolution': 120, 'velocityStepFactor': 2, 'velocityMaxEccentricity': 0.02,
+            'velocityInterpolationDegree': 7},
+    'MEO': {'step': None, 'samplesPerOrbit': 24, 'maxStep': 3000, 'interpolationDegree': 7,
+            'resolution': 900, 'velocityStepFactor': None, 'velocityMaxEccentricity': 0.02,
+            'velocityInterpolationDegree': 7},
+    'GEO': {'step': None, 'samplesPerOrbit': 24, 'maxStep': 3600, 'interpolationDegree': 7,
+            'resolution': 1800, 'velocityStepFactor': None, 'velocityMaxEccentricity': 0.02,
+            'velocityInterpolationDegree': 7},
+    'HEO': {'step': None, 'samplesPerOrbit': 30, 'maxStep': 300, 'interpolationDegree': 7,
+            'resolution': 120, 'velocityStepFactor': None, 'velocityMaxEccentricity': 0.02,
+            'velocityInterpolationDegree': 7},
+}
+
+# Separators the TLE lines must have, as sgp4 checks them: a getter for
+# their columns and the characters expected there
+TLE_LINE1_SEPARATORS = (itemgetter(8, 23, 32, 34, 43, 52, 61, 63), (' ', '.', ' ', '.', ' ', ' ', ' ', ' '))
+TLE_LINE2_SEPARATORS = (itemgetter(7, 11, 16, 20, 25, 33, 37, 42, 46, 51),
+                        (' ', '.', ' ', '.', ' ', ' ', '.', ' ', '.', ' '))
+
+
+def tle_checksum(line):
+    '''
+    Modulo 10 checksum of the first 68 characters of a TLE line (digits
+    count their value and minus signs count 1)
+    '''
+    line = line[:68]
+    return (sum(int(digit) * line.count(digit) for digit in '123456789') + line.count('-')) % 10
+
+
+def tle_id(tle, name=None):
+    '''
+    Returns the NORAD catalog number of a TLE, or its name (the given one
+    or the TLE's title line) if the number can't be read
+    '''
+    try:
+        return int(tle[-2][2:7])
+    except (ValueError, TypeError, IndexError):
+        if name is None and isinstance(tle, (list, tuple)) and len(tle) == 3:
+            name = tle[0].strip()
+        return name
+
+
+def orbit_regime(mean_motion, eccentricity):
+    '''
+    Classifies an orbit as LEO, MEO, GEO or HEO from its mean motion
+    (revolutions per day) and eccentricity
+    '''
+    if eccentricity >= 0.25:
+        return 'HEO'
+    elif mean_motion >= 11.25:
+        return 'LEO'
+    elif mean_motion < 1.5:
+        return 'GEO'
+    return 'MEO'
+
+
+def velocities_shorten(eccentricity, settings):
+    '''
+    Tells if writing velocities lets an orbit with the given regime
+    settings (see REGIME_SETTINGS) be sampled less often
+    '''
+    factor = settings['velocityStepFactor']
+    return factor is not None and factor > 1 and eccentricity <= settings['velocityMaxEccentricity']
+
+
+def orbit_sample_step(mean_motion, eccentricity, settings, use_velocity=False):
+    '''
+    Returns the seconds between position samples of an orbit with the
+    given regime settings (see REGIME_SETTINGS)
+    '''
+    factor = settings['velocityStepFactor'] if use_velocity and velocities_shorten(eccentricity, settings) else 1
+    if settings['step'] is not None:
+        return settings['step'] * factor
+
+    # Eccentric orbits sweep (1 + e)^2 / (1 - e^2)^1.5 times faster at
+    # perigee than on average
+    perigee_rate = (1 + eccentricity)**2 / (1 - eccentricity**2)**1.5
+    step = min(86400.0 / (mean_motion * settings['samplesPerOrbit'] * perigee_rate),
+               settings['maxStep']) * factor
+
+    # Rounded down to two significant figures (whole seconds), so
+    # satellites with similar periods share a sample grid
+    scale = 10 ** max(0, int(math.log10(step)) - 1)
+    return max(1, int(step // scale) * scale)
+
+
+def _isoformat_array(start_time, offsets_us):
+    '''
+    Formats start_time plus each offset (in microseconds) exactly as
+    datetime.isoformat() would, in one vectorized step
+    '''
+    import numpy as np
+    tzinfo = start_time.tzinfo
+    if tzinfo is not None and tzinfo.utcoffset(None) is None:
+        # The UTC offset may change within the window (e.g. DST)
+        return [(start_time + timedelta(microseconds=int(us))).isoformat()
+                for us in offsets_us]
+
+    suffix = start_time.replace(microsecond=0).isoformat()[19:]
+    wall_times = (np.datetime64(start_time.replace(tzinfo=None), 'us') +
+                  np.asarray(offsets_us, dtype='timedelta64[us]'))
+    return [(t[:-7] if t.endswith('.000000') else t) + suffix
+            for t in np.datetime_as_string(wall_times, unit='us').tolist()]
+
+
+def footprint_intervals(start_time, end_time, times):
+    '''
+    Returns the interval strings during which each footprint is shown:
+    from halfway after the previous footprint time to halfway before the
+    next, within start_time to end_time.  Footprints after end_time get
+    no interval (and are dropped by zip).
+    '''
+    import numpy as np
+    window = (end_time - start_time).total_seconds()
+    bounds = np.clip(np.concatenate(([0.0], (times[1:] + times[:-1]) / 2, [window])), 0.0, window)
+    count = int(np.searchsorted(bounds, window))
+    iso = _isoformat_array(start_time, np.rint(bounds[:count + 1] * 1e6).astype(np.int64))
+    return [a + '/' + b for a, b in zip(iso[:-1], iso[1:])]
+
+
+def availability_intervals(start_time, spans):
+    '''
+    Formats (start, end) spans in seconds since start_time as an
+    availability: one interval string, a list of them, or None if empty
+    '''
+    intervals = [format_interval(start_time + timedelta(seconds=start),
+                                 start_time + timedelta(seconds=end)) for start, end in spans]
+    if not intervals:
+        return None
+    return intervals[0] if len(intervals) == 1 else intervals
+
+
+class _interval(dict):
+    '''
+    A read-only interval dict, so one can be shared by every satellite
+    with the same period.  Assign a new list to change a path.
+    '''
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('Shared lead/trail intervals are read-only')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+
+@lru_cache(maxsize=1024)
+def _lead_trail_intervals(start_time, tzinfo, fold, end_time, orbital_time):
+    import numpy as np
+    minutes_in_sim = int((end_time - start_time).total_seconds()/60)
+    left_over_minutes = minutes_in_sim % orbital_time
+    number_of_full_orbits = math.floor(minutes_in_sim / orbital_time)
+
+    # Boundaries as integer microseconds since start_time, rounded the same
+    # way repeatedly adding timedelta(minutes=...) would round them
+    one_us = timedelta(microseconds=1)
+    first_us = timedelta(minutes=left_over_minutes) // one_us
+    orbit_us = timedelta(minutes=orbital_time) // one_us
+    boundaries = np.zeros(number_of_full_orbits + 2, dtype=np.int64)
+    boundaries[1:] = first_us + orbit_us * np.arange(number_of_full_orbits + 1, dtype=np.int64)
+    times = _isoformat_array(start_time, boundaries)
+
+    orbital_time_in_seconds = orbital_time * 60.0
+    lead_number = (0, orbital_time_in_seconds, orbital_time_in_seconds, 0)
+    trail_number = (0, 0, orbital_time_in_seconds, orbital_time_in_seconds)
+    lead_times = []
+    trail_times = []
+    for epoch, end in zip(times[:-1], times[1:]):
+        interval = epoch + '/' + end
+        lead_times.append(_interval(interval=interval, epoch=epoch, number=lead_number))
+        trail_times.append(_interval(interval=interval, epoch=epoch, number=trail_number))
+    return tuple(lead_times), tuple(trail_times)
+
+
+def lead_trail_intervals(start_time, end_time, orbital_time):
+    '''
+    Builds the lead and trail time intervals for an orbit path of
+    orbital_time minutes.  All interval boundaries are computed at once and
+    the result is cached, so satellites with the same period share the same
+    read-only tuples of intervals.
+    '''
+    # Equal datetimes in different zones print differently, so the zone is
+    # part of the key (as in isotime.format_iso)
+    return _lead_trail_intervals(start_time, start_time.tzinfo, start_time.fold,
+                                 end_time, orbital_time)
+
+
+def locked(method):
+    '''
+    Runs a satellite_czml method while holding the object's lock
+    '''
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+# Ways position_at can answer, and the frames it can answer in
+QUERY_METHODS = ('auto', 'interpolate', 'propagate')
+QUERY_FRAMES = ('teme', 'ecef', 'geodetic')
+
+
+def positions_at(sats, start_time, times, method='auto', frame='teme', max_elements=1 << 24):
+    '''
+    Returns the positions of the satellites at times (seconds since
+    start_time) shaped (satellites, times, 3).  'interpolate' interpolates
+    the cached samples the way Cesium interpolates the CZML: Lagrange
+    polynomials of each satellite's interpolation degree, or Hermite
+    polynomials using the velocities too with use_velocity.  It gives NaN
+    outside the samples or next to samples sgp4 could not propagate;
+    'propagate' runs sgp4 at the times; 'auto' interpolates and propagates
+    only where interpolation gave NaN.  Positions are TEME or Earth fixed
+    (m), or WGS84 latitude, longitude (degrees) and height (m).
+    '''
+    from .propagation import (ecef_to_geodetic, hermite_interpolate, julian_dates,
+                              lagrange_interpolate, propagate, teme_to_ecef)
+    import numpy as np
+    if method not in QUERY_METHODS:
+        raise Exception(f"Method {method} is not supported. Expected one of {list(QUERY_METHODS)}.")
+    if frame not in QUERY_FRAMES:
+        raise Exception(f"Frame {frame} is not supported. Expected one of {list(QUERY_FRAMES)}.")
+    times = np.asarray(times, dtype=float)
+    result = np.full((len(sats), len(times), 3), np.nan)
+
+    if method == 'propagate':
+        result[:] = propagate([sat.satrec for sat in sats], start_time, times)[0]
+    else:
+        groups = {}
+        for i, sat in enumerate(sats):
+            key = (sat.sample_key, sat.use_velocity, sat.get_interpolation_degree())
+            groups.setdefault(key, []).append(i)
+        for ((sample_start, _, _), use_velocity, degree), rows in groups.items():
+            offsets = sats[rows[0]].sample_offsets
+            shift = (start_time - sample_start).total_seconds()
+            # Interpolating gathers (satellites, times, degree + 1, 3) values
+            block = max(1, max_elements // max(1, len(times) * (degree + 1) * 3))
+            for first in range(0, len(rows), block):
+                chunk = rows[first:first + block]
+                samples = np.stack([sats[i].sample_positions for i in chunk])
+                if use_velocity:
+                    velocities = np.stack([sats[i].sample_velocities for i in chunk])
+                    result[chunk] = hermite_interpolate(offsets, samples, velocities, times + shift, degree)
+                else:
+                    result[chunk] = lagrange_interpolate(offsets, samples, times + shift, degree)
+
+        missing = ~np.isfinite(result).all(axis=-1)
+        if method == 'auto' and missing.any():
+            rows, columns = np.flatnonzero(missing.any(axis=1)), np.flatnonzero(missing.any(axis=0))
+            propagated = propagate([sats[i].satrec for i in rows], start_time, times[columns])[0]
+            fill = missing[np.ix_(rows, columns)]
+            block = result[np.ix_(rows, columns)]
+            block[fill] = propagated[fill]
+            result[np.ix_(rows, columns)] = block
+
+    if frame != 'teme':
+        result = teme_to_ecef(result, *julian_dates(start_time, times))
+    if frame == 'geodetic':
+        result = np.stack(ecef_to_geodetic(result), axis=-1)
+    return result
+
 
 class satellite():
     '''
@@ -30,21 +315,43 @@ class satellite():
     marker_scale = 1.5
     show_label = True
     show_path = True
-    start_time = datetime.utcnow().replace(tzinfo=pytz.UTC)
+    start_time = datetime.utcnow().replace(tzinfo=timezone.utc)
     end_time = start_time + timedelta(hours=24)
     tle = []
-    tle_obj = None
+    _tle_obj = None
+    satrec = None
+    mean_motion = None
+    eccentricity = None
+    orbit_regime = None
+    regime_settings = None
+    use_velocity = False
+    attitude_mode = None
+    sensor = None
     
     czmlMarker = None
     czmlLabel = None
     czmlPath = None
     czmlPosition = None
+    czmlOrientation = None
+    czmlCone = None
+    czmlFootprint = None
+    graphics = ('czmlMarker', 'czmlLabel', 'czmlPath', 'czmlPosition', 'czmlOrientation', 'czmlCone',
+                'czmlFootprint')
+
+    sample_key = None
+    sample_offsets = None
+    sample_positions = None
+    sample_velocities = None
+    sample_valid = None
     
     def __init__(self, tle, name=None, description=None, color=None, image=None,
                  marker_scale=None, use_default_image=True, start_time=None, end_time=None,
-                 show_label=True, show_path=True):
+                 show_label=True, show_path=True, regime_settings=None, use_velocity=False,
+                 attitude_mode=None, sensor=None, rng=None):
 
         # Validate the inputs
+        from .attitude import check_attitude_mode
+        from .sensors import check_sensor
         self.id = int(tle[1][2:7])
 
         if name is None:
@@ -64,7 +371,7 @@ class satellite():
         else:
             self.description = 'Orbit of Satellite: ' + self.name
 
-        self.color = self.__check_color(color)
+        self.color = self.__check_color(color, rng)
         self.show_label = show_label
         self.show_path = show_path
 
@@ -81,7 +388,20 @@ class satellite():
         if end_time is not None:
             self.end_time = end_time
 
-        self.tle_obj = twoline2rv(self.tle[0], self.tle[1], wgs72)
+        self.__check_tle_format(self.tle[0], self.tle[1])
+        self.satrec = Satrec.twoline2rv(self.tle[0], self.tle[1], WGS72)
+        self.mean_motion = float(self.tle[1][52:63])
+        self.eccentricity = float('0.' + self.tle[1][26:33])
+        self.orbit_regime = orbit_regime(self.mean_motion, self.eccentricity)
+        self.regime_settings = self.__check_regime_settings(regime_settings)
+        # Velocities are only written where they save position samples
+        self.use_velocity = use_velocity and velocities_shorten(self.eccentricity, self.regime_settings)
+        self.attitude_mode = check_attitude_mode(attitude_mode)
+
+        # Sensors point at nadir, which needs the attitude written out
+        self.sensor = check_sensor(sensor)
+        if self.sensor is not None and self.attitude_mode is None:
+            self.attitude_mode = 'lvlh'
 
     def __check_tle_for_names(self, tle):
         '''
@@ -103,9 +423,68 @@ class satellite():
                             f"(first line containing name is optional\nTLE:\n{tle}")
         return tle
 
-    def __check_color(self, color):
+    def __check_tle_format(self, line1, line2):
+        '''
+        Checks the column layout, numbers and checksums of the TLE lines
+        the way sgp4's legacy parser does (the faster Satrec parser
+        doesn't), without building its model
+        '''
+        for number, line, (columns, separators) in ((1, line1, TLE_LINE1_SEPARATORS),
+                                                    (2, line2, TLE_LINE2_SEPARATORS)):
+            line = line.rstrip()
+            if (len(line) < (64 if number == 1 else 68) or not line.startswith(f'{number} ') or
+                    columns(line) != separators):
+                raise ValueError(f"TLE line {number} is not in the expected format: {line}")
+            if len(line) >= 69 and line[68].isdigit() and tle_checksum(line) != int(line[68]):
+                raise ValueError(f"TLE line {number} fails its checksum: {line}")
+        if line1[2:7] != line2[2:7]:
+            raise ValueError(f"Object numbers in TLE lines 1 and 2 do not match: {line1[2:7]} {line2[2:7]}")
+        try:
+            int(line1[18:20]), float(line1[20:32]), float(line1[33:43])
+            float(line1[44] + '.' + line1[45:50]), int(line1[50:52])
+            float(line1[53] + '.' + line1[54:59]), int(line1[59:61]), int(line1[64:68])
+            float(line2[8:16]), float(line2[17:25]), float('0.' + line2[26:33].replace(' ', '0'))
+            float(line2[34:42]), float(line2[43:51]), float(line2[52:63])
+        except ValueError as e:
+            raise ValueError(f"TLE has a bad number: {e}")
+        return True
+
+    @property
+    def tle_obj(self):
+        '''
+        Legacy sgp4 model object, only kept once something asks for it
+        '''
+        if self._tle_obj is None:
+            from sgp4.earth_gravity import wgs72
+            from sgp4.io import twoline2rv
+            self._tle_obj = twoline2rv(self.tle[0], self.tle[1], wgs72)
+        return self._tle_obj
+
+    @tle_obj.setter
+    def tle_obj(self, tle_obj):
+        self._tle_obj = tle_obj
+
+    def __check_regime_settings(self, regime_settings):
+        '''
+        Merges per regime overrides into the default sampling settings
+        for this satellite's orbit regime
         '''
-        Checks if color is valid or generates a random one
+        regime_settings = regime_settings or {}
+        for regime, settings in regime_settings.items():
+            if regime not in REGIME_SETTINGS:
+                raise Exception(f"Orbit regime {regime} is not supported. Expected one of " +
+                                f"{list(REGIME_SETTINGS)}.")
+            for key in settings:
+                if key not in REGIME_SETTINGS[regime]:
+                    raise Exception(f"Regime setting {key} is not supported. Expected one of " +
+                                    f"{list(REGIME_SETTINGS[regime])}.")
+        return dict(REGIME_SETTINGS[self.orbit_regime],
+                    **regime_settings.get(self.orbit_regime, {}))
+
+    def __check_color(self, color, rng=None):
+        '''
+        Checks if color is valid or generates a random one with rng (a
+        random.Random, or the random module if None)
         '''
         if color is not None and len(color) not in [3,4]:
             raise Exception(f"Color for {self.name} only has {len(color)} elements.  Expected 3 or 4." +
@@ -115,7 +494,7 @@ class satellite():
                 if x is None or x < 0 or x > 255:
                     raise Exception(f"Color value {x} is not supported. Expected value between 0 and 255.")
         else:
-            color = [random.randrange(256) for x in range(3)]
+            color = [(rng or random).randrange(256) for x in range(3)]
 
         if len(color) == 3:
             # Default missing alpha to 255
@@ -123,6 +502,21 @@ class satellite():
 
         return color
 
+    def get_unbuilt_graphics(self):
+        '''
+        Returns the names of the CZML graphics not built yet
+        '''
+        return tuple(name for name in self.graphics if getattr(self, name) is None)
+
+    def release_graphics(self, names=None):
+        '''
+        Drops the cached CZML graphics in names (all if None), which are
+        built again when needed.  The propagated samples are kept.
+        '''
+        for name in self.graphics if names is None else names:
+            setattr(self, name, None)
+        return True
+
     def build_marker(self,
                      image=None,
                      show_marker=True,
@@ -182,7 +576,7 @@ class satellite():
                    color=None,
                    interval=None,
                    width=1,
-                   resolution=120,
+                   resolution=None,
                    lead_times=None,
                    trail_times=None,
                    start_time=None,
@@ -193,13 +587,13 @@ class satellite():
         '''
         if self.czmlPath is None or rebuild:
             if interval is None:
-                interval = self.start_time.isoformat() + "/" + self.end_time.isoformat()
+                interval = format_interval(self.start_time, self.end_time)
 
             self.czmlPath = Path()
             self.czmlPath.show=[{"interval": interval, "boolean": show or self.show_path}]
             self.czmlPath.width = width
             self.czmlPath.material = {"solidColor": {"color": {"rgba": color or self.color}}}
-            self.czmlPath.resolution = resolution
+            self.czmlPath.resolution = resolution or self.regime_settings['resolution']
 
             if lead_times is None and trail_times is None:
                 lead_times, trail_times = self.build_lead_trail_times(start_time, end_time)
@@ -211,51 +605,219 @@ class satellite():
     def build_position(self,
                        start_time=None,
                        end_time=None,
-                       interpolationAlgorithm = "LAGRANGE",
-                       interpolationDegree = 5,
+                       interpolationAlgorithm = None,
+                       interpolationDegree = None,
                        referenceFrame = "INERTIAL",
                        tle_object=None,
-                       step=300,
-                       rebuild=False):
+                       step=None,
+                       rebuild=False,
+                       use_velocity=None):
         '''
-        Creates the satellite positions and settings
+        Creates the satellite positions and settings.  With use_velocity
+        the samples carry velocities as well (cartesianVelocity) and are
+        interpolated with Hermite polynomials.
         '''
+        from .propagation import time_offsets
+        import numpy as np
         start_time = start_time or self.start_time
         end_time = end_time or self.end_time
-        tle_object = tle_object or self.tle_obj
+        if use_velocity is None:
+            use_velocity = self.use_velocity
+        if use_velocity:
+            interpolationAlgorithm = interpolationAlgorithm or "HERMITE"
+        else:
+            interpolationAlgorithm = interpolationAlgorithm or "LAGRANGE"
+        interpolationDegree = interpolationDegree or self.get_interpolation_degree(use_velocity)
+        step = step or self.get_sample_step(use_velocity)
 
-        if self.czmlPosition is None:
+        if self.czmlPosition is None or rebuild:
             self.czmlPosition = Position()
             self.czmlPosition.interpolationAlgorithm = interpolationAlgorithm
             self.czmlPosition.interpolationDegree = interpolationDegree
             self.czmlPosition.referenceFrame = referenceFrame
-            self.czmlPosition.epoch = start_time.isoformat()
-
-            number_of_positions = int((end_time - start_time).total_seconds()/300)
-            number_of_positions += 5 # so there is more than 1
-            time_step=0
-
-            positions=[]
-            for _ in range(number_of_positions):
-                current_time = start_time + timedelta(seconds=time_step)
-                eci_position, _ = tle_object.propagate(current_time.year, current_time.month,
-                                                       current_time.day, current_time.hour,
-                                                       current_time.minute, current_time.second)
-
-                positions.append(time_step)
-                positions.append(eci_position[0] * 1000)  # converts km's to m's
-                positions.append(eci_position[1] * 1000)
-                positions.append(eci_position[2] * 1000)
-                time_step += step
-            self.czmlPosition.cartesian = positions
+            self.czmlPosition.epoch = format_iso(start_time)
+
+            if tle_object is not None:
+                # Legacy sgp4 model objects are propagated one sample at a time
+                positions = []
+                for time_step in time_offsets(start_time, end_time, step):
+                    current_time = start_time + timedelta(seconds=time_step)
+                    eci_position, eci_velocity = tle_object.propagate(current_time.year, current_time.month,
+                                                                      current_time.day, current_time.hour,
+                                                                      current_time.minute, current_time.second)
+                    positions.append(time_step)
+                    positions.extend([x * 1000 for x in eci_position])  # converts km's to m's
+                    if use_velocity:
+                        positions.extend([x * 1000 for x in eci_velocity])
+            else:
+                offsets, eci_positions, eci_velocities = self.propagate(start_time, end_time, step)
+                if not self.sample_valid.all():
+                    # Leave out the samples sgp4 could not propagate
+                    valid = self.sample_valid
+                    offsets, eci_positions, eci_velocities = offsets[valid], eci_positions[valid], eci_velocities[valid]
+                columns = (offsets, eci_positions, eci_velocities) if use_velocity else (offsets, eci_positions)
+                positions = np.column_stack(columns).ravel().tolist()
+            if use_velocity:
+                self.czmlPosition.cartesianVelocity = positions
+            else:
+                self.czmlPosition.cartesian = positions
         return self.czmlPosition
 
+    def build_orientation(self, mode=None, quaternions=None, rebuild=False):
+        '''
+        Creates the satellite attitude as unitQuaternion samples at the
+        position sample times.  quaternions (times x 4) computed elsewhere,
+        e.g. for many satellites at once, can be passed in.
+        '''
+        from .attitude import attitude_quaternions, check_attitude_mode
+        from .propagation import julian_dates
+        import numpy as np
+        mode = check_attitude_mode(mode or self.attitude_mode or 'lvlh')
+
+        if self.czmlOrientation is None or rebuild:
+            offsets, positions, velocities = self.propagate()
+            start_time = self.sample_key[0]
+            if quaternions is None:
+                quaternions = attitude_quaternions(positions[None], velocities[None],
+                                                   *julian_dates(start_time, offsets), mode=mode)[0]
+
+            self.czmlOrientation = Orientation()
+            self.czmlOrientation.interpolationAlgorithm = "LINEAR"
+            self.czmlOrientation.interpolationDegree = 1
+            self.czmlOrientation.epoch = format_iso(start_time)
+            valid = self.sample_valid & np.isfinite(quaternions).all(axis=-1)
+            self.czmlOrientation.unitQuaternion = np.column_stack((offsets[valid],
+                                                                   quaternions[valid])).ravel().tolist()
+        return self.czmlOrientation
+
+    def build_cone(self, rebuild=False):
+        '''
+        Creates the sensor cone, pointing along the body Z axis (nadir)
+        '''
+        from .region import EARTH_RADIUS
+        from .sensors import sensor_cone
+        import numpy as np
+        if self.sensor is None:
+            return None
+        if self.czmlCone is None or rebuild:
+            _, positions, _ = self.propagate()
+            heights = np.linalg.norm(positions, axis=-1) - EARTH_RADIUS
+            self.czmlCone = sensor_cone(self.sensor, heights)
+        return self.czmlCone
+
+    def build_footprint(self, times=None, vertices=None, rebuild=False):
+        '''
+        Creates the sensor ground footprint as a polygon whose positions
+        change at each footprint time.  times (seconds since the sample
+        start) and vertices (times x [lon, lat, 0, ...]) computed elsewhere,
+        e.g. for many satellites at once, can be passed in.
+        '''
+        from .sensors import sensor_footprints
+        import numpy as np
+        if self.sensor is None or not self.sensor['footprint']:
+            return None
+
+        if self.czmlFootprint is None or rebuild:
+            offsets, positions, velocities = self.propagate()
+            start_time, end_time, _ = self.sample_key
+            if vertices is None:
+                times, vertices = sensor_footprints(start_time, offsets, positions[None], velocities[None],
+                                                    [self.sensor['halfAngle']],
+                                                    int(self.sensor['footprintPoints']),
+                                                    int(self.sensor['footprintSubsteps']))
+                vertices = vertices[0]
+            valid = np.isfinite(vertices).all(axis=-1)
+            times, vertices = times[valid], vertices[valid]
+
+            color = list(self.sensor['color']) + [255] * (4 - len(self.sensor['color']))
+            self.czmlFootprint = Polygon()
+            self.czmlFootprint.material = {"solidColor": {"color": {"rgba": color}}}
+            self.czmlFootprint.positions = [{"interval": interval, "cartographicDegrees": ring}
+                                            for interval, ring in zip(footprint_intervals(start_time, end_time, times),
+                                                                      vertices.tolist())]
+        return self.czmlFootprint
+
+    def get_interpolation_degree(self, use_velocity=None):
+        '''
+        Returns the interpolation degree written with the positions
+        '''
+        if use_velocity is None:
+            use_velocity = self.use_velocity
+        if use_velocity:
+            return self.regime_settings['velocityInterpolationDegree']
+        return self.regime_settings['interpolationDegree']
+
+    def position_at(self, times, method='auto', frame='teme'):
+        '''
+        Returns the positions shaped (times, 3) at times (datetimes, numpy
+        datetime64 or seconds since start_time), interpolated from the
+        cached samples (see positions_at for the methods and frames)
+        '''
+        from .propagation import seconds_since
+        offsets = seconds_since(self.start_time, times)
+        if method != 'propagate':
+            self.propagate()
+        return positions_at([self], self.start_time, offsets, method, frame)[0]
+
+    def get_sample_step(self, use_velocity=None):
+        '''
+        Returns the seconds between position samples, derived from the
+        orbital period (see orbit_sample_step)
+        '''
+        if use_velocity is None:
+            use_velocity = self.use_velocity
+        return orbit_sample_step(self.mean_motion, self.eccentricity, self.regime_settings, use_velocity)
+
+    def propagate(self, start_time=None, end_time=None, step=None, rebuild=False):
+        '''
+        Returns the sample times (seconds since start_time) with the TEME
+        positions (m) and velocities (m/s) at each, propagating only if
+        they are not already cached
+        '''
+        from .propagation import propagate, time_offsets
+        start_time = start_time or self.start_time
+        end_time = end_time or self.end_time
+        step = step or self.get_sample_step()
+
+        if self.sample_key != (start_time, end_time, step) or rebuild:
+            offsets = time_offsets(start_time, end_time, step)
+            positions, velocities, valid = propagate([self.satrec], start_time, offsets)
+            self.set_samples(start_time, end_time, step, offsets, positions[0], velocities[0], valid[0])
+        return self.sample_offsets, self.sample_positions, self.sample_velocities
+
+    def set_samples(self, start_time, end_time, step, offsets, positions, velocities, valid=None):
+        '''
+        Caches propagated samples (e.g. from a batch propagation) for
+        build_position to use.  valid flags the samples sgp4 propagated
+        without an error; by default those with finite values.
+        '''
+        import numpy as np
+        if valid is None:
+            valid = np.isfinite(positions).all(axis=-1) & np.isfinite(velocities).all(axis=-1)
+        self.sample_key = (start_time, end_time, step)
+        self.sample_offsets = offsets
+        self.sample_positions = positions
+        self.sample_velocities = velocities
+        self.sample_valid = valid
+        return True
+
+    def get_valid_spans(self):
+        '''
+        Returns the (start, end) spans, in seconds since the sample start,
+        that sgp4 could propagate within the time window
+        '''
+        from .region import intersect_intervals, mask_intervals
+        offsets, _, _ = self.propagate()
+        start_time, end_time, _ = self.sample_key
+        window = (end_time - start_time).total_seconds()
+        return intersect_intervals(mask_intervals(self.sample_valid, offsets), [(0.0, window)])
+
     def get_orbital_time(self):
         '''
         Extracts the number of orbits per day from the tle and calcualtes the
         time per orbit in minutes
         '''
-        return (24.0/float(self.tle[1][52:63]))*60.0
+        return (24.0/self.mean_motion)*60.0
 
     def build_lead_trail_times(self, start_time=None, end_time=None):
         '''
@@ -264,124 +826,76 @@ class satellite():
         start_time = start_time or self.start_time
         end_time = end_time or self.end_time
 
-        minutes_in_sim = int((end_time - start_time).total_seconds()/60)
-        left_over_minutes = minutes_in_sim % self.get_orbital_time()
-        number_of_full_orbits = math.floor(minutes_in_sim / self.get_orbital_time())
-        sp_start = start_time
-        sp_end = sp_start + timedelta(minutes=left_over_minutes)
-        sp_interval = (sp_start.isoformat() + '/' + sp_end.isoformat())
-        orbital_time_in_seconds = (self.get_orbital_time() * 60.0)
-
-        lead_times=[]
-        trail_times=[]
-        for _ in range(number_of_full_orbits + 1):
-            lead_times.append({
-                "interval": sp_interval,
-                "epoch": sp_start.isoformat(),
-                "number": [
-                    0, orbital_time_in_seconds,
-                    orbital_time_in_seconds, 0
-                ]
-            })
-            trail_times.append({
-                "interval": sp_interval,
-                "epoch": sp_start.isoformat(),
-                "number": [
-                    0, 0,
-                    orbital_time_in_seconds, orbital_time_in_seconds
-                ]
-            })
-
-            sp_start = sp_end
-            sp_end = (sp_start + timedelta(minutes=self.get_orbital_time()))
-            sp_interval = (sp_start.isoformat() + '/' + sp_end.isoformat())
-        return lead_times, trail_times
+        return lead_trail_intervals(start_time, end_time, self.get_orbital_time())
 
     def build_lead_time(self, start_time=None, end_time=None):
         '''
         Builds the lead time for the orbit path
         '''
-        start_time = start_time or self.start_time
-        end_time = end_time or self.end_time
-
-        minutes_in_sim = int((end_time - start_time).total_seconds()/60)
-        left_over_minutes = minutes_in_sim % self.get_orbital_time()
-        number_of_full_orbits = math.floor(minutes_in_sim / self.get_orbital_time())
-        sp_start = start_time
-        sp_end = sp_start + timedelta(minutes=left_over_minutes)
-        sp_interval = (sp_start.isoformat() + '/' + sp_end.isoformat())
-        orbital_time_in_seconds = (self.get_orbital_time() * 60.0)
-
-        lead_times=[]
-        for _ in range(number_of_full_orbits + 1):
-            lead_times.append({
-                "interval": sp_interval,
-                "epoch": sp_start.isoformat(),
-                "number": [
-                    0, orbital_time_in_seconds,
-                    orbital_time_in_seconds, 0
-                ]
-            })
-
-            sp_start = sp_end
-            sp_end = (sp_start + timedelta(minutes=self.get_orbital_time()))
-            sp_interval = (sp_start.isoformat() + '/' + sp_end.isoformat())
-        return lead_times
+        return self.build_lead_trail_times(start_time, end_time)[0]
 
     def build_trail_time(self, start_time=None, end_time=None):
         '''
         Builds the trail time for the orbit path
         '''
-        start_time = start_time or self.start_time
-        end_time = end_time or self.end_time
-
-        minutes_in_sim = int((end_time - start_time).total_seconds()/60)
-        left_over_minutes = minutes_in_sim % self.get_orbital_time()
-        number_of_full_orbits = math.floor(minutes_in_sim / self.get_orbital_time())
-        sp_start = start_time
-        sp_end = sp_start + timedelta(minutes=left_over_minutes)
-        sp_interval = (sp_start.isoformat() + '/' + sp_end.isoformat())
-        orbital_time_in_seconds = (self.get_orbital_time() * 60.0)
-
-        trail_times=[]
-        for _ in range(number_of_full_orbits + 1):
-            trail_times.append({
-                "interval": sp_interval,
-                "epoch": sp_start.isoformat(),
-                "number": [
-                    0, 0,
-                    orbital_time_in_seconds, orbital_time_in_seconds
-                ]
-            })
-
-            sp_start = sp_end
-            sp_end = (sp_start + timedelta(minutes=self.get_orbital_time()))
-            sp_interval = (sp_start.isoformat() + '/' + sp_end.isoformat())
-        return trail_times
+        return self.build_lead_trail_times(start_time, end_time)[1]
 
 class satellite_czml():
     '''
     Generates the CZML document used by Cesium for plotting Satellites
-    using TLE entries
+    using TLE entries.
+
+    Each object keeps its own satellites, time window and random colors,
+    so many can be used at once.  Methods that build or change cached
+    state (adding satellites, propagating, get_czml, write_czml, ...) hold
+    the object's lock, so get_czml can be called from several threads on
+    the same object too.  The generators (iter_packets, iter_text,
+    iter_compressed) don't hold it between packets; hold self._lock around
+    them if the object is shared.  Objects can share a propagation_cache,
+    so requests for the same catalog and window propagate it only once.
+    An observer must not be shared between threads.
     '''
 
-    start_time = datetime.utcnow().replace(tzinfo=pytz.UTC)
-    end_time = start_time + timedelta(hours=24)
     speed_multiplier = 60
     default_seed = 0
     ignore_bad_tles=False
-
-    satellites = {}
+    region = None
+    min_elevation = 0
+    observer = None
+    use_references = False
+    style_prefix = 'style'
+    satellite_options = {}
+    cache = None
 
     def __init__(self, tle_list=None, satellite_list=None, start_time=None, end_time=None,
                  name_list=None, description_list=None, color_list=None, image_list=None,
                  use_default_image=True, marker_scale_list=None, speed_multiplier=None,
                  show_label=True, show_path=True, use_utc=True, seed=None,
-                 ignore_bad_tles=False):
+                 ignore_bad_tles=False, regime_settings=None, region=None, min_elevation=0,
+                 observer=None, use_velocity=False, attitude_mode=None, sensor_list=None,
+                 use_references=False, cache=None):
         '''
         Initialize satellite_czml object
         '''
 
+        # State of this object only
+        self._lock = threading.RLock()
+        self.satellites = {}
+        self.start_time = datetime.now(timezone.utc)
+        self.end_time = self.start_time + timedelta(hours=24)
+
+        # Propagated samples shared with other objects (if given)
+        self.cache = cache
+
+        # Share large repeated style values through CZML references
+        self.use_references = use_references
+
+        # Report stage timings and counters to this observer (if given)
+        self.set_observer(observer)
+
+        # Only emit satellites visible from this region (if given)
+        self.set_region(region, min_elevation)
+
         # Set the seed now before we generate colors
         self.set_seed(seed)
 
@@ -404,6 +918,7 @@ class satellite_czml():
             color_list       = self.__check_list(ex_len, color_list, 'color_list')
             image_list       = self.__check_list(ex_len, image_list, 'image_list')
             marker_scale_list = self.__check_list(ex_len, marker_scale_list, 'marker_scale_list')
+            sensor_list      = self.__check_list(ex_len, sensor_list, 'sensor_list')
 
             if start_time != None or end_time != None:
                 self.set_start_end_time(start_time or self.start_time,
@@ -412,25 +927,32 @@ class satellite_czml():
             # Determine if we ignore bad TLEs
             self.ignore_bad_tles = ignore_bad_tles
 
+            # Options shared by every satellite created from a TLE
+            self.satellite_options = {'use_default_image': use_default_image,
+                                      'show_label': show_label,
+                                      'show_path': show_path,
+                                      'regime_settings': regime_settings,
+                                      'use_velocity': use_velocity,
+                                      'attitude_mode': attitude_mode}
+
             # Create Satellite for each TLE in list
-            for i,tle in enumerate(tle_list):
-                try:
-                    sat = satellite(tle=tle,
-                                    name=name_list[i],
-                                    description=description_list[i],
-                                    color=color_list[i],
-                                    image=image_list[i],
-                                    marker_scale=marker_scale_list[i],
-                                    use_default_image=use_default_image,
-                                    start_time=self.start_time,
-                                    end_time=self.end_time,
-                                    show_label=show_label,
-                                    show_path=show_path)
-
-                    self.add_satellite(sat)
-                except Exception as e:
-                    if not self.ignore_bad_tles:
-                        raise Exception(f'Failed to create the satellite object: {name_list[i]}\nError:\n{e}')
+            with stage(self.observer, 'parse'):
+                for i,tle in enumerate(tle_list):
+                    try:
+                        self.add_tle(tle,
+                                     name=name_list[i],
+                                     description=description_list[i],
+                                     color=color_list[i],
+                                     image=image_list[i],
+                                     marker_scale=marker_scale_list[i],
+                                     sensor=sensor_list[i])
+                    except Exception as e:
+                        if not self.ignore_bad_tles:
+                            raise Exception(f'Failed to create the satellite object: {name_list[i]}\nError:\n{e}')
+                        if self.observer is not None:
+                            # Reported by NORAD ID like every other failure, so
+                            # the stats of --workers parts merge by satellite
+                            self.observer.satellite_failed(tle_id(tle, name_list[i]), e)
 
     def __check_list(self, tle_len, lst, lst_name=None):
         '''
@@ -445,6 +967,7 @@ class satellite_czml():
             return False
         return lst or [None for x in range(tle_len)]
 
+    @locked
     def add_satellite(self, sat):
         '''
         Adds (or updates) instance of Satellite
@@ -452,12 +975,32 @@ class satellite_czml():
         self.satellites[sat.id] = sat
         return True
 
+    def add_tle(self, tle, name=None, description=None, color=None, image=None,
+                marker_scale=None, sensor=None):
+        '''
+        Creates a satellite from a TLE with this document's time window and
+        satellite options, and adds (or updates) it
+        '''
+        sat = satellite(tle=tle,
+                        name=name,
+                        description=description,
+                        color=color,
+                        image=image,
+                        marker_scale=marker_scale,
+                        start_time=self.start_time,
+                        end_time=self.end_time,
+                        sensor=sensor,
+                        rng=self.rng,
+                        **self.satellite_options)
+        return self.add_satellite(sat)
+
     def get_satellite(self, id):
         '''
         Returns instance of Satellite
         '''
         return self.satellites[id]
 
+    @locked
     def remove_satellite(self, id):
         '''
         Removes instance of Satellite
@@ -470,8 +1013,8 @@ class satellite_czml():
         Sets the start and end time
         '''
         if set_utc == True:
-            start_time = start_time.replace(tzinfo=pytz.UTC)
-            end_time = end_time.replace(tzinfo=pytz.UTC)
+            start_time = start_time.replace(tzinfo=timezone.utc)
+            end_time = end_time.replace(tzinfo=timezone.utc)
         self.start_time = start_time
         self.end_time = end_time
 
@@ -486,33 +1029,449 @@ class satellite_czml():
 
     def set_seed(self, seed):
         '''
-        Set the random seed. Only effects satellites not yet added.
+        Set the random seed of this object's colors. Only effects
+        satellites not yet added.
         '''
-        random.seed(seed or self.default_seed)
+        self.rng = random.Random(seed or self.default_seed)
         return True
 
-    def get_czml(self):
+    def set_observer(self, observer):
         '''
-        Returns a CZML string
+        Sets the observer (see instrumentation.czml_observer) that receives
+        stage timings and counters.  None disables instrumentation.
+        '''
+        self.observer = observer
+        return True
+
+    def set_region(self, region, min_elevation=0):
+        '''
+        Sets the region of interest as a [west, south, east, north] bounding
+        box in degrees.  Satellites never above min_elevation degrees from
+        somewhere in the region are left out of the CZML.  None disables it.
+        '''
+        from .region import check_region
+        self.region = None if region is None else check_region(region)
+        self.min_elevation = min_elevation
+        return True
+
+    @locked
+    def propagate(self, rebuild=False):
+        '''
+        Propagates all satellites in one vectorized sgp4 call per time window
+        and sample step, caching the samples on each satellite (and in the
+        shared cache, if any)
+        '''
+        from .propagation import propagate, time_offsets
+        groups = {}
+        for sat in self.satellites.values():
+            key = (sat.start_time, sat.end_time, sat.get_sample_step())
+            if sat.sample_key != key or rebuild:
+                samples = None if self.cache is None or rebuild else self.cache.get(tuple(sat.tle) + key)
+                if samples is not None:
+                    sat.set_samples(*key, *samples)
+                else:
+                    groups.setdefault(key, []).append(sat)
+
+        if not groups:
+            return True
+
+        with stage(self.observer, 'propagate'):
+            for (start_time, end_time, step), sats in groups.items():
+                offsets = time_offsets(start_time, end_time, step)
+                positions, velocities, valid = propagate([sat.satrec for sat in sats], start_time, offsets)
+                for sat, sat_positions, sat_velocities, sat_valid in zip(sats, positions, velocities, valid):
+                    samples = (offsets, sat_positions, sat_velocities, sat_valid)
+                    if self.cache is not None:
+                        samples = self.cache.put(tuple(sat.tle) + (start_time, end_time, step), *samples)
+                    sat.set_samples(start_time, end_time, step, *samples)
+                if self.observer is not None:
+                    self.observer.count('samples', positions.shape[0] * positions.shape[1])
+        return True
+
+    def write_ephemeris(self, path, velocities=True):
+        '''
+        Propagates every satellite and writes the samples to a memory
+        mapped ephemeris store (see ephemeris.py) that load_ephemeris can
+        use instead of propagating the same window again.  Returns the
+        number of bytes written.
+        '''
+        from .ephemeris import write_ephemeris
+        self.propagate()
+        with stage(self.observer, 'ephemeris'):
+            return write_ephemeris(path, self.satellites.values(), velocities)
+
+    @locked
+    def load_ephemeris(self, store):
+        '''
+        Uses the samples in an ephemeris store (a path or ephemeris_store)
+        for the satellites it has over the same window and sample step, so
+        they are not propagated.  The samples stay in the mapped file until
+        the packets are built.  Stores written without velocities are only
+        used for satellites that don't need them (no use_velocity, attitude
+        or sensor).  Returns the number of satellites loaded.
+        '''
+        from .ephemeris import ephemeris_store
+        import numpy as np
+        if not isinstance(store, ephemeris_store):
+            store = ephemeris_store(store)
+
+        loaded = 0
+        with stage(self.observer, 'ephemeris'):
+            for id, sat in self.satellites.items():
+                if id not in store or (sat.start_time, sat.end_time) != (store.start_time, store.end_time):
+                    continue
+                step, offsets, positions, velocities, valid = store.get_samples(id)
+                if step != sat.get_sample_step():
+                    continue
+                if velocities is None:
+                    if sat.use_velocity or sat.attitude_mode is not None or sat.sensor is not None:
+                        continue
+                    # Good enough for coverage, which only interpolates between samples
+                    velocities = np.gradient(positions, offsets, axis=0)
+                sat.set_samples(sat.start_time, sat.end_time, step, offsets, positions, velocities, valid)
+                loaded += 1
+        if self.observer is not None:
+            self.observer.count('ephemeris_satellites', loaded)
+        return loaded
+
+    def write_columnar(self, path, format='auto', geodetic=False, velocities=False,
+                       batch_size=1000, ids=None, compressed=False):
+        '''
+        Writes the propagated samples as a columnar table (id, time, x, y, z
+        and optionally vx, vy, vz and lat, lon, alt) to an .npz, .parquet
+        (needs pyarrow) or .csv file, straight from the propagation arrays
+        batch_size satellites at a time.  By default the format follows
+        the extension.  Only the satellites in ids are written if given.
+        Returns the number of rows written.
+        '''
+        from .columnar import (column_types, columnar_format, count_rows, iter_batches,
+                               write_csv, write_npz, write_parquet)
+        if format == 'auto':
+            format = columnar_format(path)
+        if format not in ('npz', 'parquet', 'csv'):
+            raise Exception(f"Columnar format {format} is not supported. Expected one of ['npz', 'parquet', 'csv'].")
+
+        self.propagate()
+        sats = [sat for id, sat in self.satellites.items() if ids is None or id in ids]
+        types = column_types(geodetic, velocities)
+        batches = iter_batches(sats, geodetic, velocities, batch_size)
+        with stage(self.observer, 'columnar'):
+            if format == 'npz':
+                rows = write_npz(path, batches, types, count_rows(sats), compressed)
+            elif format == 'parquet':
+                rows = write_parquet(path, batches, types)
+            else:
+                rows = write_csv(path, batches, types)
+        if self.observer is not None:
+            self.observer.count('columnar_rows', rows)
+        return rows
+
+    def position_at(self, times, ids=None, method='auto', frame='teme', max_elements=1 << 24):
+        '''
+        Answers where satellites are at times (datetimes, numpy datetime64
+        or seconds since start_time) with one vectorized computation.  By
+        default the cached samples are interpolated with the algorithm and
+        degree written in the CZML, and sgp4 is only run for times outside
+        them.  Returns the satellite IDs (ids, or all) and their positions
+        shaped (satellites, times, 3); see positions_at for the methods and
+        frames.
+        '''
+        from .propagation import seconds_since
+        ids = list(self.satellites) if ids is None else list(ids)
+        sats = [self.satellites[id] for id in ids]
+        offsets = seconds_since(self.start_time, times)
+        if method != 'propagate':
+            self.propagate()
+        with stage(self.observer, 'position_at'):
+            positions = positions_at(sats, self.start_time, offsets, method, frame, max_elements)
+        if self.observer is not None:
+            self.observer.count('position_queries', positions.shape[0] * positions.shape[1])
+        return ids, positions
+
+    def get_spatial_index(self, ids=None, max_slices=16, time_step=None, **kwargs):
+        '''
+        Returns a spatial_index (see spatial.py) answering within radius
+        and nearest satellite queries at given times for the satellites in
+        ids (all if None)
+        '''
+        from .spatial import spatial_index
+        return spatial_index(self, ids, max_slices, time_step, **kwargs)
+
+    @locked
+    def build_orientations(self, rebuild=False):
+        '''
+        Builds the attitude of every satellite with an attitude_mode, with
+        one vectorized computation per time window, sample step and mode
+        '''
+        from .attitude import attitude_quaternions
+        from .propagation import julian_dates
+        import numpy as np
+        self.propagate()
+
+        groups = {}
+        for sat in self.satellites.values():
+            if sat.attitude_mode is not None and (sat.czmlOrientation is None or rebuild):
+                groups.setdefault((sat.sample_key, sat.attitude_mode), []).append(sat)
+
+        for ((start_time, _, _), mode), sats in groups.items():
+            offsets = sats[0].sample_offsets
+            quaternions = attitude_quaternions(np.stack([sat.sample_positions for sat in sats]),
+                                               np.stack([sat.sample_velocities for sat in sats]),
+                                               *julian_dates(start_time, offsets), mode=mode)
+            for sat, sat_quaternions in zip(sats, quaternions):
+                sat.build_orientation(mode, sat_quaternions, rebuild=True)
+        return True
+
+    @locked
+    def build_footprints(self, rebuild=False):
+        '''
+        Builds the sensor footprints of every satellite with one, with one
+        vectorized computation per time window, sample step and footprint
+        resolution
+        '''
+        from .sensors import sensor_footprints
+        import numpy as np
+        self.propagate()
+
+        groups = {}
+        for sat in self.satellites.values():
+            if sat.sensor is not None and sat.sensor['footprint'] and (sat.czmlFootprint is None or rebuild):
+                key = (sat.sample_key, int(sat.sensor['footprintPoints']), int(sat.sensor['footprintSubsteps']))
+                groups.setdefault(key, []).append(sat)
+
+        for ((start_time, _, _), points, substeps), sats in groups.items():
+            times, vertices = sensor_footprints(start_time, sats[0].sample_offsets,
+                                                np.stack([sat.sample_positions for sat in sats]),
+                                                np.stack([sat.sample_velocities for sat in sats]),
+                                                [sat.sensor['halfAngle'] for sat in sats],
+                                                points, substeps)
+            for sat, sat_vertices in zip(sats, vertices):
+                sat.build_footprint(times, sat_vertices, rebuild=True)
+        return True
+
+    def get_region_availability(self, ids=None):
+        '''
+        Returns the availability intervals, keyed by satellite ID, during
+        which each satellite is visible from the region.  Satellites that
+        never are visible are left out.  Only the satellites in ids are
+        checked if given.
+        '''
+        from .propagation import ecef_to_geodetic, julian_dates, teme_to_ecef
+        from .region import intersect_intervals, mask_intervals, relevant_mask
+        import numpy as np
+        self.propagate()
+
+        groups = {}
+        for id, sat in self.satellites.items():
+            if ids is not None and id not in ids:
+                continue
+            groups.setdefault(sat.sample_key, []).append(id)
+
+        availability = {}
+        for (start_time, end_time, step), ids in groups.items():
+            offsets = self.satellites[ids[0]].sample_offsets
+            positions = np.stack([self.satellites[id].sample_positions for id in ids])
+            lat, lon, height = ecef_to_geodetic(
+                teme_to_ecef(positions, *julian_dates(start_time, offsets)))
+            valid = np.stack([self.satellites[id].sample_valid for id in ids])
+            mask = relevant_mask(lat, lon, height, self.region, self.min_elevation) & valid
+
+            window = (end_time - start_time).total_seconds()
+            for id, sat_mask, sat_valid in zip(ids, mask, valid):
+                spans = intersect_intervals(mask_intervals(sat_mask, offsets, pad=step), [(0.0, window)])
+                if not sat_valid.all():
+                    spans = intersect_intervals(spans, self.satellites[id].get_valid_spans())
+                intervals = availability_intervals(start_time, spans)
+                if intervals is not None:
+                    availability[id] = intervals
+        return availability
+
+    def get_trimmed_availability(self, ids=None):
+        '''
+        Returns the availability intervals, keyed by satellite ID, of the
+        satellites sgp4 could not propagate at every sample time (e.g.
+        decaying or reentered objects), covering only the spans where it
+        could.  None means it could not propagate the satellite at all.
+        Only the satellites in ids are checked if given.
+        '''
+        import numpy as np
+        self.propagate()
+
+        groups = {}
+        for id, sat in self.satellites.items():
+            if ids is not None and id not in ids:
+                continue
+            groups.setdefault(sat.sample_key, []).append(id)
+
+        trimmed = {}
+        for (start_time, _, _), ids in groups.items():
+            valid = np.stack([self.satellites[id].sample_valid for id in ids])
+            for i in np.flatnonzero(~valid.all(axis=1)):
+                trimmed[ids[i]] = availability_intervals(start_time, self.satellites[ids[i]].get_valid_spans())
+        return trimmed
+
+    def get_coverage(self, half_angle=None, resolution=1.0, step=60, region=None,
+                     min_elevation=0.0, max_elements=1 << 24):
+        '''
+        Accumulates how long each cell of a latitude/longitude grid is
+        covered by at least one satellite between start_time and end_time,
+        checking every step seconds.  Positions between samples come from
+        Hermite interpolation of the cached samples.  Returns the
+        coverage_accumulator, with get_minutes_per_day() for the raw array
+        and build_packets() for a CZML polygon layer.
+        '''
+        from .coverage import coverage_accumulator
+        from .propagation import hermite_interpolate, julian_dates, teme_to_ecef
+        import numpy as np
+        self.propagate()
+        coverage = coverage_accumulator(resolution, region if region is not None else self.region,
+                                        half_angle, min_elevation, max_elements)
+        window = (self.end_time - self.start_time).total_seconds()
+        times = np.arange(0.0, window, step)
+        durations = np.minimum(step, window - times)
+        sats = list(self.satellites.values())
+
+        groups = {}
+        for i, sat in enumerate(sats):
+            groups.setdefault(sat.sample_key, []).append(i)
+        groups = [(indices, (self.start_time - start_time).total_seconds(),
+                   sats[indices[0]].sample_offsets,
+                   np.stack([sats[i].sample_positions for i in indices]),
+                   np.stack([sats[i].sample_velocities for i in indices]))
+                  for (start_time, _, _), indices in groups.items()]
+
+        with stage(self.observer, 'coverage'):
+            time_block = max(1, max_elements // (3 * max(len(sats), 1)))
+            for t in range(0, len(times), time_block):
+                chunk = times[t:t + time_block]
+                positions = np.empty((len(sats), len(chunk), 3))
+                for indices, shift, offsets, sample_positions, sample_velocities in groups:
+                    positions[indices] = hermite_interpolate(offsets, sample_positions,
+                                                             sample_velocities, chunk + shift)
+                coverage.add(teme_to_ecef(positions, *julian_dates(self.start_time, chunk)),
+                             durations[t:t + time_block])
+        return coverage
+
+    def get_snapshot_czml(self, times=None, pixel_size=2):
+        '''
+        Returns a CZML string with every satellite as a plain point at one
+        instant (start_time by default) or, when given a list or array of
+        times (datetimes or numpy datetime64), held at each instant until
+        the next.  All satellites are propagated in a
+        single vectorized call and the packets are formatted directly, which
+        keeps very large catalogs fast.
+        '''
+        from .propagation import julian_dates, propagate, teme_to_ecef
+        import numpy as np
+        if times is None or len(times) == 0:
+            times = [self.start_time]
+        elif isinstance(times, np.ndarray) and times.dtype.kind == 'M':
+            times = times.astype('datetime64[us]').tolist()
+        times = [t if t.tzinfo is not None else t.replace(tzinfo=timezone.utc) for t in times]
+        sats = list(self.satellites.values())
+
+        offsets = np.array([(t - times[0]).total_seconds() for t in times])
+        with stage(self.observer, 'propagate'):
+            positions, _, valid = propagate([sat.satrec for sat in sats], times[0], offsets)
+            positions = teme_to_ecef(positions, *julian_dates(times[0], offsets))
+
+        # Drop satellites sgp4 could not propagate
+        valid = valid.all(axis=1)
+
+        if len(times) == 1:
+            end_time = times[0]
+            position = '{"cartesian": [%d, %d, %d]}'
+        else:
+            end_time = times[-1] + (times[-1] - times[-2])
+            bounds = [format_iso(t) for t in times + [end_time]]
+            position = '[' + ', '.join('{"interval": "%s/%s", "cartesian": [%%d, %%d, %%d]}' %
+                                       (bounds[i], bounds[i + 1]) for i in range(len(times))) + ']'
+        template = ('{"id": %d, "position": ' + position +
+                    ', "point": {"pixelSize": ' + str(pixel_size) +
+                    ', "color": {"rgba": [%d, %d, %d, %d]}}}')
+
+        # Whole meters are plenty for a snapshot and format twice as fast
+        with stage(self.observer, 'serialize'):
+            rows = np.column_stack((np.array([sat.id for sat in sats])[valid],
+                                    np.rint(positions[valid].reshape(int(valid.sum()), -1)),
+                                    np.array([sat.color for sat in sats])[valid])).astype(np.int64).tolist()
+
+            document = _json().dumps({"id": "document",
+                                   "version": "1.0",
+                                   "clock": {"interval": format_interval(times[0], end_time),
+                                             "currentTime": format_iso(times[0]),
+                                             "multiplier": self.speed_multiplier,
+                                             "range": "LOOP_STOP",
+                                             "step": "SYSTEM_CLOCK_MULTIPLIER"}})
+            czml_string = '[' + ', '.join([document] + [template % tuple(row) for row in rows]) + ']'
+
+        if self.observer is not None:
+            self.observer.count('satellites', len(rows))
+            self.observer.count('samples', len(rows) * len(times))
+            self.observer.count('bytes', len(czml_string.encode('utf-8')))
+            for sat in np.array(sats, dtype=object)[~valid]:
+                self.observer.satellite_failed(sat.id, 'sgp4 could not propagate the satellite')
+        return czml_string
+
+    def iter_packets(self, ids=None, release=False):
+        '''
+        Generates the CZML packets one at a time, starting with the
+        document packet.  Only the satellites in ids are built if given.
+        With release, the graphics built for a satellite's packets are
+        dropped once the next packet is asked for, so only the packets
+        being written are kept; the packets must be used (e.g. serialized)
+        before then.  Graphics that were built before (e.g. customized
+        with a build_* method) are kept.
         '''
 
         # Initialize the CZML document
-        interval = self.start_time.isoformat() + "/" + self.end_time.isoformat()
-        doc = CZML()
+        interval = format_interval(self.start_time, self.end_time)
         packet = CZMLPacket(id='document', version='1.0')
         packet.clock = {"interval": interval,
-                        "currentTime": self.start_time.isoformat(),
+                        "currentTime": format_iso(self.start_time),
                         "multiplier": self.speed_multiplier,
                         "range": "LOOP_STOP",
                         "step": "SYSTEM_CLOCK_MULTIPLIER"}
-        doc.packets.append(packet)
+        yield packet
+
+        # Propagate everything at once and cull satellites outside the region
+        self.propagate()
+        if release:
+            unbuilt = {id: sat.get_unbuilt_graphics() for id, sat in self.satellites.items()}
+        region_availability = None
+        if self.region is not None:
+            with stage(self.observer, 'region'):
+                region_availability = self.get_region_availability(ids)
+        with stage(self.observer, 'attitude'):
+            self.build_orientations()
+        with stage(self.observer, 'sensors'):
+            self.build_footprints()
+        trimmed = self.get_trimmed_availability(ids)
+        styles = style_registry(self.style_prefix) if self.use_references else None
 
         # Add each satellite
         for id, sat in self.satellites.items():
+            if ids is not None and id not in ids:
+                continue
+            if id in trimmed:
+                if trimmed[id] is None:
+                    if self.observer is not None:
+                        self.observer.satellite_failed(id, 'sgp4 could not propagate the satellite')
+                    continue
+                if self.observer is not None:
+                    self.observer.satellite_trimmed(id, trimmed[id])
+            if region_availability is not None and id not in region_availability:
+                continue
+
             # Initialize satellite CZML data
             try:
                 sat_packet = CZMLPacket(id=id)
-                sat_packet.availability = interval
+                if region_availability is not None:
+                    sat_packet.availability = region_availability[id]
+                elif id in trimmed:
+                    sat_packet.availability = trimmed[id]
+                else:
+                    sat_packet.availability = interval
                 sat_packet.description = Description(sat.description)
 
                 if sat.image is None:
@@ -520,12 +1479,99 @@ class satellite_czml():
                 else:
                     sat_packet.billboard = sat.build_marker()
                 sat_packet.label = sat.build_label()
-                sat_packet.path = sat.build_path()
-                sat_packet.position = sat.build_position()
-
-                doc.packets.append(sat_packet)
+                with stage(self.observer, 'build_path'):
+                    sat_packet.path = sat.build_path()
+                with stage(self.observer, 'build_position'):
+                    sat_packet.position = sat.build_position()
+                if sat.attitude_mode is not None:
+                    sat_packet.orientation = sat.build_orientation()
+                if sat.sensor is not None:
+                    sat_packet.cone = sat.build_cone()
+                    footprint = sat.build_footprint()
+                    if footprint is not None:
+                        footprint_packet = CZMLPacket(id=f"{id}-footprint", name=f"{sat.name} footprint")
+                        footprint_packet.availability = sat_packet.availability
+                        footprint_packet.polygon = footprint
             except Exception as e:
                 if not self.ignore_bad_tles:
                     raise Exception(f'Failed to generate CZML for satellite ID {id}: {sat.name}\nError:\n{e}')
+                if self.observer is not None:
+                    self.observer.satellite_failed(id, e)
+                continue
+
+            if self.observer is not None:
+                self.observer.count('satellites')
+            if styles is not None:
+                yield from styles.share(sat_packet)
+            yield sat_packet
+            if sat.sensor is not None and sat.sensor['footprint']:
+                yield footprint_packet
+            if release:
+                sat.release_graphics(unbuilt[id])
+
+    @locked
+    def build_document(self):
+        '''
+        Returns the CZML document object with all packets built
+        '''
+        self.propagate()
+        with stage(self.observer, 'build_packets'):
+            return CZML(list(self.iter_packets()))
 
-        return str(doc)
+    @locked
+    def get_czml(self):
+        '''
+        Returns a CZML string
+        '''
+        doc = self.build_document()
+        with stage(self.observer, 'serialize'):
+            czml_string = str(doc)
+        if self.observer is not None:
+            self.observer.count('bytes', len(czml_string.encode('utf-8')))
+        return czml_string
+
+    def iter_text(self):
+        '''
+        Yields the CZML string one packet at a time as the packets are
+        built.  The graphics of each satellite are dropped once its text is
+        yielded, so only the propagated samples and any graphics built
+        before stay in memory (and the attitudes and sensor footprints,
+        which are built for all satellites at once, until their packets are
+        written).
+        '''
+        for text in iter_text(self.iter_packets(release=True)):
+            if self.observer is not None:
+                self.observer.count('bytes', len(text.encode('utf-8')))
+            yield text
+
+    def iter_compressed(self, compression='gzip', level=None, chunk_size=1 << 16):
+        '''
+        Yields the CZML document compressed (gzip, deflate or brotli) in
+        chunks as the packets are built
+        '''
+        for chunk in iter_compressed(self.iter_text(), compression, level, chunk_size):
+            if self.observer is not None:
+                self.observer.count('compressed_bytes', len(chunk))
+            yield chunk
+
+    @locked
+    def write_czml(self, path, compression='auto', level=None):
+        '''
+        Writes the CZML document to path packet by packet.  By default the
+        compression follows the extension (.gz, .br or .zz); None writes
+        plain text.  Returns the number of bytes written.
+        '''
+        if compression == 'auto':
+            compression = compression_for(path)
+        if compression is None:
+            return write_chunks(self.iter_text(), path)
+        return write_chunks(self.iter_compressed(compression, level), path)
+
+
+def random_colors(count, seed=None):
+    '''
+    Returns the random colors a satellite_czml object seeded with seed
+    gives its first count satellites, e.g. to build one document in parts
+    '''
+    rng = random.Random(seed or satellite_czml.default_seed)
+    return [[rng.randrange(256) for x in range(3)] for i in range(count)]
@@ -0,0 +1,128 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .czml import Cone
+from .propagation import ecef_to_geodetic, julian_dates, teme_to_ecef
+from .region import EARTH_RADIUS
+
+import numpy as np
+
+# A sensor is a nadir pointing cone described by a dict of these settings
+SENSOR_DEFAULTS = {
+    'halfAngle': 20.0,            # degrees from nadir
+    'radius': None,               # cone length (m), reaches the ground when None
+    'color': [255, 255, 0, 64],
+    'footprint': True,            # also write the ground footprint over time
+    'footprintPoints': 24,        # vertices of each footprint polygon
+    'footprintSubsteps': 1,       # footprints per position sample
+}
+
+
+def check_sensor(sensor):
+    '''
+    Checks a sensor spec and fills in the defaults.  None means no sensor.
+    '''
+    if sensor is None:
+        return None
+    for key in sensor:
+        if key not in SENSOR_DEFAULTS:
+            raise Exception(f"Sensor setting {key} is not supported. Expected one of " +
+                            f"{list(SENSOR_DEFAULTS)}.")
+    sensor = dict(SENSOR_DEFAULTS, **sensor)
+    if not 0 < sensor['halfAngle'] < 90:
+        raise Exception(f"Sensor halfAngle must be between 0 and 90 degrees. Got: {sensor['halfAngle']}")
+    if len(sensor['color']) not in [3, 4]:
+        raise Exception(f"Sensor color only has {len(sensor['color'])} elements.  Expected 3 or 4.")
+    if int(sensor['footprintPoints']) < 3 or int(sensor['footprintSubsteps']) < 1:
+        raise Exception("Sensor footprints need at least 3 points and 1 substep. " +
+                        f"Got: {sensor['footprintPoints']} and {sensor['footprintSubsteps']}")
+    return sensor
+
+
+def sensor_central_angle(distance, half_angle):
+    '''
+    Earth central angle (radians) from the sub-satellite point to the edge
+    of the ground seen by a nadir cone of half_angle degrees from distance
+    meters away from the Earth's center.  Cones wider than the Earth stop
+    at the horizon.
+    '''
+    sin_rho = np.clip(EARTH_RADIUS / distance, -1, 1)
+    eta = np.minimum(np.radians(half_angle), np.arcsin(sin_rho))
+    epsilon = np.arccos(np.minimum(np.sin(eta) / sin_rho, 1.0))
+    return np.pi / 2 - eta - epsilon
+
+
+def interpolate_samples(offsets, positions, velocities, substeps):
+    '''
+    Splits each sample interval into substeps with cubic Hermite
+    interpolation of positions and velocities shaped (..., times, 3).
+    Returns the new offsets and positions.
+    '''
+    if substeps == 1:
+        return offsets, positions
+    dt = np.diff(offsets)[:, None]
+    s = (np.arange(substeps) / substeps)[None, :]
+    times = (offsets[:-1, None] + s * dt).ravel()
+
+    h00 = 2 * s**3 - 3 * s**2 + 1
+    h10 = s**3 - 2 * s**2 + s
+    h01 = -2 * s**3 + 3 * s**2
+    h11 = s**3 - s**2
+    p0, p1 = positions[..., :-1, None, :], positions[..., 1:, None, :]
+    v0, v1 = velocities[..., :-1, None, :], velocities[..., 1:, None, :]
+    interpolated = (h00[..., None] * p0 + (h10 * dt)[..., None] * v0 +
+                    h01[..., None] * p1 + (h11 * dt)[..., None] * v1)
+    interpolated = interpolated.reshape(positions.shape[:-2] + (-1, 3))
+    return (np.append(times, offsets[-1]),
+            np.concatenate((interpolated, positions[..., -1:, :]), axis=-2))
+
+
+def footprint_rings(lat, lon, central_angle, points):
+    '''
+    Longitudes and latitudes (degrees) of points spaced evenly around each
+    sub-satellite point at the given central angle, shaped (..., points)
+    '''
+    azimuth = np.linspace(0, 2 * np.pi, points, endpoint=False)
+    lat1 = np.radians(lat)[..., None]
+    lon1 = np.radians(lon)[..., None]
+    angle = central_angle[..., None]
+
+    lat2 = np.arcsin(np.clip(np.sin(lat1) * np.cos(angle) +
+                             np.cos(lat1) * np.sin(angle) * np.cos(azimuth), -1, 1))
+    lon2 = lon1 + np.arctan2(np.sin(azimuth) * np.sin(angle) * np.cos(lat1),
+                             np.cos(angle) - np.sin(lat1) * np.sin(lat2))
+    lon2 = np.mod(lon2 + np.pi, 2 * np.pi) - np.pi
+    return np.degrees(lon2), np.degrees(lat2)
+
+
+def sensor_footprints(start_time, offsets, positions, velocities, half_angles, points, substeps=1):
+    '''
+    Computes the ground footprints of nadir sensors for TEME positions and
+    velocities shaped (satellites, times, 3), with one half angle (degrees)
+    per satellite.  Returns the footprint times (seconds since start_time)
+    and the [lon, lat, 0, ...] vertices shaped (satellites, times, points * 3).
+    '''
+    offsets, positions = interpolate_samples(offsets, positions, velocities, substeps)
+    ecef = teme_to_ecef(positions, *julian_dates(start_time, offsets))
+    lat, lon, _ = ecef_to_geodetic(ecef)
+    angle = sensor_central_angle(np.linalg.norm(ecef, axis=-1),
+                                 np.asarray(half_angles, dtype=float)[:, None])
+    ring_lon, ring_lat = footprint_rings(lat, lon, angle, points)
+    # 1e-5 degrees (about a meter) is plenty and keeps the output small
+    vertices = np.stack((np.round(ring_lon, 5), np.round(ring_lat, 5), np.zeros_like(ring_lon)), axis=-1)
+    return offsets, vertices.reshape(vertices.shape[:-2] + (-1,))
+
+
+def sensor_cone(sensor, heights):
+    '''
+    Creates the Cone for a sensor, long enough to reach the ground from
+    the highest of the heights (m) unless the sensor has a radius
+    '''
+    radius = sensor['radius']
+    if radius is None:
+        radius = float(np.nanmax(heights)) / np.cos(np.radians(sensor['halfAngle']))
+    color = list(sensor['color']) + [255] * (4 - len(sensor['color']))
+    return Cone(outerHalfAngle=float(np.radians(sensor['halfAngle'])),
+                radius=radius,
+                outerMaterial={"solidColor": {"color": {"rgba": color}}})
@@ -0,0 +1,214 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .propagation import geodetic_to_ecef, seconds_since
+
+from collections import OrderedDict
+import numpy as np
+
+# Edge (m) of the grid cells used when scipy is not installed.  A few LEO
+# satellites fall in each occupied cell of a full catalog.
+CELL_SIZE = 500000.0
+
+
+class _grid():
+    '''
+    Uniform grid of cells over Earth fixed positions, the fallback when
+    scipy's cKDTree is not available.  Points are sorted by cell, so the
+    points of a cell are one slice of the sorted order.
+    '''
+
+    def __init__(self, points, cell_size=CELL_SIZE):
+        self.points = points
+        self.cell_size = cell_size
+        cells = np.floor(points / cell_size).astype(np.int64)
+        self.origin = cells.min(axis=0)
+        self.dims = cells.max(axis=0) - self.origin + 1
+        keys = np.ravel_multi_index((cells - self.origin).T, self.dims)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys, self.starts, counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        self.ends = self.starts + counts
+        self.cells = np.stack(np.unravel_index(self.keys, self.dims), axis=-1)
+
+    def candidates(self, center, reach):
+        '''
+        Indices of the points in cells within reach (m) of center along
+        every axis
+        '''
+        lo = np.maximum(np.floor((center - reach) / self.cell_size).astype(np.int64) - self.origin, 0)
+        hi = np.minimum(np.floor((center + reach) / self.cell_size).astype(np.int64) - self.origin, self.dims - 1)
+        if (lo > hi).any():
+            return np.zeros(0, dtype=np.int64)
+        if (lo == 0).all() and (hi == self.dims - 1).all():
+            return self.order
+
+        if np.prod(hi - lo + 1) > len(self.keys):
+            # Cheaper to check the occupied cells than to list the box
+            found = np.flatnonzero(((self.cells >= lo) & (self.cells <= hi)).all(axis=1))
+        else:
+            box = np.stack(np.meshgrid(*[np.arange(l, h + 1) for l, h in zip(lo, hi)], indexing='ij'), axis=-1)
+            keys = np.ravel_multi_index(box.reshape(-1, 3).T, self.dims)
+            found = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            found = found[self.keys[found] == keys]
+        if not len(found):
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([self.order[self.starts[i]:self.ends[i]] for i in found])
+
+    def within(self, center, radius):
+        indices = self.candidates(center, radius)
+        distances = np.linalg.norm(self.points[indices] - center, axis=1)
+        keep = distances <= radius
+        return indices[keep], distances[keep]
+
+    def nearest(self, center, k):
+        reach = self.cell_size
+        while True:
+            indices = self.candidates(center, reach)
+            covers_all = len(indices) == len(self.points)
+            if len(indices) >= k or covers_all:
+                distances = np.linalg.norm(self.points[indices] - center, axis=1)
+                best = np.argsort(distances, kind='stable')[:k]
+                # Points outside the box may only be closer than reach
+                if covers_all or distances[best[-1]] <= reach:
+                    return indices[best], distances[best]
+            reach *= 2
+
+
+class _kdtree():
+    '''
+    scipy's cKDTree with the same interface as _grid
+    '''
+
+    def __init__(self, points):
+        from scipy.spatial import cKDTree
+        self.points = points
+        self.tree = cKDTree(points)
+
+    def within(self, center, radius):
+        indices = np.asarray(self.tree.query_ball_point(center, radius), dtype=np.int64)
+        distances = np.linalg.norm(self.points[indices] - center, axis=1)
+        return indices, distances
+
+    def nearest(self, center, k):
+        distances, indices = self.tree.query(center, k=min(k, len(self.points)))
+        distances, indices = np.atleast_1d(distances), np.atleast_1d(indices)
+        return indices, distances
+
+
+def _has_scipy():
+    try:
+        import scipy.spatial
+        return True
+    except ImportError:
+        return False
+
+
+class spatial_index():
+    '''
+    Answers "which satellites are within a radius of this point" and
+    "which are nearest to it" at given times.  Each time asked about gets
+    its own slice: the Earth fixed positions of every satellite at that
+    time (from position_at) in a k-d tree, or a grid of cells when scipy
+    is not installed.  Slices are built on first use and the least
+    recently used are dropped beyond max_slices.  With time_step, times
+    are rounded to multiples of it (seconds) so nearby times share a slice.
+
+    Points are Earth fixed [x, y, z] (m), [lat, lon, height] with
+    geodetic=True, or a satellite ID, which is then left out of the
+    answers.  Distances are in meters.
+    '''
+
+    def __init__(self, czml_obj, ids=None, max_slices=16, time_step=None, method='auto',
+                 use_scipy=True, cell_size=CELL_SIZE):
+        self.czml = czml_obj
+        self.ids = list(czml_obj.satellites) if ids is None else list(ids)
+        self.max_slices = max_slices
+        self.time_step = time_step
+        self.method = method
+        self.use_scipy = use_scipy and _has_scipy()
+        self.cell_size = cell_size
+        self._slices = OrderedDict()
+
+    def __len__(self):
+        return len(self._slices)
+
+    def clear(self):
+        self._slices.clear()
+        return True
+
+    def get_slice(self, time):
+        '''
+        Returns the satellite IDs, their Earth fixed positions and the
+        search structure at time, building them if needed.  Satellites
+        without a position at time (e.g. decayed) are left out.
+        '''
+        offset = float(seconds_since(self.czml.start_time, time)[0])
+        if self.time_step:
+            offset = round(offset / self.time_step) * self.time_step
+        if offset in self._slices:
+            self._slices.move_to_end(offset)
+            return self._slices[offset]
+
+        _, positions = self.czml.position_at([offset], ids=self.ids, method=self.method, frame='ecef')
+        positions = positions[:, 0, :]
+        found = np.isfinite(positions).all(axis=1)
+        ids, positions = np.asarray(self.ids)[found], np.ascontiguousarray(positions[found])
+        if not len(ids):
+            structure = None
+        elif self.use_scipy:
+            structure = _kdtree(positions)
+        else:
+            structure = _grid(positions, self.cell_size)
+
+        self._slices[offset] = (ids, positions, structure)
+        while len(self._slices) > self.max_slices:
+            self._slices.popitem(last=False)
+        return self._slices[offset]
+
+    def __center(self, point, ids, positions, geodetic):
+        '''
+        Returns the point as Earth fixed coordinates and the index of the
+        satellite it is, if any
+        '''
+        if np.ndim(point) == 0:
+            index = np.flatnonzero(ids == point)
+            if not len(index):
+                raise Exception(f"Satellite {point} has no position at this time")
+            return positions[index[0]], index[0]
+        if geodetic:
+            return geodetic_to_ecef(*point), None
+        return np.asarray(point, dtype=float), None
+
+    def within(self, point, radius, time, geodetic=False):
+        '''
+        Returns the IDs of the satellites within radius (m) of point at
+        time, and their distances, nearest first
+        '''
+        ids, positions, structure = self.get_slice(time)
+        if structure is None:
+            return ids[:0], np.zeros(0)
+        center, itself = self.__center(point, ids, positions, geodetic)
+        indices, distances = structure.within(center, radius)
+        if itself is not None:
+            keep = indices != itself
+            indices, distances = indices[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return ids[indices[order]], distances[order]
+
+    def nearest(self, point, time, k=1, geodetic=False):
+        '''
+        Returns the IDs of the k satellites nearest to point at time, and
+        their distances, nearest first
+        '''
+        ids, positions, structure = self.get_slice(time)
+        if structure is None:
+            return ids[:0], np.zeros(0)
+        center, itself = self.__center(point, ids, positions, geodetic)
+        if itself is None:
+            indices, distances = structure.nearest(center, k)
+        else:
+            indices, distances = structure.nearest(center, k + 1)
+            keep = indices != itself
+            indices, distances = indices[keep][:k], distances[keep][:k]
+        return ids[indices], distances
@@ -0,0 +1,101 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .czml import CZMLPacket, _json
+
+import copy
+
+# Properties whose plain values many satellites share, by graphics.  Per
+# satellite values (lead and trail times, ...) are left out since they
+# would only be remembered and never referenced.
+SHARED_PROPERTIES = {'billboard': ('image', 'scale'),
+                     'path': ('show', 'material', 'width', 'resolution')}
+
+# Values shorter than this (as JSON) are cheaper to repeat than to reference
+MIN_SHARED_SIZE = 64
+
+
+class style_registry():
+    '''
+    Moves large property values that packets repeat (e.g. the default
+    billboard image or the path visibility intervals) into shared style
+    packets, and points the packets at them with CZML references.  Style
+    packets have no position, so they are never drawn themselves.
+
+    Values are grouped by a digest of their JSON text.  A value is written
+    inline the first time it is seen; from the second packet on it is
+    moved into a style packet, so values used only once cost nothing
+    extra.  Only the properties in SHARED_PROPERTIES are looked at.
+    '''
+
+    def __init__(self, prefix='style', min_size=MIN_SHARED_SIZE):
+        import hashlib
+        self._digest = hashlib.blake2b
+        self.prefix = prefix
+        self.min_size = min_size
+        self._seen = set()
+        self._styles = {}
+        self._texts = {}
+
+    def __len__(self):
+        return len(self._styles)
+
+    def _text(self, value):
+        '''
+        JSON text of a value.  Strings (e.g. the default billboard image)
+        are remembered by value since many packets repeat them.
+        '''
+        if not isinstance(value, str):
+            return _json().dumps(value)
+        text = self._texts.get(value)
+        if text is None:
+            text = self._texts[value] = _json().dumps(value)
+        return text
+
+    def share(self, packet, properties=SHARED_PROPERTIES):
+        '''
+        Replaces the large plain property values of the packet's graphics
+        that were seen before with references to style packets.  The
+        graphics objects are copied first, so objects cached on a satellite
+        are left unchanged.  Returns the style packets created, which must
+        be written along with the packet.
+        '''
+        new_styles = []
+        for name, attrs in properties.items():
+            obj = getattr(packet, '_' + name, None)
+            if obj is None:
+                continue
+
+            references = {}
+            for attr in attrs:
+                # Properties with a hidden "_" attribute are CZML objects
+                # (colors, numbers, ...), the others are plain values
+                value = None if hasattr(type(obj), '_' + attr) else getattr(obj, attr)
+                if value is None or (isinstance(value, dict) and 'reference' in value):
+                    continue
+                text = self._text(value)
+                if len(text) < self.min_size:
+                    continue
+
+                key = (name, attr, self._digest(text.encode('utf-8'), digest_size=16).digest())
+                if key not in self._seen:
+                    self._seen.add(key)
+                    continue
+                style_id = self._styles.get(key)
+                if style_id is None:
+                    style_id = f"{self.prefix}-{len(self._styles)}"
+                    self._styles[key] = style_id
+                    style = type(obj)()
+                    setattr(style, attr, value)
+                    style_packet = CZMLPacket(id=style_id)
+                    setattr(style_packet, name, style)
+                    new_styles.append(style_packet)
+                references[attr] = {"reference": f"{style_id}#{name}.{attr}"}
+
+            if references:
+                obj = copy.copy(obj)
+                for attr, reference in references.items():
+                    setattr(obj, attr, reference)
+                setattr(packet, name, obj)
+        return new_styles
@@ -0,0 +1,219 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .cli import input_files, read_elements, shard_path
+from .czml import _json
+from .writers import compression_for, iter_compressed, write_chunks
+
+import os
+import time
+
+
+def tle_epoch(tle):
+    '''
+    Returns the epoch of a TLE as (year, day of year) for comparisons
+    '''
+    line1 = tle[-2]
+    year = int(line1[18:20])
+    return (year + (1900 if year >= 57 else 2000), float(line1[20:32]))
+
+
+class czml_watcher():
+    '''
+    Keeps a CZML document up to date with TLE or OMM files that change.
+
+    Each poll checks the files' modification times and sizes, and diffs the
+    element sets read against the loaded satellites by NORAD ID and epoch
+    (the newest epoch wins when an ID is listed more than once).  Only
+    satellites that were added or got a new epoch are propagated and
+    serialized again; the JSON of the others is kept from before.  The
+    output is then replaced atomically.  With delta, each change is also
+    written as a numbered delta document that deletes the changed or
+    removed packets and adds the new ones, for clients that process
+    updates instead of reloading.  Changing the time window with
+    set_window rebuilds everything.
+
+    The keyword arguments are passed on to satellite_czml.  Shared styles
+    (use_references) are turned off since packets are rebuilt one by one.
+    '''
+
+    def __init__(self, inputs, output, delta=False, compression='auto', level=None,
+                 observer=None, **czml_options):
+        from .satellite_czml import satellite_czml
+
+        self.inputs = list(inputs)
+        self.output = output
+        self.delta = delta
+        self.compression = compression_for(output) if compression == 'auto' else compression
+        self.level = level
+        self.observer = observer
+        self.delta_count = 0
+
+        czml_options['use_references'] = False
+        self.czml = satellite_czml(tle_list=[], observer=observer, **czml_options)
+
+        self.signatures = {}
+        self.tles = {}
+        self.epochs = {}
+        self.texts = {}
+        self.document_text = None
+
+    def __signatures(self):
+        '''
+        Returns the (modification time, size) of each input file
+        '''
+        signatures = {}
+        for path in input_files(self.inputs):
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signatures[path] = (info.st_mtime_ns, info.st_size)
+        return signatures
+
+    def __read(self, paths):
+        '''
+        Reads the element sets in the files, keeping the newest per NORAD ID
+        '''
+        tles, epochs = {}, {}
+        for path in paths:
+            for tle in read_elements(path):
+                id = int(tle[-2][2:7])
+                epoch = tle_epoch(tle)
+                if id not in epochs or epoch > epochs[id]:
+                    tles[id] = tle
+                    epochs[id] = epoch
+        return tles, epochs
+
+    def __add(self, id, tle, color=None):
+        '''
+        Adds a satellite, skipping it if it is bad and bad TLEs are ignored
+        '''
+        try:
+            self.czml.add_tle(tle, name=tle[0] if len(tle) == 3 else None, color=color)
+        except Exception as e:
+            if not self.czml.ignore_bad_tles:
+                raise Exception(f'Failed to create the satellite object: {id}\nError:\n{e}')
+            if self.observer is not None:
+                self.observer.satellite_failed(id, e)
+
+    def __build(self, ids=None):
+        '''
+        Builds the packets of the satellites in ids (all if None) and
+        keeps their JSON, keyed by satellite ID
+        '''
+        dumps = _json().dumps
+        packets = self.czml.iter_packets(ids, release=True)
+        document_text = dumps(next(packets).data())
+        texts = {}
+        for packet in packets:
+            # Footprint packets ("<id>-footprint") belong to their satellite
+            owner = packet.id if isinstance(packet.id, int) else int(str(packet.id).partition('-')[0])
+            texts.setdefault(owner, []).append(dumps(packet.data()))
+        return document_text, texts
+
+    def __iter_document(self):
+        '''
+        Yields the text of the whole document from the kept JSON
+        '''
+        yield '[' + self.document_text
+        for texts in self.texts.values():
+            for text in texts:
+                yield ', ' + text
+        yield ']'
+
+    def __write(self, texts, path):
+        chunks = texts if self.compression is None else iter_compressed(texts, self.compression, self.level)
+        return write_chunks(chunks, path, atomic=True)
+
+    def __write_delta(self, deleted, texts):
+        '''
+        Writes a delta document and returns its path.  Its document packet
+        has no clock, so processing it leaves the client's clock alone.
+        '''
+        dumps = _json().dumps
+        packets = [dumps({"id": "document", "version": "1.0"})]
+        for id in deleted:
+            packets.append(dumps({"id": id, "delete": True}))
+            packets.append(dumps({"id": f"{id}-footprint", "delete": True}))
+        for id in texts:
+            packets.extend(texts[id])
+        self.delta_count += 1
+        path = shard_path(self.output, f"delta-{self.delta_count}")
+        self.__write(iter(['[' + ', '.join(packets) + ']']), path)
+        return path
+
+    def poll(self):
+        '''
+        Checks the inputs once and updates the output if any satellite was
+        added, changed or removed.  Returns the IDs of each as a dict, or
+        None if nothing changed.
+        '''
+        signatures = self.__signatures()
+        if signatures == self.signatures and self.document_text is not None:
+            return None
+        try:
+            tles, epochs = self.__read(signatures)
+        except Exception:
+            # Most likely a file caught half written, try again next poll
+            return None
+        self.signatures = signatures
+
+        added = [id for id in tles if id not in self.epochs]
+        changed = [id for id in tles if id in self.epochs and epochs[id] != self.epochs[id]]
+        removed = [id for id in self.epochs if id not in tles]
+        if self.document_text is not None and not (added or changed or removed):
+            return None
+
+        for id in changed + removed:
+            if id in self.czml.satellites:
+                color = self.czml.satellites[id].color
+                self.czml.remove_satellite(id)
+            else:
+                color = None
+            self.texts.pop(id, None)
+            if id in tles:
+                # Keep the color so the satellite doesn't change look
+                self.__add(id, tles[id], color)
+        for id in added:
+            self.__add(id, tles[id])
+        self.tles, self.epochs = tles, epochs
+
+        # The first build is the output itself, not a delta
+        first = self.document_text is None
+        rebuilt = [id for id in added + changed if id in self.czml.satellites]
+        self.document_text, texts = self.__build(set(rebuilt))
+        self.texts.update(texts)
+        self.__write(self.__iter_document(), self.output)
+        if self.delta and not first:
+            self.__write_delta(changed + removed, texts)
+
+        if self.observer is not None:
+            self.observer.count('rebuilt', len(rebuilt))
+            self.observer.count('removed', len(removed))
+        return {'added': added, 'changed': changed, 'removed': removed}
+
+    def set_window(self, start_time, end_time):
+        '''
+        Changes the time window, which rebuilds every satellite
+        '''
+        self.czml.set_start_end_time(start_time, end_time)
+        for id, sat in list(self.czml.satellites.items()):
+            self.czml.remove_satellite(id)
+            self.__add(id, self.tles[id], sat.color)
+        self.document_text, self.texts = self.__build()
+        self.__write(self.__iter_document(), self.output)
+        return True
+
+    def run(self, interval=5.0, polls=None):
+        '''
+        Polls the inputs every interval seconds, polls times or forever
+        '''
+        count = 0
+        while polls is None or count < polls:
+            self.poll()
+            count += 1
+            if polls is None or count < polls:
+                time.sleep(interval)
+        return True
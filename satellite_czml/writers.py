@@ -0,0 +1,147 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from .czml import _json
+
+import os
+import stat
+import tempfile
+import zlib
+
+# Supported compressions with their (lowest, highest, default) levels.
+# gzip writes .gz files, deflate is the zlib stream HTTP calls "deflate",
+# brotli needs the optional brotli package.
+COMPRESSIONS = {
+    'gzip': (0, 9, 6),
+    'deflate': (0, 9, 6),
+    'brotli': (0, 11, 5),
+}
+
+# File extensions that pick a compression in write_czml
+EXTENSIONS = {'.gz': 'gzip', '.br': 'brotli', '.zz': 'deflate'}
+
+
+class _brotli_compressor():
+    '''
+    Gives a brotli Compressor the compress/flush interface of zlib
+    '''
+    __slots__ = ('compressor',)
+
+    def __init__(self, level):
+        try:
+            import brotli
+        except ImportError:
+            raise Exception("brotli compression needs the brotli package: pip install brotli")
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+def check_compression(compression, level=None):
+    '''
+    Checks the compression name and level, returning the level to use
+    '''
+    if compression not in COMPRESSIONS:
+        raise Exception(f"Compression {compression} is not supported. Expected one of {list(COMPRESSIONS)}.")
+    lowest, highest, default = COMPRESSIONS[compression]
+    if level is None:
+        return default
+    if not lowest <= level <= highest:
+        raise Exception(f"{compression} level must be between {lowest} and {highest}. Got: {level}")
+    return level
+
+
+def compressor(compression='gzip', level=None):
+    '''
+    Returns a new streaming compressor with compress() and flush() methods
+    '''
+    level = check_compression(compression, level)
+    if compression == 'gzip':
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if compression == 'deflate':
+        return zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS)
+    return _brotli_compressor(level)
+
+
+def iter_text(packets):
+    '''
+    Yields the JSON text of a CZML document one packet at a time.  Joined
+    together it is the same as str(CZML(packets)).
+    '''
+    dumps = _json().dumps
+    separator = '['
+    for packet in packets:
+        yield separator + dumps(packet if isinstance(packet, dict) else packet.data())
+        separator = ', '
+    yield '[]' if separator == '[' else ']'
+
+
+def iter_compressed(texts, compression='gzip', level=None, chunk_size=1 << 16):
+    '''
+    Compresses a stream of text pieces as they come, yielding compressed
+    chunks.  About chunk_size bytes of text are collected before each
+    compress call, which keeps the calls cheap without holding much.
+    '''
+    stream = compressor(compression, level)
+    pending, size = [], 0
+    for text in texts:
+        data = text.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            chunk = stream.compress(b''.join(pending))
+            pending, size = [], 0
+            if chunk:
+                yield chunk
+    chunk = stream.compress(b''.join(pending)) + stream.flush()
+    if chunk:
+        yield chunk
+
+
+def write_chunks(chunks, path, atomic=False):
+    '''
+    Writes byte or text chunks to path, returning the number of bytes
+    written.  With atomic, the chunks go to a temporary file next to path
+    that then replaces it, so readers never see a half written file.
+    '''
+    target = path
+    if atomic:
+        fd, path = tempfile.mkstemp(prefix=f".{os.path.basename(target)}.",
+                                    dir=os.path.dirname(os.path.abspath(target)))
+        os.close(fd)
+
+    written = 0
+    binary = None
+    try:
+        with open(path, 'wb') as f:
+            for chunk in chunks:
+                if binary is None:
+                    binary = isinstance(chunk, bytes)
+                data = chunk if binary else chunk.encode('utf-8')
+                f.write(data)
+                written += len(data)
+        if atomic:
+            # mkstemp files are private, keep the mode of the file replaced
+            os.chmod(path, stat.S_IMODE(os.stat(target).st_mode) if os.path.exists(target) else 0o644)
+            os.replace(path, target)
+    except BaseException:
+        if atomic and os.path.exists(path):
+            os.remove(path)
+        raise
+    return written
+
+
+def compression_for(path):
+    '''
+    Picks the compression from a file name (e.g. "out.czml.gz" is gzip),
+    or None for uncompressed output
+    '''
+    for extension, compression in EXTENSIONS.items():
+        if str(path).endswith(extension):
+            return compression
+    return None
@@ -20,10 +20,16 @@ setup_args = dict(
 
 install_requires = [
     'sgp4>=2.15',
+    'numpy',
     'pygeoif',
-    'simplejson',
-    'pytz'
+    'simplejson'
 ]
 
+extras_require = {
+    'brotli': ['brotli'],
+    'parquet': ['pyarrow'],
+}
+
 if __name__ == '__main__':
-    setup(**setup_args, install_requires=install_requires)
+    setup(**setup_args, install_requires=install_requires, extras_require=extras_require,
+          entry_points={'console_scripts': ['satellite-czml = satellite_czml.cli:main']})
@@ -0,0 +1,52 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from datetime import datetime, timezone
+
+import pytest
+
+from satellite_czml.catalogs import make_tle
+from satellite_czml.satellite_czml import tle_checksum
+
+ISS = ['ISS (ZARYA)',
+       '1 25544U 98067A   21016.23305200  .00001366  00000-0  32598-4 0  9992',
+       '2 25544  51.6457  14.3113 0000235 231.0982 239.8264 15.49297436265049']
+
+START_TIME = datetime(2021, 1, 16, tzinfo=timezone.utc)
+END_TIME = datetime(2021, 1, 17, tzinfo=timezone.utc)
+
+
+def orbit_tle(norad_id, mean_motion, eccentricity=0.001, inclination=55.0):
+    '''
+    TLE of an orbit with the given mean motion (revolutions per day)
+    '''
+    return make_tle(norad_id, inclination, 10.0, eccentricity, 20.0, 30.0, mean_motion)
+
+
+def decaying_tle(norad_id, bstar):
+    '''
+    TLE of a low orbit with its epoch 6 hours before START_TIME and a drag
+    term (e.g. "10000-1") large enough that sgp4 gives up on it
+    '''
+    name, line1, line2 = make_tle(norad_id, 51.6, 10.0, 0.001, 20.0, 30.0, 16.2, epoch='21015.75000000')
+    line1 = line1[:53] + ' ' + bstar + line1[61:68]
+    return [name, line1 + str(tle_checksum(line1)), line2]
+
+
+@pytest.fixture
+def catalog():
+    '''
+    One satellite of each orbit regime
+    '''
+    return [ISS,
+            orbit_tle(40001, 2.00563),                 # GPS
+            orbit_tle(40002, 1.00270, 0.0002, 0.05),   # GEO
+            orbit_tle(40003, 2.0064, 0.72, 63.4),      # Molniya
+            orbit_tle(40004, 14.2, 0.0011, 98.0)]
+
+
+@pytest.fixture
+def czml_obj(catalog):
+    from satellite_czml import satellite_czml
+    return satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME)
@@ -0,0 +1,61 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import numpy as np
+import pytest
+
+from satellite_czml import satellite, satellite_czml
+from satellite_czml.attitude import axes_to_quaternions
+from satellite_czml.propagation import julian_dates, teme_to_ecef
+
+from conftest import START_TIME, END_TIME
+
+
+def rotate(q, v):
+    '''
+    Rotates vectors v by unit quaternions q ([X, Y, Z, W])
+    '''
+    u, w = q[..., :3], q[..., 3:]
+    return v + 2 * np.cross(u, np.cross(u, v) + w * v)
+
+
+def unit(v):
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def test_quaternions_reproduce_random_rotations():
+    matrices, _ = np.linalg.qr(np.random.default_rng(2).normal(size=(500, 3, 3)))
+    matrices *= np.sign(np.linalg.det(matrices))[:, None, None]
+    q = axes_to_quaternions(matrices[..., 0], matrices[..., 1], matrices[..., 2])
+    assert np.allclose(np.linalg.norm(q, axis=-1), 1)
+    for axis in range(3):
+        assert np.allclose(rotate(q, np.eye(3)[axis]), matrices[..., axis])
+
+
+@pytest.mark.parametrize('mode', ['lvlh', 'velocity'])
+def test_body_axes_follow_the_mode(catalog, mode):
+    czml_obj = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME, attitude_mode=mode)
+    czml_obj.build_orientations()
+    for sat in czml_obj.satellites.values():
+        offsets, positions, velocities = sat.propagate()
+        rows = np.reshape(sat.czmlOrientation.data()['unitQuaternion'], (-1, 5))
+        assert np.array_equal(rows[:, 0], offsets)
+        q = rows[:, 1:]
+        jd, fr = julian_dates(START_TIME, offsets)
+        nadir = -unit(teme_to_ecef(positions, jd, fr))
+        if mode == 'lvlh':
+            assert np.allclose(rotate(q, [0, 0, 1]), nadir, atol=1e-9)
+            assert np.allclose(rotate(q, [0, 1, 0]), -unit(teme_to_ecef(np.cross(positions, velocities), jd, fr)),
+                               atol=1e-9)
+        else:
+            x = unit(teme_to_ecef(velocities, jd, fr))
+            assert np.allclose(rotate(q, [1, 0, 0]), x, atol=1e-9)
+            # +Z is nadir without its part along the velocity
+            along = np.sum(nadir * x, axis=-1, keepdims=True)
+            assert np.allclose(rotate(q, [0, 0, 1]), unit(nadir - along * x), atol=1e-9)
+        # Consecutive samples interpolate the short way round
+        assert (np.sum(q[1:] * q[:-1], axis=-1) > 0).all()
+
+        single = satellite(sat.tle, name=sat.name, start_time=START_TIME, end_time=END_TIME, attitude_mode=mode)
+        assert np.allclose(np.reshape(single.build_orientation().data()['unitQuaternion'], (-1, 5)), rows)
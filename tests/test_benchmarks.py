@@ -0,0 +1,52 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import io
+import json
+import os
+import sys
+
+from sgp4.api import Satrec
+
+from satellite_czml import satellite
+from satellite_czml.catalogs import REGIME_MIX, synthetic_catalog
+
+# The benchmark scripts under test aren't part of the package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import bench_czml  # noqa: E402
+
+
+def test_synthetic_catalog_is_repeatable_and_mixed():
+    tles = synthetic_catalog(2000, seed=3)
+    assert tles == synthetic_catalog(2000, seed=3) and tles != synthetic_catalog(2000, seed=4)
+    assert all(Satrec.twoline2rv(tle[1], tle[2]).error == 0 for tle in tles)
+
+    regimes = [satellite(tle).orbit_regime for tle in tles]
+    for regime, (fraction, _, _, _) in REGIME_MIX.items():
+        assert abs(regimes.count(regime) / len(tles) - fraction) < 0.02, regime
+
+
+def test_cases_sweep_one_dimension_at_a_time():
+    cases = bench_czml.expand_cases('quick')
+    assert bench_czml.BASELINE in cases
+    assert len(cases) == len({bench_czml.case_key(c) for c in cases})
+    assert all(sum(c[k] != bench_czml.BASELINE[k] for k in c) <= 1 for c in cases)
+
+    grid = bench_czml.expand_cases('quick', grid=True, overrides={'count': [5], 'hours': [1]})
+    assert len(grid) == 2 ** 5
+
+
+def test_run_and_compare(tmp_path):
+    case = dict(bench_czml.BASELINE, count=5, hours=1)
+    out = io.StringIO()
+    bench_czml.run_all([case], out=out)
+    result = json.loads(out.getvalue())
+    assert result['satellites'] == 5 and result['bytes_out'] > 0 and result['peak_rss'] > 0
+    assert set(result['stages']) == {'parse', 'propagate', 'build_packets', 'serialize'}
+
+    slower = dict(result, wall_time=result['wall_time'] * 2)
+    (tmp_path / 'before.jsonl').write_text(json.dumps(result) + '\n')
+    (tmp_path / 'after.jsonl').write_text(json.dumps(slower) + '\n')
+    assert bench_czml.compare(str(tmp_path / 'before.jsonl'), str(tmp_path / 'before.jsonl')) == 0
+    assert bench_czml.compare(str(tmp_path / 'before.jsonl'), str(tmp_path / 'after.jsonl')) == 1
@@ -0,0 +1,63 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import gzip
+import json
+
+import pytest
+
+from satellite_czml import satellite_czml
+from satellite_czml.cli import main, read_tle
+
+from satellite_czml.catalogs import load_catalog
+from conftest import START_TIME, END_TIME
+
+
+@pytest.fixture
+def tle_file(catalog, tmp_path):
+    path = tmp_path / 'catalog.tle'
+    # The first satellite without its name line
+    path.write_text('\n'.join(catalog[0][1:] + [line for tle in catalog[1:] for line in tle]) + '\n')
+    return str(path)
+
+
+def test_read_tle(catalog, tle_file):
+    assert read_tle(tle_file) == [['25544'] + catalog[0][1:]] + catalog[1:]
+    assert load_catalog(tle_file, count=2) == read_tle(tle_file)[:2]
+
+
+@pytest.mark.parametrize('arguments', [
+    [],
+    ['-o', 'out.czml', '--shard-by', 'count'],
+    ['-o', 'out.czml', '--shard-by', 'norad', '--shard-size', '0'],
+    ['-o', 'out.czml', '--watch', '--workers', '2'],
+    ['--columnar', 'out.npz', '--watch'],
+    ['--columnar', 'out.npz', '--workers', '2'],
+    ['-o', 'out.czml.gz', '--level', '12'],
+])
+def test_argument_errors_are_usage_errors(tle_file, arguments, capsys):
+    with pytest.raises(SystemExit) as exit:
+        main([tle_file] + arguments)
+    assert exit.value.code == 2
+    assert 'usage: satellite-czml' in capsys.readouterr().err
+
+
+def test_shards_and_parts_make_the_same_document(catalog, tle_file, tmp_path):
+    window = ['--start', '2021-01-16T00:00:00Z', '--end', '2021-01-17T00:00:00Z', '--seed', '1']
+    expected = satellite_czml(tle_list=read_tle(tle_file), start_time=START_TIME, end_time=END_TIME,
+                              seed=1).get_czml()
+
+    assert main([tle_file, '-o', str(tmp_path / 'one.czml')] + window) == 0
+    assert (tmp_path / 'one.czml').read_text(encoding='utf-8') == expected
+
+    assert main([tle_file, '-o', str(tmp_path / 'parts.czml.gz'), '--workers', '2'] + window) == 0
+    parts = json.loads(gzip.decompress((tmp_path / 'parts.czml.gz').read_bytes()))
+    assert parts == json.loads(expected)
+    assert main([tle_file, '-o', str(tmp_path / 'parts.czml'), '--workers', '3'] + window) == 0
+    assert json.loads((tmp_path / 'parts.czml').read_text(encoding='utf-8')) == json.loads(expected)
+
+    assert main([tle_file, '-o', str(tmp_path / 'shard.czml'), '--shard-by', 'count', '--shard-size', '2']
+                + window) == 0
+    shards = [json.loads((tmp_path / f'shard-{i}.czml').read_text()) for i in range(3)]
+    assert [[p['id'] for p in shard[1:]] for shard in shards] == [[25544, 40001], [40002, 40003], [40004]]
@@ -0,0 +1,70 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import csv
+
+import numpy as np
+import pytest
+
+from satellite_czml import satellite_czml
+
+from conftest import START_TIME, END_TIME, decaying_tle
+
+
+@pytest.fixture
+def czml_with_decay(catalog):
+    return satellite_czml(tle_list=catalog + [decaying_tle(40100, '10000-1')], start_time=START_TIME,
+                          end_time=END_TIME, ignore_bad_tles=True)
+
+
+def test_npz_matches_the_samples(czml_with_decay, tmp_path):
+    path = str(tmp_path / 'samples.npz')
+    rows = czml_with_decay.write_columnar(path, geodetic=True, velocities=True, batch_size=2)
+    table = np.load(path)
+    assert set(table.files) == {'id', 'time', 'x', 'y', 'z', 'vx', 'vy', 'vz', 'lat', 'lon', 'alt'}
+    assert len(table['id']) == rows
+
+    start = np.datetime64('2021-01-16T00:00:00', 'us')
+    for id, sat in czml_with_decay.satellites.items():
+        rows = table['id'] == id
+        valid = sat.sample_valid
+        assert rows.sum() == valid.sum()
+        offsets = (table['time'][rows] - start) / np.timedelta64(1, 's')
+        assert np.array_equal(offsets, sat.sample_offsets[valid])
+        positions = np.stack([table[name][rows] for name in 'xyz'], axis=-1)
+        assert np.array_equal(positions, sat.sample_positions[valid])
+        velocities = np.stack([table[name][rows] for name in ['vx', 'vy', 'vz']], axis=-1)
+        assert np.array_equal(velocities, sat.sample_velocities[valid])
+        geodetic = sat.position_at(offsets, frame='geodetic')
+        assert np.allclose(np.stack([table[name][rows] for name in ['lat', 'lon', 'alt']], axis=-1), geodetic)
+    # The decaying satellite stops once sgp4 gives up on it
+    assert 0 < (table['id'] == 40100).sum() < (table['id'] == 25544).sum()
+
+
+def test_csv_matches_npz(czml_obj, tmp_path):
+    czml_obj.write_columnar(str(tmp_path / 'samples.npz'), ids=[25544, 40002])
+    rows = czml_obj.write_columnar(str(tmp_path / 'samples.csv'), ids=[25544, 40002])
+    table = np.load(str(tmp_path / 'samples.npz'))
+    with open(tmp_path / 'samples.csv') as f:
+        lines = list(csv.DictReader(f))
+    assert len(lines) == rows == len(table['id'])
+    assert set(table['id']) == {25544, 40002}
+    assert [int(x['id']) for x in lines] == table['id'].tolist()
+    assert [x['time'] for x in lines] == [str(t) + 'Z' for t in table['time'].astype('datetime64[s]')]
+    assert np.allclose([float(x['x']) for x in lines], table['x'], rtol=0, atol=0.0005)
+
+
+def test_parquet_matches_npz(czml_obj, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    czml_obj.write_columnar(str(tmp_path / 'samples.npz'))
+    czml_obj.write_columnar(str(tmp_path / 'samples.parquet'), batch_size=2)
+    table = np.load(str(tmp_path / 'samples.npz'))
+    parquet = pq.read_table(str(tmp_path / 'samples.parquet'))
+    assert parquet.column('id').to_numpy().tolist() == table['id'].tolist()
+    assert np.array_equal(parquet.column('z').to_numpy(), table['z'])
+
+
+def test_unknown_format_is_rejected(czml_obj, tmp_path):
+    with pytest.raises(Exception):
+        czml_obj.write_columnar(str(tmp_path / 'samples.xlsx'))
@@ -0,0 +1,57 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from concurrent.futures import ThreadPoolExecutor
+import random
+
+import pytest
+
+from satellite_czml import propagation_cache, satellite_czml
+
+from conftest import START_TIME, END_TIME
+
+
+def build(catalog, seed, cache=None):
+    return satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME, seed=seed,
+                          cache=cache).get_czml()
+
+
+def test_thread_pool_matches_serial_builds(catalog):
+    seeds = [i % 4 + 1 for i in range(16)]
+    expected = {seed: build(catalog, seed) for seed in set(seeds)}
+    cache = propagation_cache()
+    with ThreadPoolExecutor(8) as pool:
+        documents = list(pool.map(lambda seed: build(catalog, seed, cache), seeds))
+    assert documents == [expected[seed] for seed in seeds]
+    assert len(cache) == len(catalog) and cache.misses >= len(catalog) and cache.hits > 0
+
+
+def test_threads_sharing_one_object(czml_obj):
+    with ThreadPoolExecutor(8) as pool:
+        documents = list(pool.map(lambda _: czml_obj.get_czml(), range(8)))
+    assert len(set(documents)) == 1
+    assert documents[0] == czml_obj.get_czml()
+
+
+def test_seeds_only_seed_their_object(catalog):
+    state = random.getstate()
+    first = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME, seed=5)
+    colors = [sat.color for sat in first.satellites.values()]
+    second = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME, seed=7)
+    second.set_seed(9)
+    assert random.getstate() == state
+    assert [sat.color for sat in first.satellites.values()] == colors
+    assert [sat.color for sat in second.satellites.values()] != colors
+    assert colors == [sat.color for sat in satellite_czml(tle_list=catalog, start_time=START_TIME,
+                                                          end_time=END_TIME, seed=5).satellites.values()]
+
+
+def test_cached_samples_are_read_only(catalog):
+    cache = propagation_cache()
+    assert build(catalog, 1, cache) == build(catalog, 1)
+    czml_obj = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME, cache=cache)
+    czml_obj.propagate()
+    positions = czml_obj.satellites[25544].sample_positions
+    with pytest.raises(ValueError):
+        positions[0, 0] = 0.0
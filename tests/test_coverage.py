@@ -0,0 +1,72 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import numpy as np
+import pytest
+
+from satellite_czml.coverage import coverage_accumulator
+from satellite_czml.propagation import WGS84_E2, julian_dates, teme_to_ecef
+from satellite_czml.region import EARTH_RADIUS, footprint_angle
+from satellite_czml.sensors import sensor_central_angle
+
+
+def brute_force(accumulator, positions, durations):
+    '''
+    Seconds each cell center is within reach of a satellite, cell by cell
+    '''
+    lat = np.arctan((1 - WGS84_E2) * np.tan(np.radians(accumulator.lat)))[:, None]
+    lon = np.radians(accumulator.lon)[None, :]
+    seconds = np.zeros(accumulator.shape)
+    for time, duration in enumerate(durations):
+        covered = np.zeros(accumulator.shape, dtype=bool)
+        for position in positions[:, time]:
+            distance = np.linalg.norm(position)
+            if accumulator.half_angle is not None:
+                reach = sensor_central_angle(distance, accumulator.half_angle)
+            else:
+                reach = footprint_angle(distance - EARTH_RADIUS, accumulator.min_elevation)
+            sub_lat = np.arcsin(position[2] / distance)
+            sub_lon = np.arctan2(position[1], position[0])
+            cos_angle = np.sin(lat) * np.sin(sub_lat) + np.cos(lat) * np.cos(sub_lat) * np.cos(lon - sub_lon)
+            covered |= cos_angle >= np.cos(reach)
+        seconds += covered * duration
+    return seconds
+
+
+def random_positions(satellites, times, seed=0):
+    rng = np.random.default_rng(seed)
+    directions = rng.normal(size=(satellites, times, 3))
+    directions /= np.linalg.norm(directions, axis=-1, keepdims=True)
+    return directions * (EARTH_RADIUS + rng.uniform(400e3, 36000e3, size=(satellites, times, 1)))
+
+
+@pytest.mark.parametrize('options', [
+    {'resolution': 5.0, 'half_angle': 30.0},
+    {'resolution': 4.0, 'min_elevation': 10.0},
+    {'resolution': 2.5, 'half_angle': 10.0, 'region': [150, -40, -150, 40], 'max_elements': 1000},
+    {'resolution': 3.0, 'region': [-20, 30, 40, 90]},
+])
+def test_coverage_matches_brute_force(options):
+    positions = random_positions(6, 20)
+    durations = np.full(20, 60.0)
+    accumulator = coverage_accumulator(**options)
+    accumulator.add(positions, durations)
+    expected = brute_force(accumulator, positions, durations)
+    # Cells whose center is right on a footprint edge may go either way
+    assert (accumulator.seconds != expected).mean() < 0.002
+    assert accumulator.total_seconds == 1200.0
+    assert np.allclose(accumulator.get_minutes_per_day(), accumulator.seconds / 60 * 86400 / 1200)
+
+
+def test_get_coverage_from_the_samples(czml_obj):
+    coverage = czml_obj.get_coverage(half_angle=40, resolution=5.0, step=600)
+    times = np.arange(0.0, 86400, 600)
+    ids, positions = czml_obj.position_at(times, method='propagate')
+    ecef = teme_to_ecef(positions, *julian_dates(czml_obj.start_time, times))
+    expected = brute_force(coverage, ecef, np.full(len(times), 600.0))
+    assert (coverage.seconds != expected).mean() < 0.002
+
+    packets = coverage.build_packets()
+    assert len(packets) == np.count_nonzero(coverage.seconds)
+    assert all(p.data()['polygon']['material']['solidColor']['color']['rgba'][3] == 160 for p in packets)
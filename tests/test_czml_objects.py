@@ -0,0 +1,65 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import json
+
+import pytest
+
+from satellite_czml.czml import CZML, Billboard, Cone, CZMLPacket, Label, Path, Point, Position
+
+# What the object model wrote before it had __slots__ and property tables
+EXPECTED = json.loads('''
+{"id": "a1", "availability": "2021-01-01T00:00:00Z/2021-01-02T00:00:00Z",
+ "position": {"epoch": "2021-01-01T00:00:00+00:00", "cartesian": [0.0, 1.0, 2.0, 3.0, 60.0, 4.0, 5.0, 6.0],
+              "interpolationDegree": 5, "referenceFrame": "INERTIAL"},
+ "label": {"show": true, "text": "hi", "fillColor": {"rgba": [1, 2, 3, 4]}, "font": "x"},
+ "point": {"show": true, "color": {"rgba": [1, 2, 3, 4]}, "pixelSize": 3},
+ "path": {"show": true, "width": 2, "leadTime": [{"a": 1}], "trailTime": [{"b": 2}], "resolution": 120},
+ "cone": {"show": true, "innerHalfAngle": 0.1, "outerHalfAngle": 0.5}}
+''')
+
+
+def build_packet():
+    packet = CZMLPacket(id='a1', availability='2021-01-01T00:00:00Z/2021-01-02T00:00:00Z')
+    packet.position = Position(epoch='2021-01-01T00:00:00Z', cartesian=[0, 1, 2, 3, 60, 4, 5, 6],
+                               interpolationDegree=5, referenceFrame='INERTIAL')
+    packet.point = Point(show=True, color={'rgba': [1, 2, 3, 4]}, pixelSize=3)
+    label = Label(text='hi', show=True)
+    label.font = 'x'
+    label.fillColor = {'rgba': [1, 2, 3, 4]}
+    packet.label = label
+    path = Path()
+    path.show = True
+    path.width = 2
+    path.resolution = 120
+    path.leadTime = [{'a': 1}]
+    path.trailTime = [{'b': 2}]
+    packet.path = path
+    packet.cone = Cone(innerHalfAngle=0.1, outerHalfAngle=0.5)
+    return packet
+
+
+def test_output_is_unchanged():
+    packet = build_packet()
+    assert json.dumps(packet.data()) == json.dumps(EXPECTED)
+    assert json.loads(CZML([packet]).dumps()) == [EXPECTED]
+
+
+@pytest.mark.parametrize('cls', [CZMLPacket, Billboard, Label, Path, Point, Position, Cone])
+def test_objects_use_slots(cls):
+    first, second = cls(), cls()
+    assert not hasattr(first, '__dict__')
+    with pytest.raises(AttributeError):
+        first.not_a_property = 1
+    assert first._property_set == frozenset(cls._properties)
+    assert first.data() == second.data()
+
+
+def test_loading_data_rebuilds_the_packet():
+    packet = CZMLPacket()
+    packet.load(EXPECTED)
+    assert packet.data() == EXPECTED
+    document = CZML()
+    document.loads(json.dumps([EXPECTED]))
+    assert list(document.data()) == [EXPECTED]
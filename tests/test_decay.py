@@ -0,0 +1,58 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import json
+
+import numpy as np
+import pytest
+
+from satellite_czml import satellite_czml, stats_observer
+from satellite_czml.isotime import parse_iso
+from satellite_czml.propagation import propagate
+
+from conftest import ISS, START_TIME, END_TIME, decaying_tle
+
+
+@pytest.fixture
+def decaying():
+    observer = stats_observer()
+    czml_obj = satellite_czml(tle_list=[ISS, decaying_tle(1, '10000-1'), decaying_tle(2, '50000-1')],
+                              start_time=START_TIME, end_time=END_TIME, observer=observer,
+                              ignore_bad_tles=True)
+    return czml_obj, observer
+
+
+def test_availability_ends_when_sgp4_gives_up(decaying):
+    czml_obj, observer = decaying
+    packets = {p['id']: p for p in json.loads(czml_obj.get_czml())}
+    assert set(packets) == {'document', 25544, 1}
+
+    # The first second sgp4 fails for the decaying satellite
+    seconds = np.arange(0, 86400.0)
+    _, _, valid = propagate([czml_obj.satellites[1].satrec], START_TIME, seconds)
+    decay = seconds[np.argmin(valid[0])]
+
+    start, end = [parse_iso(t) for t in packets[1]['availability'].split('/')]
+    assert start == START_TIME
+    step = czml_obj.satellites[1].get_sample_step()
+    assert decay - step <= (end - START_TIME).total_seconds() < decay
+    assert packets[1]['position']['cartesian'][-4] == (end - START_TIME).total_seconds()
+    assert not np.isnan(packets[1]['position']['cartesian']).any()
+    assert packets[25544]['availability'] == '2021-01-16T00:00:00+00:00/2021-01-17T00:00:00+00:00'
+
+    stats = observer.as_dict()
+    assert list(stats['failed']) == ['2'] and stats['trimmed'] == {'1': packets[1]['availability']}
+
+
+def test_snapshot_leaves_out_satellites_sgp4_gave_up_on(decaying):
+    czml_obj, _ = decaying
+    early = [p['id'] for p in json.loads(czml_obj.get_snapshot_czml())]
+    late = [p['id'] for p in json.loads(czml_obj.get_snapshot_czml([END_TIME]))]
+    assert early == ['document', 25544, 1] and late == ['document', 25544]
+
+
+def test_satellites_sgp4_cannot_propagate_are_dropped():
+    czml_obj = satellite_czml(tle_list=[ISS, decaying_tle(2, '50000-1')], start_time=START_TIME,
+                              end_time=END_TIME)
+    assert [p['id'] for p in json.loads(czml_obj.get_czml())] == ['document', 25544]
@@ -0,0 +1,118 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import copy
+import json
+
+from satellite_czml import czml_document, load_czml
+from satellite_czml.czml import CZMLPacket
+
+# Valid CZML the packet object model doesn't know or can't represent exactly
+GROUND_STATION = {
+    "id": "gs-1",
+    "parent": "stations",
+    "name": "Station",
+    "position": {"cartographicDegrees": [10.0, 51.0, 0.0]},
+    "model": {"gltf": "dish.glb", "scale": 2.0},
+    "rectangle": {"coordinates": {"wsenDegrees": [9.0, 50.0, 11.0, 52.0]}},
+    "properties": {"operator": "ESA", "antennas": 3},
+    "label": {"text": "GS", "showBackground": True},
+    "billboard": {"image": "dish.png", "eyeOffset": {"cartesian": [0, 0, -10]},
+                  "heightReference": "CLAMP_TO_GROUND"},
+    "ellipsoid": {"radii": {"cartesian": [1000.0, 1000.0, 1000.0]}},
+}
+
+
+def test_packets_load_without_losing_properties():
+    packet = CZMLPacket()
+    packet.load(GROUND_STATION)
+    assert packet.data() == GROUND_STATION
+    assert packet.name == 'Station'
+
+    packet.label = {"text": "Replaced"}
+    assert packet.data()['label'] == {"text": "Replaced"}
+
+
+def test_setting_properties_needs_no_attribute_hook():
+    assert CZMLPacket.__setattr__ is object.__setattr__
+
+    packet = CZMLPacket()
+    packet.load(GROUND_STATION)
+    packet.billboard = {"image": "other.png"}
+    assert packet.data()['billboard'] == {"image": "other.png"}
+
+    # A later load of a value the object model represents replaces the kept JSON
+    packet.load({"label": {"text": "Plain"}})
+    assert packet.data()['label'] == {"text": "Plain"}
+    packet.load({"label": {"text": "GS", "showBackground": True}})
+    assert packet.data()['label'] == GROUND_STATION['label']
+
+
+def test_merge_round_trip_is_lossless():
+    doc = czml_document([{"id": "document", "version": "1.0"}, GROUND_STATION])
+    assert json.loads(str(doc)) == [{"id": "document", "version": "1.0"}, GROUND_STATION]
+
+    doc.upsert({"id": "gs-1", "label": {"text": "Renamed"}, "properties": {"antennas": 4},
+                "model": {"delete": True}})
+    expected = copy.deepcopy(GROUND_STATION)
+    expected['label']['text'] = 'Renamed'
+    expected['properties']['antennas'] = 4
+    del expected['model']
+    assert doc['gs-1'] == expected
+    assert GROUND_STATION['label']['text'] == 'GS'
+    assert list(doc.czml().data())[1] == expected
+
+
+def test_load_czml_keeps_unknown_properties(tmp_path):
+    path = tmp_path / 'stations.czml'
+    path.write_text(json.dumps([{"id": "document", "version": "1.0"}, GROUND_STATION]))
+    assert list(load_czml(str(path), ids=['gs-1']).data()) == [GROUND_STATION]
+
+    doc = czml_document()
+    doc.merge(load_czml(str(path)))
+    assert doc['gs-1'] == GROUND_STATION
+
+
+def test_samples_are_interleaved_by_time():
+    doc = czml_document([{"id": 1, "position": {"epoch": "2021-01-16T00:00:00Z", "interpolationDegree": 5,
+                                                "cartesian": [0, 1, 1, 1, 120, 3, 3, 3]}}])
+    doc.upsert({"id": 1, "position": {"epoch": "2021-01-16T00:00:00+00:00", "interpolationDegree": 7,
+                                      "cartesian": [60, 2, 2, 2, 120, 4, 4, 4]}})
+    assert doc[1]['position'] == {"epoch": "2021-01-16T00:00:00Z", "interpolationDegree": 7,
+                                  "cartesian": [0, 1, 1, 1, 60, 2, 2, 2, 120, 4, 4, 4]}
+
+    # Times relative to another epoch, or as ISO 8601 strings
+    doc.upsert({"id": 1, "position": {"epoch": "2021-01-16T00:03:00Z", "cartesian": [0, 5, 5, 5]}})
+    doc.upsert({"id": 1, "position": {"cartesian": ["2021-01-16T00:00:30Z", 6, 6, 6]}})
+    assert doc[1]['position']['cartesian'] == [0, 1, 1, 1, 30.0, 6, 6, 6, 60, 2, 2, 2, 120, 4, 4, 4,
+                                               180.0, 5, 5, 5]
+
+    # Constant values still replace samples
+    doc.upsert({"id": 1, "position": {"cartesian": [7, 7, 7]}})
+    assert doc[1]['position'] == {"interpolationDegree": 7, "cartesian": [7, 7, 7]}
+
+
+def test_equal_intervals_written_differently_are_merged():
+    doc = czml_document([{"id": 1, "path": {"show": [
+        {"interval": "2021-01-16T00:00:00Z/2021-01-16T12:00:00Z", "boolean": True},
+        {"interval": "2021-01-16T12:00:00Z/2021-01-17T00:00:00Z", "boolean": True}]}}])
+    doc.upsert({"id": 1, "path": {"show": [
+        {"interval": "2021-01-16T12:00:00.000+00:00/2021-01-16T19:00:00-05:00", "boolean": False}]}})
+    assert [x['boolean'] for x in doc[1]['path']['show']] == [True, False]
+
+
+def test_consecutive_windows_merge_into_one_track(catalog):
+    from datetime import timedelta
+    from satellite_czml import satellite_czml
+    from conftest import START_TIME
+    days = [satellite_czml(tle_list=catalog[:1], start_time=START_TIME + timedelta(days=i),
+                           end_time=START_TIME + timedelta(days=i + 1)).build_document() for i in range(2)]
+    doc = czml_document(days[0])
+    doc.merge(days[1])
+    position = doc[25544]['position']
+    times = position['cartesian'][::4]
+    assert position['epoch'] == '2021-01-16T00:00:00+00:00'
+    assert times == sorted(times) and times[-1] >= 2 * 86400
+    first = list(days[0].data())[1]['position']['cartesian']
+    assert position['cartesian'][:len(first) - 8 * 4] == first[:len(first) - 8 * 4]
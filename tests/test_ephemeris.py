@@ -0,0 +1,55 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from satellite_czml import satellite_czml, stats_observer
+from satellite_czml.ephemeris import ephemeris_store
+
+from conftest import START_TIME, END_TIME
+
+
+def test_store_round_trip(catalog, czml_obj, tmp_path):
+    path = str(tmp_path / 'day.eph')
+    assert czml_obj.write_ephemeris(path) == (tmp_path / 'day.eph').stat().st_size
+
+    store = ephemeris_store(path)
+    assert len(store) == len(catalog)
+    assert (store.start_time, store.end_time) == (START_TIME, END_TIME)
+    for id, sat in czml_obj.satellites.items():
+        step, offsets, positions, velocities, valid = store.get_samples(id)
+        assert step == sat.get_sample_step()
+        assert np.array_equal(offsets, sat.sample_offsets)
+        assert np.array_equal(positions, sat.sample_positions)
+        assert np.array_equal(velocities, sat.sample_velocities)
+        assert np.array_equal(valid, sat.sample_valid)
+
+    stats = stats_observer()
+    replay = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME, observer=stats)
+    assert replay.load_ephemeris(store) == len(catalog)
+    assert 'propagate' not in stats.stages
+    assert replay.get_czml() == czml_obj.get_czml()
+
+
+def test_only_matching_satellites_are_loaded(catalog, czml_obj, tmp_path):
+    path = str(tmp_path / 'day.eph')
+    czml_obj.write_ephemeris(path, velocities=False)
+
+    other_window = satellite_czml(tle_list=catalog, start_time=START_TIME,
+                                  end_time=END_TIME + timedelta(hours=1))
+    assert other_window.load_ephemeris(path) == 0
+    # Interpolating with velocities needs them stored
+    hermite = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME, use_velocity=True)
+    writing_velocities = sum(sat.use_velocity for sat in hermite.satellites.values())
+    assert writing_velocities == 2
+    assert hermite.load_ephemeris(path) == len(catalog) - writing_velocities
+
+    with pytest.raises(Exception):
+        ephemeris_store(path).get_samples(99999)
+    (tmp_path / 'bad.eph').write_bytes(b'not a store')
+    with pytest.raises(Exception):
+        ephemeris_store(str(tmp_path / 'bad.eph'))
@@ -0,0 +1,64 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from satellite_czml import satellite
+from satellite_czml.instrumentation import DEFERRED_MODULES
+from satellite_czml.satellite_czml import tle_checksum
+
+from conftest import ISS
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_defers_heavy_modules():
+    probe = f"import sys, satellite_czml; print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    loaded = subprocess.run([sys.executable, '-c', probe], env=env, capture_output=True, text=True,
+                            check=True).stdout.strip()
+    assert loaded == ''
+
+
+def test_propagation_cache_is_loaded_on_first_use():
+    import satellite_czml
+    from satellite_czml.propagation import propagation_cache
+    assert satellite_czml.propagation_cache is propagation_cache
+    with pytest.raises(AttributeError):
+        satellite_czml.not_a_name
+
+
+@pytest.mark.parametrize('line, column, text', [
+    (1, 64, 'x999'),    # element set number
+    (1, 23, ' '),       # epoch decimal point
+    (2, 26, 'abcdefg'), # eccentricity
+    (2, 2, '99999'),    # object number differs from line 1
+])
+def test_malformed_tle_lines_are_rejected(line, column, text):
+    tle = list(ISS)
+    tle[line] = tle[line][:column] + text + tle[line][column + len(text):]
+    # With a valid checksum, so the layout check is what rejects it
+    tle[line] = tle[line][:68] + str(tle_checksum(tle[line]))
+    with pytest.raises(ValueError):
+        satellite(tle)
+
+
+def test_bad_checksum_is_rejected():
+    tle = [ISS[0], ISS[1][:68] + str((int(ISS[1][68]) + 1) % 10), ISS[2]]
+    with pytest.raises(ValueError, match='checksum'):
+        satellite(tle)
+    # Lines without a checksum are accepted
+    assert satellite([ISS[0], ISS[1][:68], ISS[2][:68]]).id == 25544
+
+
+def test_valid_tle_is_accepted():
+    sat = satellite(ISS)
+    assert sat.id == 25544
+    # The legacy sgp4 model is only built when asked for
+    assert sat._tle_obj is None
+    assert sat.tle_obj.satnum == 25544
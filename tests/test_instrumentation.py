@@ -0,0 +1,64 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from satellite_czml import czml_observer, satellite_czml, stats_observer
+from satellite_czml.cli import combine_stats
+
+from conftest import ISS, START_TIME, END_TIME, make_tle
+
+
+class recorder(czml_observer):
+    def __init__(self):
+        self.events = []
+
+    def stage_finished(self, stage, seconds):
+        self.events.append(stage)
+
+
+def test_stages_and_counters(catalog):
+    stats = stats_observer()
+    czml_string = satellite_czml(tle_list=catalog + [['BAD', ISS[1][:18] + 'X' * 14 + ISS[1][32:], ISS[2]]],
+                                 start_time=START_TIME, end_time=END_TIME, observer=stats,
+                                 ignore_bad_tles=True).get_czml()
+
+    assert {'parse', 'propagate', 'build_path', 'build_position', 'build_packets', 'serialize'} <= set(stats.stages)
+    assert all(seconds >= 0 for seconds in stats.stages.values())
+    assert stats.stage_calls['build_position'] == len(catalog) and stats.stage_calls['serialize'] == 1
+    # Nested stages are part of build_packets
+    assert stats.stages['build_path'] + stats.stages['build_position'] <= stats.stages['build_packets']
+    assert stats.counters['satellites'] == len(catalog)
+    assert stats.counters['bytes'] == len(czml_string.encode('utf-8'))
+    assert stats.counters['failed'] == 1 and len(stats.failed) == 1
+
+    assert 'satellites=5' in stats.log_line()
+    assert 'satellite_czml_satellites_total 5' in stats.prometheus()
+    assert stats.reset() and stats.as_dict() == {'stages': {}, 'stage_calls': {}, 'counters': {},
+                                                 'failed': {}, 'trimmed': {}}
+
+
+def test_custom_observers_get_the_stages():
+    observer = recorder()
+    satellite_czml(tle_list=[ISS], start_time=START_TIME, end_time=END_TIME, observer=observer).get_czml()
+    assert observer.events[0] == 'parse' and observer.events[-1] == 'serialize'
+    assert observer.events.index('build_packets') > observer.events.index('build_position')
+
+
+def test_bad_tles_are_reported_by_norad_id():
+    stats = stats_observer()
+    bad = make_tle(1001, 51.6, 10.0, 0.001, 90.0, 0.0, 15.5)
+    unreadable = ['NO NUMBER', bad[1][:2] + 'ABCDE' + bad[1][7:], bad[2]]
+    satellite_czml(tle_list=[ISS, bad[:2] + [bad[2][:-1] + str((int(bad[2][-1]) + 1) % 10)], unreadable],
+                   start_time=START_TIME, end_time=END_TIME, observer=stats, ignore_bad_tles=True)
+    assert list(stats.failed) == [1001, 'NO NUMBER']
+
+
+def test_failures_of_several_parts_are_all_kept():
+    results = []
+    for id in (1001, 1002):
+        stats = stats_observer()
+        bad = make_tle(id, 51.6, 10.0, 0.001, 90.0, 0.0, 15.5)
+        satellite_czml(tle_list=[bad[:2] + [bad[2][:-1] + str((int(bad[2][-1]) + 1) % 10)]], start_time=START_TIME, end_time=END_TIME,
+                       observer=stats, ignore_bad_tles=True)
+        results.append((None, None, stats.as_dict()))
+    assert sorted(combine_stats(results)['failed']) == ['1001', '1002']
@@ -0,0 +1,38 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from datetime import date, datetime, timedelta, timezone
+
+import dateutil.parser
+import pytest
+
+from satellite_czml.isotime import format_interval, format_iso, parse_iso, parse_time
+
+
+@pytest.mark.parametrize('value', [
+    '2021-01-16', '2021-01-16T00:00:00Z', '2021-01-16T12:34:56.789Z', '2021-01-16T12:34:56,5+00:00',
+    '2021-01-16T12:34:56.1234567-05:30', '2021-01-16 12:34', '2021-01-16T12:34:56+0200', '2021-01-16T12:34:56+02',
+    '2021-01-16T12:34:56', 'Jan 16 2021 12:00 UTC',
+])
+def test_parse_iso_matches_dateutil(value):
+    parsed = parse_iso(value)
+    expected = dateutil.parser.parse(value)
+    assert parsed == expected and parsed.utcoffset() == expected.utcoffset()
+
+
+def test_parse_time():
+    assert parse_time('3600') == 3600.0 and parse_time('-1.5') == -1.5
+    assert parse_time('2021-01-16T00:00:00Z') == datetime(2021, 1, 16, tzinfo=timezone.utc)
+
+
+def test_format_iso_keeps_the_zone():
+    utc = datetime(2021, 1, 16, tzinfo=timezone.utc)
+    eastern = utc.astimezone(timezone(timedelta(hours=-5)))
+    assert format_iso(utc) == '2021-01-16T00:00:00+00:00'
+    assert format_iso(eastern) == '2021-01-15T19:00:00-05:00'
+    assert format_iso(utc.replace(tzinfo=None)) == '2021-01-16T00:00:00'
+    assert format_iso(date(2021, 1, 16)) == '2021-01-16'
+    assert format_iso(utc) is format_iso(datetime(2021, 1, 16, tzinfo=timezone.utc))
+    assert format_interval(eastern, utc + timedelta(hours=1)) == \
+        '2021-01-15T19:00:00-05:00/2021-01-16T01:00:00+00:00'
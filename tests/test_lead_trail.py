@@ -0,0 +1,67 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import copy
+import json
+import pickle
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from satellite_czml import satellite
+from satellite_czml.satellite_czml import lead_trail_intervals
+
+from conftest import ISS, START_TIME, END_TIME
+
+
+def test_equal_times_in_other_zones_are_not_shared():
+    eastern = timezone(timedelta(hours=-5))
+    lead_utc, _ = lead_trail_intervals(START_TIME, END_TIME, 92.9)
+    lead_eastern, _ = lead_trail_intervals(START_TIME.astimezone(eastern), END_TIME.astimezone(eastern), 92.9)
+
+    assert lead_utc[0]['epoch'] == '2021-01-16T00:00:00+00:00'
+    assert lead_eastern[0]['epoch'] == '2021-01-15T19:00:00-05:00'
+    assert [x['interval'].split('/')[0] for x in lead_eastern] == \
+           [(datetime.fromisoformat(x['epoch']).astimezone(eastern)).isoformat() for x in lead_utc]
+
+
+def test_intervals_match_repeated_timedelta_addition():
+    lead, trail = lead_trail_intervals(START_TIME, END_TIME, 92.9)
+    minutes = int((END_TIME - START_TIME).total_seconds() / 60)
+    time = START_TIME + timedelta(minutes=minutes % 92.9)
+    bounds = [START_TIME]
+    while time <= END_TIME:
+        bounds.append(time)
+        time += timedelta(minutes=92.9)
+    assert [x['interval'] for x in lead] == [a.isoformat() + '/' + b.isoformat()
+                                             for a, b in zip(bounds[:-1], bounds[1:])]
+    assert [x['interval'] for x in trail] == [x['interval'] for x in lead]
+    assert lead[1]['number'] == (0, 92.9 * 60, 92.9 * 60, 0)
+    assert trail[1]['number'] == (0, 0, 92.9 * 60, 92.9 * 60)
+
+
+def test_satellites_share_read_only_intervals():
+    first = satellite(ISS, start_time=START_TIME, end_time=END_TIME)
+    second = satellite(ISS, start_time=START_TIME, end_time=END_TIME)
+    first_lead, first_trail = first.build_lead_trail_times()
+    second_lead, second_trail = second.build_lead_trail_times()
+    assert first_lead is second_lead and first_trail is second_trail
+
+    with pytest.raises(TypeError):
+        first_lead[1]['epoch'] = 'changed'
+    with pytest.raises(TypeError):
+        first_lead[0]['number'][1] = 0
+    with pytest.raises(AttributeError):
+        first_lead.append({})
+    assert second.build_trail_time()[0]['number'][2] == first.get_orbital_time() * 60
+
+
+def test_shared_intervals_serialize_and_copy():
+    sat = satellite(ISS, start_time=START_TIME, end_time=END_TIME)
+    path = sat.build_path()
+    lead = json.loads(json.dumps(path.data()))['leadTime']
+    assert lead == [dict(x, number=list(x['number'])) for x in path.leadTime]
+    assert pickle.loads(pickle.dumps(path.leadTime)) == path.leadTime
+    copied = copy.deepcopy(path.leadTime)
+    assert copied == path.leadTime
@@ -0,0 +1,57 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import gzip
+import io
+import json
+
+import numpy as np
+import pytest
+
+from satellite_czml import iter_czml, load_czml
+
+
+@pytest.fixture
+def document(czml_obj, tmp_path):
+    text = czml_obj.get_czml()
+    # Multibyte characters to split across chunks
+    text = text.replace('"ISS (ZARYA)"', '"ISS (Заря) – \U0001f6f0"')
+    (tmp_path / 'doc.czml').write_text(text, encoding='utf-8')
+    (tmp_path / 'doc.czml.gz').write_bytes(gzip.compress(text.encode('utf-8')))
+    return text, tmp_path
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1000, 1 << 20])
+def test_streamed_packets_match_json(document, chunk_size):
+    text, path = document
+    expected = json.loads(text)
+    assert [v.data() for v in iter_czml(str(path / 'doc.czml'), chunk_size=chunk_size)] == expected
+    assert [v.data() for v in iter_czml(str(path / 'doc.czml.gz'), chunk_size=chunk_size)] == expected
+    assert [v.data() for v in iter_czml(io.BytesIO(text.encode('utf-8')), chunk_size=chunk_size)] == expected
+
+
+def test_filters_and_sample_buffers(document):
+    text, path = document
+    views = list(iter_czml(str(path / 'doc.czml'), ids=[40003, 25544], properties=['position']))
+    assert [v.id for v in views] == [25544, 40003]
+    assert all(list(v.keys()) == ['id', 'position'] for v in views)
+
+    expected = [p for p in json.loads(text) if p['id'] == 25544][0]['position']['cartesian']
+    assert isinstance(views[0]['position']['cartesian'], np.ndarray)
+    assert np.array_equal(views[0].samples(), np.reshape(expected, (-1, 4)))
+    assert views[0].get('position.epoch') == '2021-01-16T00:00:00+00:00'
+    assert views[0].get('label.text') is None
+    assert list(load_czml(str(path / 'doc.czml'), ids=[25544], properties=['position']).data()) == \
+        [{'id': 25544, 'position': views[0].data()['position']}]
+
+
+def test_reading_stops_once_the_ids_are_found():
+    source = io.StringIO('[{"id": 1}, {"id": 2}, this is never read')
+    assert [v.id for v in iter_czml(source, ids=[1, 2])] == [1, 2]
+
+
+@pytest.mark.parametrize('text', ['{}', '[{"id": 1} {"id": 2}]', '[{"id": 1},', '[1]', '[{"id": 1'])
+def test_invalid_documents_are_rejected(text):
+    with pytest.raises(Exception):
+        list(iter_czml(io.StringIO(text), chunk_size=3))
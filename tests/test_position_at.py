@@ -0,0 +1,64 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from satellite_czml import satellite_czml
+from satellite_czml.propagation import hermite_interpolate, lagrange_interpolate
+
+from conftest import START_TIME, END_TIME, orbit_tle
+
+ORBITS = [(15.5, 0.001), (14.0, 0.001), (11.3, 0.1), (8.0, 0.001), (4.0, 0.5), (2.0064, 0.72),
+          (2.0056, 0.001), (1.0027, 0.0002)]
+
+
+def test_interpolation_is_exact_for_polynomials():
+    offsets = np.arange(0.0, 100.0, 10.0)
+    times = np.linspace(0.0, 90.0, 37)
+    coefficients = np.random.default_rng(0).normal(size=(3, 8))
+    polynomial = lambda t: np.stack([np.polyval(c, t / 100) for c in coefficients], axis=-1)
+    slope = lambda t: np.stack([np.polyval(np.polyder(c), t / 100) / 100 for c in coefficients], axis=-1)
+
+    assert np.allclose(lagrange_interpolate(offsets, polynomial(offsets), times, 7), polynomial(times))
+    assert np.allclose(hermite_interpolate(offsets, polynomial(offsets), slope(offsets), times, 7),
+                       polynomial(times))
+    assert np.isnan(hermite_interpolate(offsets, polynomial(offsets), slope(offsets), [-1.0, 91.0], 7)).all()
+
+
+@pytest.mark.parametrize('use_velocity', [False, True])
+def test_interpolation_matches_sgp4(use_velocity):
+    tles = [orbit_tle(i + 1, mm, ecc) for i, (mm, ecc) in enumerate(ORBITS)]
+    czml_obj = satellite_czml(tle_list=tles, start_time=START_TIME, end_time=END_TIME,
+                              use_velocity=use_velocity)
+    times = np.linspace(0, 86400, 1441)
+    _, interpolated = czml_obj.position_at(times, method='interpolate')
+    _, propagated = czml_obj.position_at(times, method='propagate')
+    errors = np.linalg.norm(interpolated - propagated, axis=-1).max(axis=1)
+    assert (errors < 150).all(), dict(zip(ORBITS, errors.round()))
+
+
+def test_auto_propagates_outside_the_samples(czml_obj):
+    times = [START_TIME + timedelta(hours=30), START_TIME + timedelta(hours=12)]
+    _, interpolated = czml_obj.position_at(times, method='interpolate')
+    _, auto = czml_obj.position_at(times)
+    _, propagated = czml_obj.position_at(times, method='propagate')
+    assert np.isnan(interpolated[:, 0]).all()
+    assert np.array_equal(auto[:, 0], propagated[:, 0])
+    assert np.array_equal(auto[:, 1], interpolated[:, 1])
+
+
+def test_satellite_position_at_frames(czml_obj):
+    sat = czml_obj.get_satellite(25544)
+    ecef = sat.position_at([0.0, 600.0], frame='ecef')
+    lat, lon, height = sat.position_at([0.0, 600.0], frame='geodetic').T
+    assert np.allclose(np.linalg.norm(ecef, axis=-1), np.linalg.norm(sat.position_at([0.0, 600.0]), axis=-1))
+    assert (np.abs(lat) <= 51.7).all() and (height > 300e3).all() and (height < 500e3).all()
+
+
+def test_unknown_method_is_rejected(czml_obj):
+    with pytest.raises(Exception):
+        czml_obj.position_at([0.0], method='lagrange')
@@ -0,0 +1,64 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import numpy as np
+import pytest
+
+from satellite_czml import satellite, satellite_czml
+from satellite_czml.propagation import lagrange_interpolate, propagate
+
+from conftest import START_TIME, END_TIME, orbit_tle
+
+MEAN_MOTIONS = [1.0027, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 11.2, 11.3, 12.0, 14.0, 15.5, 16.3]
+
+
+def interpolation_error(sat):
+    '''
+    Largest distance (m) over the window between the positions Cesium
+    interpolates from the samples and sgp4's
+    '''
+    offsets, positions, _ = sat.propagate()
+    times = np.linspace(0, (END_TIME - START_TIME).total_seconds(), 2001)
+    expected = propagate([sat.satrec], START_TIME, times)[0][0]
+    interpolated = lagrange_interpolate(offsets, positions, times, sat.get_interpolation_degree())
+    return np.linalg.norm(interpolated - expected, axis=-1).max()
+
+
+@pytest.mark.parametrize('mean_motion', MEAN_MOTIONS)
+def test_interpolation_error_across_mean_motions(mean_motion):
+    sat = satellite(orbit_tle(1, mean_motion), start_time=START_TIME, end_time=END_TIME)
+    assert interpolation_error(sat) < 100
+
+
+@pytest.mark.parametrize('mean_motion,eccentricity', [(2.0064, 0.72), (4.0, 0.5), (9.0, 0.3), (11.3, 0.1)])
+def test_interpolation_error_of_eccentric_orbits(mean_motion, eccentricity):
+    sat = satellite(orbit_tle(1, mean_motion, eccentricity), start_time=START_TIME, end_time=END_TIME)
+    assert interpolation_error(sat) < 100
+
+
+def test_step_follows_period():
+    steps = [satellite(orbit_tle(1, mm), start_time=START_TIME, end_time=END_TIME).get_sample_step()
+             for mm in MEAN_MOTIONS]
+    assert steps == sorted(steps, reverse=True)
+    assert max(steps) <= 3600
+    # 424 s for 18 samples per orbit, capped at LEO's maxStep
+    assert steps[MEAN_MOTIONS.index(11.3)] == 300
+
+
+def test_similar_periods_share_a_sample_grid():
+    steps = {satellite(orbit_tle(1, mm), start_time=START_TIME, end_time=END_TIME).get_sample_step()
+             for mm in np.linspace(15.0, 15.5, 20)}
+    assert len(steps) == 1
+
+
+def test_fixed_step_override():
+    czml_obj = satellite_czml(tle_list=[orbit_tle(1, 2.0), orbit_tle(2, 15.0)], start_time=START_TIME,
+                              end_time=END_TIME, regime_settings={'MEO': {'step': 600}})
+    assert czml_obj.satellites[1].get_sample_step() == 600
+    assert czml_obj.satellites[2].get_sample_step() == 300
+
+
+def test_unknown_setting_is_rejected():
+    with pytest.raises(Exception):
+        satellite(orbit_tle(1, 2.0), regime_settings={'MEO': {'stepSize': 600}})
@@ -0,0 +1,76 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import json
+
+import numpy as np
+import pytest
+
+from satellite_czml import satellite_czml
+from satellite_czml.isotime import parse_iso
+from satellite_czml.region import EARTH_RADIUS, angle_to_region, check_region
+
+from conftest import START_TIME, END_TIME
+
+SWITZERLAND = [5.9, 45.8, 10.5, 47.8]
+
+
+def unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+@pytest.mark.parametrize('region', [SWITZERLAND, [170.0, -10.0, -170.0, 10.0], [-30.0, 60.0, 40.0, 85.0]])
+def test_angle_to_region_matches_dense_sampling(region):
+    rng = np.random.default_rng(1)
+    lat = np.degrees(np.arcsin(rng.uniform(-1, 1, 500)))
+    lon = rng.uniform(-180, 180, 500)
+
+    west, south, east, north = region
+    grid_lat, grid_lon = np.meshgrid(np.linspace(south, north, 200),
+                                     west + np.linspace(0, (east - west) % 360, 400))
+    grid = unit_vectors(grid_lat.ravel(), grid_lon.ravel())
+    expected = np.arccos(np.clip(unit_vectors(lat, lon) @ grid.T, -1, 1)).min(axis=1)
+    assert np.allclose(angle_to_region(lat, lon, region), expected, atol=np.radians(0.2))
+
+
+def test_visible_passes_are_available(catalog):
+    czml_obj = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME,
+                              region=SWITZERLAND, min_elevation=10)
+    packets = {p['id']: p for p in json.loads(czml_obj.get_czml())}
+
+    # Brute force: elevation from a grid over the region every 20 seconds
+    offsets = np.arange(0, 86400, 20.0)
+    ids, positions = czml_obj.position_at(offsets, method='propagate', frame='ecef')
+    west, south, east, north = SWITZERLAND
+    lat, lon = np.meshgrid(np.linspace(south, north, 5), np.linspace(west, east, 5))
+    up = unit_vectors(lat.ravel(), lon.ravel())
+    for id, sat_positions in zip(ids, positions):
+        to_satellite = sat_positions[:, None, :] - up[None] * EARTH_RADIUS
+        sin_elevation = (to_satellite * up).sum(axis=-1) / np.linalg.norm(to_satellite, axis=-1)
+        visible = offsets[(sin_elevation >= np.sin(np.radians(10))).any(axis=1)]
+        if len(visible) == 0:
+            continue
+
+        availability = packets[id]['availability']
+        spans = [[(parse_iso(t) - START_TIME).total_seconds() for t in interval.split('/')]
+                 for interval in ([availability] if isinstance(availability, str) else availability)]
+        assert all(any(start <= t <= end for start, end in spans) for t in visible), id
+
+
+def test_satellites_never_seen_are_left_out(catalog):
+    czml_obj = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME,
+                              region=[-180, 80, 180, 90], min_elevation=20)
+    ids = [p['id'] for p in json.loads(czml_obj.get_czml())]
+    # The ISS (51.6 degrees inclination) never gets high enough over the pole
+    assert 25544 not in ids and 40004 in ids
+    czml_obj.set_region(None)
+    assert 25544 in [p['id'] for p in json.loads(czml_obj.get_czml())]
+
+
+def test_region_is_checked():
+    with pytest.raises(Exception):
+        check_region([0, 10, 20])
+    with pytest.raises(Exception):
+        check_region([0, 50, 20, 40])
@@ -0,0 +1,44 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import numpy as np
+
+from satellite_czml import satellite_czml
+from satellite_czml.region import EARTH_RADIUS
+from satellite_czml.sensors import footprint_rings, sensor_central_angle
+
+from conftest import START_TIME, END_TIME
+
+SENSOR = {'halfAngle': 20, 'footprintPoints': 12, 'footprintSubsteps': 2}
+
+
+def test_footprint_edge_is_seen_at_the_half_angle():
+    distance = EARTH_RADIUS + np.array([400e3, 2000e3, 8000e3])
+    angle = sensor_central_angle(distance, 20.0)
+    # Angle between nadir and the line of sight to the edge of the footprint
+    seen = np.degrees(np.arctan2(EARTH_RADIUS * np.sin(angle), distance - EARTH_RADIUS * np.cos(angle)))
+    assert np.allclose(seen, 20.0)
+    # A cone wider than the Earth (seen from GEO) stops at the horizon
+    geo = EARTH_RADIUS + 35786e3
+    assert np.isclose(sensor_central_angle(geo, 20.0), np.arccos(EARTH_RADIUS / geo))
+
+    lon, lat = footprint_rings(np.array([10.0]), np.array([20.0]), np.array([0.1]), 8)
+    lat1, lat2, dlon = np.radians(10.0), np.radians(lat[0]), np.radians(lon[0] - 20.0)
+    central = np.arccos(np.sin(lat1) * np.sin(lat2) + np.cos(lat1) * np.cos(lat2) * np.cos(dlon))
+    assert np.allclose(central, 0.1)
+
+
+def test_bulk_footprints_match_one_satellite_at_a_time(catalog):
+    sensors = [SENSOR, None, dict(SENSOR, halfAngle=5), SENSOR, None]
+    bulk = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME, sensor_list=sensors)
+    bulk.build_footprints()
+    packets = {p['id']: p for p in bulk.build_document().data()}
+
+    assert set(packets) == {'document', 25544, 40001, 40002, 40003, 40004,
+                            '25544-footprint', '40002-footprint', '40003-footprint'}
+    for id, sensor in zip([25544, 40002, 40003], [SENSOR, sensors[2], SENSOR]):
+        sat = satellite_czml(tle_list=[c for c in catalog if str(id) in c[1][2:7]], start_time=START_TIME,
+                             end_time=END_TIME, sensor_list=[sensor]).get_satellite(id)
+        assert sat.build_footprint().data() == packets[f'{id}-footprint']['polygon']
+        assert packets[id]['cone']['outerHalfAngle'] == np.radians(sensor['halfAngle'])
@@ -0,0 +1,54 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from datetime import timedelta
+import json
+
+import numpy as np
+
+from satellite_czml import satellite_czml
+
+from conftest import START_TIME, END_TIME, decaying_tle
+
+
+def test_times_can_be_a_numpy_array(czml_obj):
+    times = [START_TIME + timedelta(minutes=10 * i) for i in range(3)]
+    expected = czml_obj.get_snapshot_czml(times)
+    assert czml_obj.get_snapshot_czml(np.array(times)) == expected
+    naive = np.array([t.replace(tzinfo=None) for t in times], dtype='datetime64[us]')
+    assert czml_obj.get_snapshot_czml(naive) == expected
+
+
+def test_snapshot_holds_each_position_until_the_next(czml_obj):
+    times = [START_TIME, START_TIME + timedelta(minutes=10)]
+    packets = json.loads(czml_obj.get_snapshot_czml(times))
+    assert packets[0]['clock']['interval'] == '2021-01-16T00:00:00+00:00/2021-01-16T00:20:00+00:00'
+    assert len(packets) == len(czml_obj.satellites) + 1
+
+    _, positions = czml_obj.position_at(times, method='propagate', frame='ecef')
+    for packet, expected in zip(packets[1:], positions):
+        assert [p['interval'].split('/')[0] for p in packet['position']] == \
+               ['2021-01-16T00:00:00+00:00', '2021-01-16T00:10:00+00:00']
+        assert np.abs(np.array([p['cartesian'] for p in packet['position']]) - expected).max() <= 0.5
+
+
+def test_default_is_start_time(czml_obj):
+    packets = json.loads(czml_obj.get_snapshot_czml())
+    assert packets[0]['clock']['currentTime'] == '2021-01-16T00:00:00+00:00'
+    assert all(len(p['position']['cartesian']) == 3 for p in packets[1:])
+
+
+def test_packets_are_plain_points(catalog):
+    czml_obj = satellite_czml(tle_list=catalog + [decaying_tle(40100, '10000-1')], start_time=START_TIME,
+                              end_time=END_TIME, ignore_bad_tles=True)
+    packets = json.loads(czml_obj.get_snapshot_czml(pixel_size=3))
+    assert [p['id'] for p in packets[1:]] == list(czml_obj.satellites)
+    for packet in packets[1:]:
+        sat = czml_obj.satellites[packet['id']]
+        assert set(packet) == {'id', 'position', 'point'}
+        assert packet['point'] == {'pixelSize': 3, 'color': {'rgba': list(sat.color)}}
+
+    # Satellites sgp4 gives up on at any of the instants are left out
+    packets = json.loads(czml_obj.get_snapshot_czml([START_TIME, START_TIME + timedelta(hours=23)]))
+    assert [p['id'] for p in packets[1:]] == [id for id in czml_obj.satellites if id != 40100]
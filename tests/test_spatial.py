@@ -0,0 +1,71 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from satellite_czml import satellite_czml
+from satellite_czml.propagation import geodetic_to_ecef
+
+from conftest import START_TIME, END_TIME, make_tle
+
+TIME = START_TIME + timedelta(hours=3, minutes=17)
+
+
+@pytest.fixture(scope='module')
+def constellation():
+    rng = np.random.default_rng(0)
+    tles = [make_tle(30000 + i, rng.uniform(0, 100), rng.uniform(0, 360), 0.001, 0.0, rng.uniform(0, 360),
+                     rng.choice([15.5, 14.2, 12.0, 2.0])) for i in range(300)]
+    return satellite_czml(tle_list=tles, start_time=START_TIME, end_time=END_TIME)
+
+
+@pytest.fixture(params=[False, True], ids=['grid', 'scipy'])
+def index(request, constellation):
+    if request.param:
+        pytest.importorskip('scipy')
+    return constellation.get_spatial_index(use_scipy=request.param, max_slices=2, cell_size=300000.0)
+
+
+def brute_force(constellation, center):
+    ids, positions = constellation.position_at([TIME], frame='ecef')
+    distances = np.linalg.norm(positions[:, 0] - center, axis=1)
+    order = np.argsort(distances, kind='stable')
+    return np.asarray(ids)[order], distances[order]
+
+
+@pytest.mark.parametrize('point', [[0.0, 0.0, 0.0], [7000e3, 0.0, 0.0], [-3000e3, 20000e3, 15000e3]])
+def test_queries_match_brute_force(constellation, index, point):
+    ids, distances = brute_force(constellation, np.array(point))
+    found, found_distances = index.nearest(point, TIME, k=10)
+    assert found.tolist() == ids[:10].tolist() and np.allclose(found_distances, distances[:10])
+
+    radius = distances[25]
+    found, found_distances = index.within(point, radius, TIME)
+    assert found.tolist() == ids[distances <= radius].tolist()
+    assert np.allclose(found_distances, distances[distances <= radius])
+
+
+def test_satellite_and_geodetic_points(constellation, index):
+    center = constellation.get_satellite(30007).position_at([TIME], frame='ecef')[0]
+    ids, distances = brute_force(constellation, center)
+    assert ids[0] == 30007
+    found, found_distances = index.nearest(30007, TIME, k=5)
+    assert found.tolist() == ids[1:6].tolist()
+    assert index.within(30007, distances[5], TIME)[0].tolist() == ids[1:6].tolist()
+
+    ids, _ = brute_force(constellation, geodetic_to_ecef(48.1, 11.6, 0.0))
+    assert index.nearest([48.1, 11.6, 0.0], TIME, k=3, geodetic=True)[0].tolist() == ids[:3].tolist()
+
+
+def test_slices_are_cached(constellation):
+    index = constellation.get_spatial_index(use_scipy=False, max_slices=2, time_step=60)
+    first = index.get_slice(TIME)
+    assert index.get_slice(TIME + timedelta(seconds=20)) is first
+    index.get_slice(TIME + timedelta(minutes=5))
+    index.get_slice(TIME + timedelta(minutes=10))
+    assert len(index) == 2 and index.get_slice(TIME) is not first
+    assert index.clear() and len(index) == 0
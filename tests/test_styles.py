@@ -0,0 +1,84 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import gc
+import json
+import weakref
+
+from satellite_czml import satellite_czml
+from satellite_czml.czml import CZMLPacket, Path
+from satellite_czml.styles import style_registry
+
+from conftest import START_TIME, END_TIME, orbit_tle
+
+
+class intervals(list):
+    pass
+
+
+def resolve(packets):
+    '''
+    Replaces the references to style packets by the values they point at
+    '''
+    styles = {p['id']: p for p in packets if str(p['id']).startswith('style-')}
+    resolved = []
+    for packet in packets:
+        if packet['id'] in styles:
+            continue
+        for graphics in packet.values():
+            if isinstance(graphics, dict):
+                for attr, value in graphics.items():
+                    if isinstance(value, dict) and 'reference' in value:
+                        id, _, path = value['reference'].partition('#')
+                        name, attr = path.split('.')
+                        graphics[attr] = styles[id][name][attr]
+        resolved.append(packet)
+    return resolved
+
+
+def test_references_resolve_to_the_same_document(catalog):
+    plain = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME).get_czml()
+    shared = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME,
+                            use_references=True).get_czml()
+    assert len(shared) < len(plain)
+    assert resolve(json.loads(shared)) == json.loads(plain)
+
+
+def test_values_are_grouped_by_text_and_not_kept():
+    registry = style_registry()
+    value = intervals([{"interval": "2021-01-16T00:00:00Z/2021-01-17T00:00:00Z", "boolean": True}])
+    kept = weakref.ref(value)
+
+    first, second = CZMLPacket(id=1), CZMLPacket(id=2)
+    first.path, second.path = Path(show=value), Path(show=intervals(value))
+    assert registry.share(first) == []
+    styles = registry.share(second)
+    assert [s.data() for s in styles] == [{"id": "style-0", "path": {"show": list(value)}}]
+    assert second.data()['path']['show'] == {"reference": "style-0#path.show"}
+
+    del value, first
+    gc.collect()
+    assert kept() is None
+
+
+def test_only_shared_values_are_remembered(catalog):
+    registry = style_registry()
+    czml_obj = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME)
+    packets = list(czml_obj.iter_packets())[1:]
+    for packet in packets:
+        registry.share(packet)
+    # The default image and the path visibility, not the lead and trail times
+    assert len(registry._seen) == 2 and len(registry) == 2
+    assert all(len(key) == 16 for _, _, key in registry._seen)
+
+
+def test_references_save_the_repeated_image():
+    catalog = [orbit_tle(40000 + i, 15.0 - i / 10) for i in range(20)]
+    plain = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME).get_czml()
+    shared = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME,
+                            use_references=True).get_czml()
+    image = json.loads(plain)[1]['billboard']['image']
+    reference = '{"reference": "style-0#billboard.image"}'
+    # Every satellite after the first writes a reference instead of the image
+    assert len(plain) - len(shared) >= (len(catalog) - 2) * (len(json.dumps(image)) - len(reference))
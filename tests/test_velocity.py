@@ -0,0 +1,75 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+from datetime import timedelta
+import json
+
+import numpy as np
+import pytest
+
+from satellite_czml import satellite, REGIME_SETTINGS
+from satellite_czml.propagation import hermite_interpolate, lagrange_interpolate, propagate
+from sgp4.api import jday
+
+from conftest import ISS, START_TIME, END_TIME, orbit_tle
+
+
+def interpolation_error(sat):
+    '''
+    Largest distance (m) over the window between the interpolated samples
+    and sgp4's positions
+    '''
+    offsets, positions, velocities = sat.propagate()
+    times = np.linspace(0, (END_TIME - START_TIME).total_seconds(), 2001)
+    expected = propagate([sat.satrec], START_TIME, times)[0][0]
+    if sat.use_velocity:
+        interpolated = hermite_interpolate(offsets, positions, velocities, times, sat.get_interpolation_degree())
+    else:
+        interpolated = lagrange_interpolate(offsets, positions, times, sat.get_interpolation_degree())
+    return np.linalg.norm(interpolated - expected, axis=-1).max()
+
+
+@pytest.mark.parametrize('tle', [ISS, orbit_tle(1, 16.3), orbit_tle(1, 15.5), orbit_tle(1, 14.2),
+                                 orbit_tle(1, 15.0, 0.01)])
+def test_velocities_halve_the_samples_within_the_lagrange_error(tle):
+    plain = satellite(tle, start_time=START_TIME, end_time=END_TIME)
+    hermite = satellite(tle, start_time=START_TIME, end_time=END_TIME, use_velocity=True)
+    assert hermite.use_velocity and hermite.get_sample_step() == 2 * plain.get_sample_step()
+    window = (END_TIME - START_TIME).total_seconds()
+    samples = lambda sat: np.count_nonzero(sat.propagate()[0] <= window)
+    assert samples(hermite) <= samples(plain) // 2 + 1
+    assert interpolation_error(hermite) <= interpolation_error(plain)
+
+
+@pytest.mark.parametrize('mean_motion,eccentricity', [(11.3, 0.1), (2.0056, 0.001), (1.0027, 0.0002),
+                                                      (2.0064, 0.72)])
+def test_velocities_are_not_written_where_they_cost_samples(mean_motion, eccentricity):
+    sat = satellite(orbit_tle(1, mean_motion, eccentricity), start_time=START_TIME, end_time=END_TIME,
+                    use_velocity=True)
+    assert not sat.use_velocity
+    position = sat.build_position().data()
+    assert 'cartesianVelocity' not in position and position['interpolationAlgorithm'] == 'LAGRANGE'
+    assert sat.get_sample_step() == sat.get_sample_step(use_velocity=False)
+
+
+@pytest.mark.parametrize('mean_motion', [15.5, 11.3])
+def test_cartesian_velocity_samples(mean_motion):
+    sat = satellite(orbit_tle(1, mean_motion), start_time=START_TIME, end_time=END_TIME, use_velocity=True)
+    assert sat.orbit_regime == 'LEO'
+    position = json.loads(json.dumps(sat.build_position().data()))
+    assert 'cartesian' not in position and position['interpolationAlgorithm'] == 'HERMITE'
+
+    rows = np.reshape(position['cartesianVelocity'], (-1, 7))
+    step = sat.get_sample_step()
+    plain_step = sat.get_sample_step(use_velocity=False)
+    factor = REGIME_SETTINGS['LEO']['velocityStepFactor']
+    assert step == pytest.approx(plain_step * factor, rel=0.1)
+    assert np.array_equal(np.diff(rows[:, 0]), np.full(len(rows) - 1, step))
+    assert rows[-1, 0] >= (END_TIME - START_TIME).total_seconds()
+
+    for offset, *state in rows[::len(rows) // 5]:
+        time = START_TIME + timedelta(seconds=offset)
+        jd, fr = jday(time.year, time.month, time.day, time.hour, time.minute, time.second)
+        _, r, v = sat.satrec.sgp4(jd, fr)
+        assert np.allclose(state, np.concatenate((r, v)) * 1000, rtol=0, atol=1e-3)
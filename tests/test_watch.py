@@ -0,0 +1,68 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import gzip
+import json
+import os
+
+from satellite_czml import satellite_czml, stats_observer
+from satellite_czml.watch import czml_watcher
+
+from conftest import START_TIME, END_TIME, make_tle
+
+
+def write_tles(path, tles):
+    with open(path, 'w') as f:
+        f.write('\n'.join(line for tle in tles for line in tle) + '\n')
+    # Same size rewrites can land within the file system's timestamp resolution
+    info = os.stat(path)
+    os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns + 1000000000))
+
+
+def positions(packets):
+    return {p['id']: p['position']['cartesian'] for p in packets if 'position' in p}
+
+
+def test_polls_rebuild_only_what_changed(tmp_path):
+    tles = [make_tle(40000 + i, 50.0 + i, 10.0 * i, 0.001, 20.0, 30.0, 15.0 - i) for i in range(4)]
+    (tmp_path / 'tles').mkdir()
+    write_tles(tmp_path / 'tles' / 'a.tle', tles)
+    stats = stats_observer()
+    watcher = czml_watcher([str(tmp_path / 'tles')], str(tmp_path / 'live.czml.gz'), delta=True, observer=stats,
+                           start_time=START_TIME, end_time=END_TIME)
+
+    assert watcher.poll() == {'added': [40000, 40001, 40002, 40003], 'changed': [], 'removed': []}
+    assert watcher.poll() is None
+    assert stats.stage_calls['build_position'] == 4
+
+    newer = make_tle(40001, 51.0, 10.0, 0.001, 20.0, 30.0, 14.0, epoch='21016.60000000')
+    extra = make_tle(40010, 98.0, 0.0, 0.001, 0.0, 0.0, 14.2)
+    write_tles(tmp_path / 'tles' / 'a.tle', [tles[0], newer, tles[3], extra])
+    assert watcher.poll() == {'added': [40010], 'changed': [40001], 'removed': [40002]}
+    assert stats.stage_calls['build_position'] == 6
+    assert stats.counters['rebuilt'] == 6 and stats.counters['removed'] == 1
+
+    with gzip.open(tmp_path / 'live.czml.gz', 'rt') as f:
+        packets = json.load(f)
+    expected = satellite_czml(tle_list=[tles[0], newer, tles[3], extra], start_time=START_TIME,
+                              end_time=END_TIME).get_czml()
+    assert positions(packets) == positions(json.loads(expected))
+
+    with gzip.open(tmp_path / 'live-delta-1.czml.gz', 'rt') as f:
+        delta = json.load(f)
+    assert delta[0] == {"id": "document", "version": "1.0"}
+    assert {"id": 40002, "delete": True} in delta and {"id": 40001, "delete": True} in delta
+    assert set(positions(delta)) == {40001, 40010}
+
+
+def test_set_window_rebuilds_everything(tmp_path):
+    write_tles(tmp_path / 'a.tle', [make_tle(40000, 50.0, 0.0, 0.001, 20.0, 30.0, 15.0)])
+    watcher = czml_watcher([str(tmp_path / 'a.tle')], str(tmp_path / 'live.czml'),
+                           start_time=START_TIME, end_time=END_TIME)
+    watcher.poll()
+    assert watcher.set_window(START_TIME, START_TIME.replace(hour=6))
+    with open(tmp_path / 'live.czml') as f:
+        packets = json.load(f)
+    assert packets[0]['clock']['interval'].endswith('2021-01-16T06:00:00+00:00')
+    assert not os.path.exists(tmp_path / 'live-delta-1.czml')
@@ -0,0 +1,59 @@
+# satellite_czml
+# Author: Nicholas Miller (miller.nicholas.a@gmail.com)
+# https://github.com/cassova/satellite-czml
+
+import gzip
+import zlib
+
+from satellite_czml import satellite_czml
+
+from conftest import ISS, START_TIME, END_TIME
+
+SENSOR = {'halfAngle': 20}
+
+
+def test_streamed_output_is_the_same_as_get_czml(catalog, tmp_path):
+    czml_obj = satellite_czml(tle_list=catalog, start_time=START_TIME, end_time=END_TIME,
+                              sensor_list=[SENSOR, None, None, SENSOR, None], attitude_mode='lvlh')
+    expected = czml_obj.get_czml()
+
+    czml_obj.write_czml(str(tmp_path / 'out.czml'))
+    assert (tmp_path / 'out.czml').read_text(encoding='utf-8') == expected
+    czml_obj.write_czml(str(tmp_path / 'out.czml.gz'), level=1)
+    assert gzip.decompress((tmp_path / 'out.czml.gz').read_bytes()).decode('utf-8') == expected
+    assert zlib.decompress(b''.join(czml_obj.iter_compressed('deflate'))).decode('utf-8') == expected
+    assert czml_obj.get_czml() == expected
+
+
+def test_streaming_releases_the_graphics(czml_obj):
+    texts = czml_obj.iter_text()
+    next(texts)
+    next(texts)
+    first = next(iter(czml_obj.satellites.values()))
+    assert first.czmlPosition is not None
+    next(texts)
+    assert first.czmlPosition is None and first.czmlPath is None
+    for _ in texts:
+        pass
+    assert all(sat.czmlPosition is None and sat.czmlPath is None and sat.czmlLabel is None
+               for sat in czml_obj.satellites.values())
+    assert all(sat.sample_positions is not None for sat in czml_obj.satellites.values())
+
+
+def test_streaming_keeps_customized_graphics(czml_obj, tmp_path):
+    czml_obj.get_czml()
+    sat = czml_obj.get_satellite(25544)
+    sat.build_path(rebuild=True, show=True, color=[255, 255, 0, 127], width=3)
+    sat.build_label(rebuild=True, show=True, font='12pt Arial')
+    expected = czml_obj.get_czml()
+    assert '"width": 3' in expected
+
+    czml_obj.write_czml(str(tmp_path / 'out.czml'))
+    assert (tmp_path / 'out.czml').read_text(encoding='utf-8') == expected
+    assert czml_obj.get_czml() == expected
+
+    fresh = satellite_czml(tle_list=[ISS], start_time=START_TIME, end_time=END_TIME)
+    fresh.get_satellite(25544).build_path(width=3)
+    assert '"width": 3' in ''.join(fresh.iter_text())
+    assert fresh.get_satellite(25544).czmlPath is not None
+    assert fresh.get_satellite(25544).czmlPosition is None